@@ -0,0 +1,104 @@
+"""
+Benchmark of the vectorised dynamic programming alignment of two 2000 peak alignments
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import sys
+import time
+
+# 3rd party
+import numpy
+
+# this package
+from pyms.DPA.Alignment import Alignment
+from pyms.DPA.PairwiseAlignment import dp, rt_band, score_matrix
+from pyms.Experiment import Experiment
+from pyms.Peak.Class import Peak
+from pyms.Spectrum import MassSpectrum
+
+D = 2.5
+gap = 0.3
+
+
+def dp_loop(S, gap_penalty):
+	"""
+	The original cell by cell implementation of :func:`pyms.DPA.PairwiseAlignment.dp`,
+	without the traceback
+	"""
+
+	row_length, col_length = S.shape
+
+	D = numpy.zeros((row_length + 1, col_length + 1))
+	D[:, 0] = gap_penalty * numpy.arange(row_length + 1)
+	D[0, :] = gap_penalty * numpy.arange(col_length + 1)
+	trace_matrix = numpy.zeros((row_length + 1, col_length + 1))
+
+	for i in range(1, row_length + 1):
+		for j in range(1, col_length + 1):
+			darray = [D[i - 1, j - 1] + S[i - 1, j - 1], D[i - 1, j] + gap_penalty, D[i, j - 1] + gap_penalty]
+			D[i, j] = min(darray)
+			trace_matrix[i, j] = darray.index(D[i, j])
+
+	return trace_matrix
+
+
+def make_alignment(expr_code, rts, spectra):
+	mass_list = list(range(50, 50 + spectra.shape[1]))
+	peaks = [Peak(rt, MassSpectrum(mass_list, list(spectrum))) for rt, spectrum in zip(rts, spectra)]
+	return Alignment(Experiment(expr_code, peaks))
+
+
+def timed(function, *args, **kwargs):
+	start = time.perf_counter()
+	result = function(*args, **kwargs)
+	return time.perf_counter() - start, result
+
+
+def main(n_peaks=2000):
+	n_peaks = int(n_peaks)
+	rng = numpy.random.RandomState(0)
+
+	# Two runs of the same sample, with a little retention time drift and noise
+	rts = numpy.sort(rng.uniform(300, 1800, n_peaks))
+	spectra = rng.random_sample((n_peaks, 100)) ** 4
+	a1 = make_alignment("a", rts, spectra)
+	a2 = make_alignment("b", rts + rng.normal(0, 0.5, n_peaks), spectra + rng.random_sample(spectra.shape) * 0.05)
+	print(f"{n_peaks} x {n_peaks} peak alignment")
+
+	t_band, band = timed(rt_band, a1, a2, D)
+	print(f"rt_band: {t_band * 1000:.1f} ms ({numpy.count_nonzero(band) / band.size:.2%} of pairs in range)")
+
+	t_score, S = timed(score_matrix, a1, a2, D, band=band)
+	print(f"banded score_matrix: {t_score:.2f} s")
+
+	t_vec, result = timed(dp, S, gap)
+	print(f"dp: {t_vec:.2f} s")
+
+	t_loop, trace_matrix = timed(dp_loop, S, gap)
+	print(f"original dp: {t_loop:.2f} s ({t_loop / t_vec:.1f}x)")
+
+	assert numpy.array_equal(result["phi"][1:, 1:], trace_matrix[1:, 1:])
+
+
+if __name__ == "__main__":
+	main(*sys.argv[1:2])
@@ -0,0 +1,57 @@
+"""
+Benchmark of the vectorised intensity matrix binning against the original loop
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import pathlib
+import sys
+import timeit
+
+# this package
+import pyms.IntensityMatrix
+from pyms.GCMS.IO.JCAMP import JCAMP_reader
+
+data_file = pathlib.Path(__file__).parent.parent / "tests" / "data" / "ELEY_1_SUBTRACT.JDX"
+
+fill_bins = getattr(pyms.IntensityMatrix, "__fill_bins")
+fill_bins_loop = getattr(pyms.IntensityMatrix, "__fill_bins_loop")
+
+
+def main(file_name=data_file, repeat=5):
+	data = JCAMP_reader(file_name)
+	print(f"{len(data)} scans")
+
+	for bin_interval, bin_left, bin_right in [(1, 0.3, 0.7), (0.5, 0.25, 0.25), (0.1, 0.05, 0.05)]:
+		args = (data, data.min_mass, data.max_mass, bin_interval, bin_left, bin_right)
+
+		t_loop = min(timeit.repeat(lambda: fill_bins_loop(*args), number=1, repeat=repeat))
+		t_vec = min(timeit.repeat(lambda: fill_bins(*args), number=1, repeat=repeat))
+
+		print(
+				f"bin_interval={bin_interval}: loop {t_loop * 1000:.1f} ms, "
+				f"vectorised {t_vec * 1000:.1f} ms ({t_loop / t_vec:.1f}x)"
+				)
+
+
+if __name__ == "__main__":
+	main(*sys.argv[1:2])
@@ -0,0 +1,52 @@
+"""
+Benchmark of the vectorised local maxima detection on a 6000 x 500 intensity matrix
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import sys
+import timeit
+
+# 3rd party
+import numpy
+
+# this package
+from pyms.BillerBiemann import get_maxima_matrix
+from pyms.IntensityMatrix import IntensityMatrix
+
+
+def main(n_scans=6000, n_masses=500, repeat=5):
+	n_scans = int(n_scans)
+	n_masses = int(n_masses)
+
+	intensities = numpy.random.RandomState(0).random_sample((n_scans, n_masses))
+	intensities[intensities < 0.5] = 0
+	im = IntensityMatrix(list(range(n_scans)), list(range(n_masses)), intensities)
+	print(f"{n_scans} x {n_masses} intensity matrix")
+
+	for points, scans in [(3, 1), (9, 2), (9, 5)]:
+		t_vec = min(timeit.repeat(lambda: get_maxima_matrix(im, points, scans), number=1, repeat=repeat))
+		print(f"points={points}, scans={scans}: {t_vec * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+	main(*sys.argv[1:3])
@@ -37,6 +37,8 @@ class pymsBaseClass:
 	Base class
 	"""
 
+	__slots__ = ()
+
 	def dump(self, file_name, protocol=3):
 		"""
 		Dumps an object to a file through pickle.dump()
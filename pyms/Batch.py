@@ -0,0 +1,476 @@
+"""
+Process many GC-MS samples in parallel, from raw data files to
+:class:`pyms.Experiment.Experiment` objects
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import pathlib
+import traceback
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from numbers import Number
+
+# this package
+from pyms.Base import pymsBaseClass
+from pyms.BillerBiemann import BillerBiemann, num_ions_threshold, rel_threshold
+from pyms.Experiment import Experiment
+from pyms.GCMS.IO.ANDI import ANDI_reader
+from pyms.IntensityMatrix import build_intensity_matrix, build_intensity_matrix_i
+from pyms.Noise.SavitzkyGolay import savitzky_golay_im
+from pyms.Peak.Function import batch_peak_areas
+from pyms.TopHat import tophat_im
+from pyms.Utils.Executor import ProcessExecutor, get_executor
+from pyms.Utils.IO import prepare_filepath
+from pyms.Utils.Utils import is_path, is_sequence
+
+
+class Recipe(pymsBaseClass):
+	"""
+	The steps for processing a single sample, from the raw data file to an
+	:class:`pyms.Experiment.Experiment`:
+
+	#. Read the data file with ``reader``
+	#. Build the intensity matrix, with integer bins if ``bin_interval`` is :py:obj:`None`
+	#. Smooth each ion chromatogram with ``smooth_passes`` passes of the Savitzky-Golay filter
+	#. Correct the baseline of each ion chromatogram with the top-hat filter
+	#. Detect peaks with the Biller and Biemann technique
+	#. Remove peaks with :func:`pyms.BillerBiemann.rel_threshold`
+	   and :func:`pyms.BillerBiemann.num_ions_threshold`
+	#. Crop and null masses in each peak, and estimate the peak areas
+	#. Select the peaks in ``rt_range``
+
+	The recipe is pickled and sent to the worker processes, so ``reader``
+	must be a function defined at the top level of a module.
+
+	:param reader: The function to read the data files with
+	:type reader: callable, optional
+	:param bin_interval: Interval between bin centres. If :py:obj:`None` integer bins are used.
+	:type bin_interval: int or float, optional
+	:param bin_left: Left bin boundary offset. If :py:obj:`None` the default for the type of binning is used.
+	:type bin_left: float, optional
+	:param bin_right: Right bin boundary offset. If :py:obj:`None` the default for the type of binning is used.
+	:type bin_right: float, optional
+	:param smooth_window: The window for the Savitzky-Golay filter
+	:type smooth_window: int or str, optional
+	:param smooth_degree: Degree of the fitting polynomial for the Savitzky-Golay filter
+	:type smooth_degree: int, optional
+	:param smooth_passes: The number of times to apply the Savitzky-Golay filter
+	:type smooth_passes: int, optional
+	:param baseline: Whether to correct the baseline with the top-hat filter
+	:type baseline: bool, optional
+	:param tophat_struct: Top-hat structural element as time string
+	:type tophat_struct: int or str or NoneType, optional
+	:param points: Number of scans over which to consider a maxima to be a peak
+	:type points: int, optional
+	:param scans: Number of scans to combine peaks from to compensate for spectra skewing
+	:type scans: int, optional
+	:param percent: Threshold for relative percentage of intensity for considering ions
+	:type percent: int or float, optional
+	:param n: Minimum number of ions that must have intensities above the cutoff
+	:type n: int, optional
+	:param cutoff: The minimum intensity threshold
+	:type cutoff: int or float, optional
+	:param mass_range: The minimum and maximum mass to crop the peaks to
+	:type mass_range: tuple, optional
+	:param null_masses: Masses to ignore in the peaks
+	:type null_masses: list, optional
+	:param n_top_ions: The number of top ions to estimate the areas of
+	:type n_top_ions: int, optional
+	:param rt_range: Min, max retention time of the peaks to keep, as time strings
+	:type rt_range: list, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(
+			self,
+			reader=ANDI_reader,
+			bin_interval=None,
+			bin_left=None,
+			bin_right=None,
+			smooth_window=7,
+			smooth_degree=2,
+			smooth_passes=1,
+			baseline=True,
+			tophat_struct="1.5m",
+			points=9,
+			scans=2,
+			percent=2,
+			n=3,
+			cutoff=3000,
+			mass_range=None,
+			null_masses=(),
+			n_top_ions=5,
+			rt_range=None,
+			):
+		"""
+		Initialise the recipe
+		"""
+
+		if not callable(reader):
+			raise TypeError("'reader' must be callable")
+
+		if bin_interval is not None and not isinstance(bin_interval, Number):
+			raise TypeError("'bin_interval' must be a number")
+		if bin_left is not None and not isinstance(bin_left, Number):
+			raise TypeError("'bin_left' must be a number")
+		if bin_right is not None and not isinstance(bin_right, Number):
+			raise TypeError("'bin_right' must be a number")
+
+		if not isinstance(smooth_window, (int, str)):
+			raise TypeError("'smooth_window' must be either an int or a string")
+		if not isinstance(smooth_degree, int):
+			raise TypeError("'smooth_degree' must be an integer")
+		if not isinstance(smooth_passes, int):
+			raise TypeError("'smooth_passes' must be an integer")
+
+		if not isinstance(points, int):
+			raise TypeError("'points' must be an integer")
+		if not isinstance(scans, int):
+			raise TypeError("'scans' must be an integer")
+		if not isinstance(percent, Number):
+			raise TypeError("'percent' must be a number")
+		if not isinstance(n, int):
+			raise TypeError("'n' must be an integer")
+		if not isinstance(cutoff, Number):
+			raise TypeError("'cutoff' must be a number")
+
+		if mass_range is not None:
+			if not is_sequence(mass_range):
+				raise TypeError("'mass_range' must be a Sequence")
+			if len(mass_range) != 2:
+				raise ValueError("'mass_range' must have exactly two elements")
+		if not is_sequence(null_masses):
+			raise TypeError("'null_masses' must be a Sequence")
+		if not isinstance(n_top_ions, int):
+			raise TypeError("'n_top_ions' must be an integer")
+
+		if rt_range is not None and not is_sequence(rt_range):
+			raise TypeError("'rt_range' must be a Sequence")
+
+		self.reader = reader
+		self.bin_interval = bin_interval
+		self.bin_left = bin_left
+		self.bin_right = bin_right
+		self.smooth_window = smooth_window
+		self.smooth_degree = smooth_degree
+		self.smooth_passes = smooth_passes
+		self.baseline = baseline
+		self.tophat_struct = tophat_struct
+		self.points = points
+		self.scans = scans
+		self.percent = percent
+		self.n = n
+		self.cutoff = cutoff
+		self.mass_range = mass_range
+		self.null_masses = list(null_masses)
+		self.n_top_ions = n_top_ions
+		self.rt_range = rt_range
+
+	def build_intensity_matrix(self, data):
+		"""
+		Builds the intensity matrix for the raw data
+
+		:param data: Raw GCMS data
+		:type data: pyms.GCMS.Class.GCMS_data
+
+		:rtype: pyms.IntensityMatrix.IntensityMatrix
+		"""
+
+		bin_kwargs = {}
+		if self.bin_left is not None:
+			bin_kwargs["bin_left"] = self.bin_left
+		if self.bin_right is not None:
+			bin_kwargs["bin_right"] = self.bin_right
+
+		if self.bin_interval is None:
+			return build_intensity_matrix_i(data, **bin_kwargs)
+		else:
+			return build_intensity_matrix(data, self.bin_interval, **bin_kwargs)
+
+	def preprocess(self, im, executor=None):
+		"""
+		Smooths and baseline corrects each ion chromatogram of the intensity matrix, in place
+
+		:param im: The intensity matrix
+		:type im: pyms.IntensityMatrix.IntensityMatrix
+		:param executor: The executor to divide the ion chromatograms between.
+			See :func:`pyms.Utils.Executor.get_executor`.
+		:type executor: pyms.Utils.Executor.Executor or str, optional
+		"""
+
+		im_processed = im
+
+		for _ in range(self.smooth_passes):
+			im_processed = savitzky_golay_im(im_processed, self.smooth_window, self.smooth_degree, executor)
+		if self.baseline:
+			im_processed = tophat_im(im_processed, struct=self.tophat_struct, executor=executor)
+
+		if im_processed is not im:
+			im._intensity_array[:] = im_processed._intensity_array
+
+	def find_peaks(self, im):
+		"""
+		Detects and filters the peaks in the intensity matrix, and estimates their areas
+
+		:param im: The intensity matrix
+		:type im: pyms.IntensityMatrix.IntensityMatrix
+
+		:rtype: :class:`list` of :class:`pyms.Peak.Class.Peak` objects
+		"""
+
+		peak_list = BillerBiemann(im, points=self.points, scans=self.scans)
+		peak_list = rel_threshold(peak_list, percent=self.percent)
+		peak_list = num_ions_threshold(peak_list, n=self.n, cutoff=self.cutoff)
+
+		for peak in peak_list:
+			if self.mass_range is not None:
+				peak.crop_mass(*self.mass_range)
+			for mass in self.null_masses:
+				peak.null_mass(mass)
+
+		batch_peak_areas(im, peak_list, n_top_ions=self.n_top_ions)
+
+		return peak_list
+
+	def process(self, file_name, expr_code=None, executor=None):
+		"""
+		Processes a single sample
+
+		:param file_name: The raw data file
+		:type file_name: str or pathlib.Path
+		:param expr_code: Unique identifier for the experiment.
+			If :py:obj:`None` the name of the file without its extension is used.
+		:type expr_code: str, optional
+		:param executor: The executor to divide the ion chromatograms between
+			when smoothing and baseline correcting them.
+			See :func:`pyms.Utils.Executor.get_executor`.
+		:type executor: pyms.Utils.Executor.Executor or str, optional
+
+		:rtype: pyms.Experiment.Experiment
+		"""
+
+		if not is_path(file_name):
+			raise TypeError("'file_name' must be a string or a PathLike object")
+
+		if expr_code is None:
+			expr_code = pathlib.Path(file_name).stem
+
+		data = self.reader(file_name)
+		im = self.build_intensity_matrix(data)
+		self.preprocess(im, executor)
+
+		experiment = Experiment(expr_code, self.find_peaks(im))
+
+		if self.rt_range is not None:
+			experiment.sele_rt_range(list(self.rt_range))
+
+		return experiment
+
+
+class BatchResult:
+	"""
+	The result of processing one sample with :func:`pyms.Batch.run_batch`
+
+	:param expr_code: Unique identifier for the experiment
+	:type expr_code: str
+	:param file_name: The raw data file
+	:type file_name: str or pathlib.Path
+	:param experiment: The experiment, or :py:obj:`None` if processing the sample failed
+	:type experiment: pyms.Experiment.Experiment, optional
+	:param error: The traceback of the error, or :py:obj:`None` if processing the sample succeeded
+	:type error: str, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, expr_code, file_name, experiment=None, error=None):
+		"""
+		Initialise the result
+		"""
+
+		self.expr_code = expr_code
+		self.file_name = file_name
+		self.experiment = experiment
+		self.error = error
+
+	def __repr__(self):
+		status = "failed" if self.failed else "ok"
+		return f"<BatchResult({self.expr_code!r}, {status})>"
+
+	@property
+	def failed(self):
+		"""
+		Returns whether processing the sample failed
+
+		:rtype: bool
+		"""
+
+		return self.error is not None
+
+
+def process_sample(recipe, file_name, expr_code=None, output_directory=None):
+	"""
+	Processes a single sample with a recipe, catching any errors
+
+	:param recipe: The processing steps
+	:type recipe: pyms.Batch.Recipe
+	:param file_name: The raw data file
+	:type file_name: str or pathlib.Path
+	:param expr_code: Unique identifier for the experiment.
+		If :py:obj:`None` the name of the file without its extension is used.
+	:type expr_code: str, optional
+	:param output_directory: If given, the experiment is also saved to
+		``<expr_code>.expr`` in this directory
+	:type output_directory: str or pathlib.Path, optional
+
+	:rtype: pyms.Batch.BatchResult
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if expr_code is None:
+		expr_code = pathlib.Path(file_name).stem
+
+	try:
+		experiment = recipe.process(file_name, expr_code)
+
+		if output_directory is not None:
+			experiment.dump(pathlib.Path(output_directory) / f"{expr_code}.expr")
+
+	except Exception:
+		# The exception itself might not survive being pickled back to the parent process
+		return BatchResult(expr_code, file_name, error=traceback.format_exc())
+
+	return BatchResult(expr_code, file_name, experiment=experiment)
+
+
+def run_batch(file_names, recipe, expr_codes=None, max_workers=None, output_directory=None, executor=None):
+	"""
+	Processes many samples in parallel in a pool of processes, or with another executor.
+
+	The results are yielded as each sample finishes, which is not necessarily
+	the order of ``file_names``. A sample which raises an error is yielded as a
+	failed :class:`pyms.Batch.BatchResult` and the rest of the batch carries on.
+	If a worker process dies, the samples it might have been processing are
+	retried once in a new pool before being reported as failed.
+
+	:param file_names: The raw data files
+	:type file_names: list of str or pathlib.Path
+	:param recipe: The processing steps
+	:type recipe: pyms.Batch.Recipe
+	:param expr_codes: Unique identifiers for the experiments, one per file.
+		If :py:obj:`None` the names of the files without their extensions are used.
+	:type expr_codes: list of str, optional
+	:param max_workers: The number of processes to use. If :py:obj:`None`
+		the number of processors on the machine is used.
+	:type max_workers: int, optional
+	:param output_directory: If given, each experiment is also saved to
+		``<expr_code>.expr`` in this directory by the worker processes
+	:type output_directory: str or pathlib.Path, optional
+	:param executor: The executor to process the samples with, in place of a pool of
+		``max_workers`` processes. See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
+
+	:return: A generator of the results
+	:rtype: ~collections.abc.Iterator[pyms.Batch.BatchResult]
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not is_sequence(file_names) or not all(is_path(file_name) for file_name in file_names):
+		raise TypeError("'file_names' must be a Sequence of strings or PathLike objects")
+	if not isinstance(recipe, Recipe):
+		raise TypeError("'recipe' must be a Recipe object")
+
+	if expr_codes is None:
+		expr_codes = [pathlib.Path(file_name).stem for file_name in file_names]
+	elif not is_sequence(expr_codes) or not all(isinstance(code, str) for code in expr_codes):
+		raise TypeError("'expr_codes' must be a Sequence of strings")
+	elif len(expr_codes) != len(file_names):
+		raise ValueError("'expr_codes' and 'file_names' must be the same length")
+
+	if max_workers is not None and not isinstance(max_workers, int):
+		raise TypeError("'max_workers' must be an integer")
+
+	if output_directory is not None:
+		if not is_path(output_directory):
+			raise TypeError("'output_directory' must be a string or a PathLike object")
+		output_directory = prepare_filepath(output_directory, mkdirs=False)
+		output_directory.mkdir(parents=True, exist_ok=True)
+
+	if executor is None:
+		executor = ProcessExecutor(max_workers)
+	else:
+		executor = get_executor(executor)
+
+	samples = list(enumerate(zip(expr_codes, file_names)))
+
+	return _run_batch(samples, recipe, executor, output_directory)
+
+
+def _run_batch(samples, recipe, executor, output_directory):
+	"""
+	Generator which runs the batch for :func:`pyms.Batch.run_batch`
+
+	:param samples: The position of each sample in the batch, and its ``(expr_code, file_name)``
+	:type samples: list of tuple
+	"""
+
+	samples.reverse()  # So samples are submitted in order by popping from the end
+	retried = set()
+
+	while samples:
+		with executor.pool() as pool:
+			# Only submit a few samples ahead of the workers, so the results of a
+			# large batch are not all held in memory at once.
+			max_pending = 2 * executor.n_workers
+			pending = {}
+			broken = []
+
+			while samples or pending:
+				while samples and len(pending) < max_pending and not broken:
+					sample = samples.pop()
+					index, (expr_code, file_name) = sample
+					future = pool.submit(process_sample, recipe, file_name, expr_code, output_directory)
+					pending[future] = sample
+
+				done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+				for future in done:
+					sample = pending.pop(future)
+					index, (expr_code, file_name) = sample
+					try:
+						yield future.result()
+					except BrokenProcessPool:
+						if index in retried:
+							yield BatchResult(expr_code, file_name, error=traceback.format_exc())
+						else:
+							retried.add(index)
+							broken.append(sample)
+
+				if broken and not pending:
+					break
+
+		# Restart the pool and retry the samples it was processing when it broke
+		samples.extend(reversed(broken))
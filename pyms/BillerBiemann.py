@@ -33,8 +33,9 @@ import numpy
 # this package
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
-from pyms.Peak.Class import Peak
+from pyms.Peak.Class import Peak, _make_uids
 from pyms.Peak.List.Function import is_peak_list
+from pyms.Peak.Table import PeakTable
 from pyms.Spectrum import MassSpectrum
 from pyms.Utils.Utils import is_sequence_of
 
@@ -110,35 +111,83 @@ def get_maxima_indices(ion_intensities, points=3):
     if not isinstance(points, int):
         raise TypeError("'points' must be an integer")
 
-    # find peak inflection points
+    maxima = _maxima_mask(numpy.asarray(ion_intensities)[:, numpy.newaxis], points)[:, 0]
+
+    return numpy.flatnonzero(maxima).tolist()
+
+
+def _maxima_mask(intensities, points=3):
+    """
+    Find the local maxima of each column of a matrix of intensities.
+
+    A point is a maximum if it is larger than the ``points // 2`` points either side of it.
+    For a plateau after a rise, the centre of the plateau is taken as the maximum.
+
+    :param intensities: A matrix of intensities, with one column per ion
+    :type intensities: numpy.ndarray
+    :param points: Number of scans over which to consider a maxima to be a peak (Default 3)
+    :type points: int, optional
+
+    :return: A boolean matrix which is :py:obj:`True` at the local maxima
+    :rtype: numpy.ndarray
+
+    :author: Andrew Isaac
+    :author: Dominic Davis-Foster
+    """
+
     # use a 'points' point window
-    # for a plateau after a rise, need to check if it is the left edge of
-    # a peak
-    peak_point = []
-    edge = -1
-    points = int(points)
     half = int(points / 2)
     points = 2 * half + 1  # ensure odd number of points
 
-    for index in range(len(ion_intensities) - points + 1):
-        left = ion_intensities[index:index + half]
-        mid = ion_intensities[index + half]
-        right = ion_intensities[index + half + 1:index + points]
-        # max in middle
-        if mid > max(left) and mid > max(right):
-            peak_point.append(index + half)
-            edge = -1  # ignore previous rising edge
-        # flat from rise (left of peak?)
-        if mid > max(left) and mid == max(right):
-            edge = index + half  # ignore previous rising edge, update latest
-        # fall from flat
-        if mid == max(left) and mid > max(right):
-            if edge > -1:
-                centre = int((edge + index + half) / 2)  # mid point
-                peak_point.append(centre)
-            edge = -1
-
-    return peak_point
+    n_scans = len(intensities)
+    maxima = numpy.zeros(intensities.shape, dtype=bool)
+
+    # Positions of the middle of each window
+    n_windows = n_scans - points + 1
+    if n_windows <= 0:
+        return maxima
+
+    if half == 0:
+        raise ValueError("max() arg is an empty sequence")
+
+    mid = intensities[half:half + n_windows]
+
+    # Largest value to the left and right of the middle of each window
+    left = intensities[half - 1:half - 1 + n_windows].copy()
+    right = intensities[half + 1:half + 1 + n_windows].copy()
+    for offset in range(2, half + 1):
+        numpy.maximum(left, intensities[half - offset:half - offset + n_windows], out=left)
+        numpy.maximum(right, intensities[half + offset:half + offset + n_windows], out=right)
+
+    # max in middle
+    peak = (mid > left) & (mid > right)
+    # flat from rise (left of peak?)
+    rising_edge = (mid > left) & (mid == right)
+    # fall from flat
+    falling_edge = (mid == left) & (mid > right)
+
+    maxima[half:half + n_windows] = peak
+
+    # A falling edge marks a peak half way back to the most recent rising edge,
+    # as long as there was no other peak or falling edge in between.
+    window_index = numpy.arange(n_windows)[:, numpy.newaxis]
+    any_edge = peak | rising_edge | falling_edge
+    last_event = numpy.maximum.accumulate(numpy.where(any_edge, window_index, -1), axis=0)
+
+    fall_rows, fall_cols = numpy.nonzero(falling_edge[1:])
+    fall_rows += 1
+    previous = last_event[fall_rows - 1, fall_cols]
+
+    has_edge = previous > -1
+    fall_rows = fall_rows[has_edge]
+    fall_cols = fall_cols[has_edge]
+    previous = previous[has_edge]
+
+    from_rise = rising_edge[previous, fall_cols]
+    centre = (previous[from_rise] + fall_rows[from_rise]) // 2 + half  # mid point
+    maxima[centre, fall_cols[from_rise]] = True
+
+    return maxima
 
 
 def get_maxima_list(ic, points=3):
@@ -240,21 +289,17 @@ def get_maxima_matrix(im, points=3, scans=1):
         raise TypeError("'scans' must be an integer")
 
     numrows, numcols = im.size
-    # zeroed matrix, size numrows*numcols
-    maxima_im = numpy.zeros((numrows, numcols))
     raw_im = im.intensity_array
 
-    for col in range(numcols):  # assume all rows have same width
-        # 1st, find maxima
-        maxima = get_maxima_indices(raw_im[:, col], points)
-        # 2nd, fill intensities
-        for row in maxima:
-            maxima_im[row, col] = raw_im[row, col]
+    # 1st, find maxima, and 2nd, fill intensities
+    maxima_im = numpy.where(_maxima_mask(raw_im, points), raw_im, 0.0)
 
     # combine spectra within 'scans' scans.
     half = int(scans / 2)
+    if scans <= 1:
+        return maxima_im
+
     for row in range(numrows):
-        # tic = 0
         best = 0
         loc = 0
         # find best in scans
@@ -268,9 +313,8 @@ def get_maxima_matrix(im, points=3, scans=1):
         # move and add others to best
         for ii in range(scans):
             if 0 <= row - half + ii < numrows and ii != loc:
-                for col in range(numcols):
-                    maxima_im[row - half + loc, col] += maxima_im[row - half + ii, col]
-                    maxima_im[row - half + ii, col] = 0
+                maxima_im[row - half + loc] += maxima_im[row - half + ii]
+                maxima_im[row - half + ii] = 0
 
     return maxima_im
 
@@ -279,42 +323,46 @@ def num_ions_threshold(pl, n, cutoff, copy_peaks=True):
     """
     Remove Peaks where there are less than a given number of ion intensities above the given threshold
 
-    :param pl: A list of Peak objects
-    :type pl: list
+    :param pl: A list of Peak objects, or a PeakTable
+    :type pl: list or pyms.Peak.Table.PeakTable
     :param n: Minimum number of ions that must have intensities above the cutoff
     :type n: int
     :param cutoff: The minimum intensity threshold
     :type cutoff: int or float
-    :param copy_peaks: Whether a the returned peak list should contain copies of the peaks (Default False)
+    :param copy_peaks: Whether a the returned peak list should contain copies of the peaks (Default False).
+        A PeakTable is always copied.
     :type copy_peaks: bool, optional
 
-    :return: A new list of Peak objects
-    :rtype: list
+    :return: A new list of Peak objects, or a new PeakTable
+    :rtype: list or pyms.Peak.Table.PeakTable
 
     :author: Andrew Isaac
-    :author: Dominic Davis-Foster (type assertions)
+    :author: Dominic Davis-Foster (type assertions, PeakTable support)
     """
 
-    if not is_peak_list(pl):
+    if not isinstance(pl, PeakTable) and not is_peak_list(pl):
         raise TypeError("'pl' must be a list of Peak objects")
     if not isinstance(n, int):
         raise TypeError("'n' must be an integer")
     if not isinstance(cutoff, Number):
         raise TypeError("'cutoff' must be a number")
 
-    if copy_peaks:
-        pl = copy.deepcopy(pl)
+    if isinstance(pl, PeakTable):
+        return pl[numpy.count_nonzero(pl.spectra >= cutoff, axis=1) >= n]
 
-    new_pl = []
-    for p in pl:
-        ms = p.mass_spectrum
-        ia = ms.mass_spec
-        ions = 0
-        for i in range(len(ia)):
-            if ia[i] >= cutoff:
-                ions += 1
-        if ions >= n:
-            new_pl.append(p)
+    spectra = _stack_spectra(pl)
+
+    if spectra is None:
+        # The spectra differ in length, so count the ions of each separately
+        n_ions = [numpy.count_nonzero(_stack_spectra([p]) >= cutoff) for p in pl]
+    else:
+        n_ions = numpy.count_nonzero(spectra >= cutoff, axis=1)
+
+    new_pl = [p for p, ions in zip(pl, n_ions) if ions >= n]
+
+    if copy_peaks:
+        # Only the peaks which are kept are copied
+        new_pl = [_copy_peak(p, copy.copy(p._mass_spectrum)) for p in new_pl]
 
     return new_pl
 
@@ -323,21 +371,21 @@ def rel_threshold(pl, percent=2, copy_peaks=True):
     """
     Remove ions with relative intensities less than the given relative percentage of the maximum intensity.
 
-    :param pl: A list of Peak objects
-    :type pl: list
+    :param pl: A list of Peak objects, or a PeakTable
+    :type pl: list or pyms.Peak.Table.PeakTable
     :param percent: Threshold for relative percentage of intensity (Default 2%)
     :type percent: float, optional
     :param copy_peaks: Whether a the returned peak list should contain copies of the peaks (Default False)
     :type copy_peaks: bool, optional
 
-    :return: A new list of Peak objects with threshold ions
-    :rtype: list
+    :return: A new list of Peak objects with threshold ions, or a PeakTable
+    :rtype: list or pyms.Peak.Table.PeakTable
 
     :author: Andrew Isaac
-    :author: Dominic Davis-Foster (type assertions)
+    :author: Dominic Davis-Foster (type assertions, PeakTable support)
     """
 
-    if not is_peak_list(pl):
+    if not isinstance(pl, PeakTable) and not is_peak_list(pl):
         raise TypeError("'pl' must be a list of Peak objects")
     if not isinstance(percent, (int, float)):
         raise TypeError("'percent' must be a number > 0")
@@ -345,25 +393,106 @@ def rel_threshold(pl, percent=2, copy_peaks=True):
     if percent <= 0:
         raise ValueError("'percent' must be a number > 0")
 
-    if copy_peaks:
-        pl = copy.deepcopy(pl)
+    if isinstance(pl, PeakTable):
+        if copy_peaks:
+            pl = pl.copy()
+
+        pl.spectra = _rel_threshold_spectra(pl.spectra, percent)
+
+        return pl
+
+    if not pl:
+        return []
+
+    spectra = _stack_spectra(pl)
+
+    if spectra is None:
+        # The spectra differ in length, so threshold each separately
+        return [rel_threshold([p], percent, copy_peaks)[0] for p in pl]
+
+    spectra = _rel_threshold_spectra(spectra, percent)
+    mass_lists = [p._mass_spectrum.mass_array for p in pl]
+    uids = _make_uids(numpy.array([p.rt for p in pl]), numpy.array(mass_lists), spectra)
 
     new_pl = []
-    for p in pl:
-        ms = p.mass_spectrum
-        ia = ms.mass_spec
-        # assume max(ia) big so /100 1st
-        cutoff = (max(ia) / 100.0) * float(percent)
-        for i in range(len(ia)):
-            if ia[i] < cutoff:
-                ia[i] = 0
-        ms.mass_spec = ia
-        p.mass_spectrum = ms
+    for p, mass_list, intensities, uid in zip(pl, mass_lists, spectra, uids):
+        ms = MassSpectrum._from_sorted(mass_list.copy(), intensities)
+
+        if copy_peaks:
+            p = _copy_peak(p, ms)
+
+        p._set_mass_spectrum(ms, uid)
         new_pl.append(p)
 
     return new_pl
 
 
+def _rel_threshold_spectra(spectra, percent):
+    """
+    Sets intensities less than the given percentage of the largest intensity
+    in each row of the spectra to zero
+
+    :param spectra: Intensities, with one row per mass spectrum
+    :type spectra: numpy.ndarray
+    :param percent: Threshold for relative percentage of intensity
+    :type percent: float
+
+    :return: The new intensities
+    :rtype: numpy.ndarray
+
+    :author: Dominic Davis-Foster
+    """
+
+    # assume max(ia) big so /100 1st
+    cutoff = (spectra.max(axis=1, initial=0) / 100.0) * float(percent)
+    return numpy.where(spectra < cutoff[:, None], 0, spectra)
+
+
+def _stack_spectra(pl):
+    """
+    Returns the intensities of the peaks' mass spectra as the rows of one array,
+    or :py:obj:`None` if the mass spectra differ in length
+
+    :param pl: A list of Peak objects with mass spectra
+    :type pl: list
+
+    :rtype: numpy.ndarray or None
+
+    :author: Dominic Davis-Foster
+    """
+
+    spectra = [p._mass_spectrum.mass_spec for p in pl]
+
+    if not spectra:
+        return numpy.empty((0, 0))
+    if len({len(intensities) for intensities in spectra}) > 1:
+        return None
+
+    return numpy.array(spectra, dtype=float).reshape(len(spectra), -1)
+
+
+def _copy_peak(peak, ms):
+    """
+    Returns a copy of a peak with the given mass spectrum, without deep-copying the rest of the peak
+
+    :param peak: The peak to copy
+    :type peak: pyms.Peak.Class.Peak
+    :param ms: The mass spectrum for the copy
+    :type ms: pyms.Spectrum.MassSpectrum
+
+    :rtype: pyms.Peak.Class.Peak
+
+    :author: Dominic Davis-Foster
+    """
+
+    new_peak = copy.copy(peak)
+    new_peak._pt_bounds = copy.copy(peak._pt_bounds)
+    new_peak._ion_areas = copy.copy(peak._ion_areas)
+    new_peak._mass_spectrum = ms
+
+    return new_peak
+
+
 def sum_maxima(im, points=3, scans=1):
     """
     Reconstruct the TIC as sum of maxima
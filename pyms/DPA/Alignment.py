@@ -24,7 +24,6 @@ Classes for peak alignment by dynamic programming
 ################################################################################
 
 # stdlib
-import copy
 import math
 import operator
 import pathlib
@@ -54,22 +53,29 @@ class Alignment:
 	"""
 	Models an alignment of peak lists
 
+	The peaks of each experiment are held in a columnar table of retention times,
+	areas and mass spectra, and each position of the alignment is stored as the
+	index of its peak in each table, or -1 for a gap.
+
 	:param expr: The experiment to be converted into an alignment object
 	:type expr: pyms.Experiment.Experiment
 
 	:author: Woon Wai Keen
 	:author: Qiao Wang
 	:author: Vladimir Likic
-	:author: Dominic Davis-Foster (type assertions and pathlib support)
+	:author: Dominic Davis-Foster (type assertions, pathlib support and array storage)
 	"""
 
 	def __init__(self, expr):
 		"""
 		Models an alignment of peak lists
 		"""
+
+		self._peak_indices = numpy.zeros((0, 0), dtype=numpy.int32)
+		self._peakpos = None
+
 		if expr is None:
-			self.peakpos = []
-			self.peakalgt = []
+			self._peak_tables = []
 			self.expr_code = []
 			self.similarity = None
 		else:
@@ -78,8 +84,8 @@ class Alignment:
 			# for peak in expr.get_peak_list():
 			#    if peak.get_area() == None or peak.get_area() <= 0:
 			#        error("All peaks must have an area for alignment")
-			self.peakpos = [copy.deepcopy(expr.peak_list)]
-			self.peakalgt = numpy.transpose(self.peakpos)
+			self._peak_tables = [_PeakTable(expr.peak_list)]
+			self.peak_indices = numpy.arange(len(expr.peak_list), dtype=numpy.int32)[numpy.newaxis, :]
 			self.expr_code = [expr.expr_code]
 			self.similarity = None
 
@@ -92,7 +98,127 @@ class Alignment:
 		:author: Vladimir Likic
 		"""
 
-		return len(self.peakalgt)
+		return self._peak_indices.shape[1]
+
+	@property
+	def peak_indices(self):
+		"""
+		The index of the peak of each experiment at each position of the alignment,
+		or -1 where the experiment has a gap
+
+		:return: Array of shape ``(experiments, positions)``
+		:rtype: numpy.ndarray
+		"""
+
+		return self._peak_indices
+
+	@peak_indices.setter
+	def peak_indices(self, value):
+		"""
+		Sets the index of the peak of each experiment at each position of the alignment
+
+		:param value: Array of shape ``(experiments, positions)``, with -1 for gaps
+		:type value: numpy.ndarray
+		"""
+
+		self._peak_indices = numpy.asarray(value, dtype=numpy.int32)
+		self._peakpos = None
+
+	@property
+	def peakpos(self):
+		"""
+		The peaks of each experiment at each position of the alignment,
+		or :py:obj:`None` where the experiment has a gap
+
+		:return: Object array of shape ``(experiments, positions)``
+		:rtype: numpy.ndarray
+		"""
+
+		if self._peakpos is None:
+			peakpos = numpy.empty(self._peak_indices.shape, dtype=object)
+
+			for row, table, indices in zip(peakpos, self._peak_tables, self._peak_indices):
+				peaks = numpy.empty(len(table.peaks), dtype=object)
+				peaks[:] = table.peaks
+				present = indices >= 0
+				row[present] = peaks[indices[present]]
+
+			self._peakpos = peakpos
+
+		return self._peakpos
+
+	@peakpos.setter
+	def peakpos(self, value):
+		"""
+		Sets the peaks of each experiment at each position of the alignment
+
+		:param value: The peaks of each experiment, with :py:obj:`None` for gaps
+		:type value: list of list of pyms.Peak.Class.Peak
+		"""
+
+		n_positions = len(value[0]) if len(value) else 0
+		indices = numpy.full((len(value), n_positions), -1, dtype=numpy.int32)
+		tables = []
+
+		for row, peaks in zip(indices, value):
+			present = numpy.array([peak is not None for peak in peaks], dtype=bool)
+			row[present] = numpy.arange(numpy.count_nonzero(present))
+			tables.append(_PeakTable([peak for peak in peaks if peak is not None]))
+
+		self._peak_tables = tables
+		self.peak_indices = indices
+
+	@property
+	def peakalgt(self):
+		"""
+		The peaks at each position of the alignment, or :py:obj:`None` where an experiment has a gap
+
+		:return: Object array of shape ``(positions, experiments)``
+		:rtype: numpy.ndarray
+		"""
+
+		return self.peakpos.T
+
+	@peakalgt.setter
+	def peakalgt(self, value):
+		"""
+		Sets the peaks at each position of the alignment
+
+		:param value: The peaks at each position, with :py:obj:`None` for gaps
+		:type value: list of list of pyms.Peak.Class.Peak
+		"""
+
+		self.peakpos = [list(peaks) for peaks in zip(*value)]
+
+	def _rt_matrix(self):
+		"""
+		Returns the retention times of the peaks of each experiment at each
+		position of the alignment, with :py:obj:`numpy.nan` for gaps
+
+		:return: Array of shape ``(experiments, positions)``
+		:rtype: numpy.ndarray
+		"""
+
+		rt = numpy.full(self._peak_indices.shape, numpy.nan)
+
+		for row, table, indices in zip(rt, self._peak_tables, self._peak_indices):
+			present = indices >= 0
+			row[present] = table.rt[indices[present]]
+
+		return rt
+
+	def _sort_by_rt(self):
+		"""
+		Sorts the positions of the alignment by the average retention time of their peaks
+
+		:author: Dominic Davis-Foster
+		"""
+
+		present = self._peak_indices >= 0
+		rt_sum = numpy.where(present, self._rt_matrix(), 0.0).sum(axis=0)
+		rt_avg = rt_sum / numpy.count_nonzero(present, axis=0)
+
+		self.peak_indices = self._peak_indices[:, numpy.argsort(rt_avg, kind="stable")]
 
 	def aligned_peaks(self, minutes=False):
 		"""
@@ -220,20 +346,14 @@ class Alignment:
 		:type min_peaks: int
 
 		:author: Qiao Wang
+		:author: Dominic Davis-Foster (vectorisation)
 		"""
 
 		if not isinstance(min_peaks, int):
 			raise TypeError("'min_peaks' must be an integer")
 
-		filtered_list = []
-
-		for pos in range(len(self.peakalgt)):
-			# if len(filter(None,self.peakalgt[pos])) >= min_peaks:
-			if len([x for x in self.peakalgt[pos] if x is not None]) >= min_peaks:
-				filtered_list.append(self.peakalgt[pos])
-
-		self.peakalgt = filtered_list
-		self.peakpos = numpy.transpose(self.peakalgt)
+		n_peaks = numpy.count_nonzero(self._peak_indices >= 0, axis=0)
+		self.peak_indices = self._peak_indices[:, n_peaks >= min_peaks]
 
 	@staticmethod
 	def get_highest_mz_ion(ion_dict):
@@ -711,6 +831,57 @@ class Alignment:
 		return area_alignment
 
 
+class _PeakTable:
+	"""
+	The retention times, areas and mass spectra of the peaks of one experiment in an alignment
+
+	The peaks themselves are not copied.
+
+	:param peaks: The peaks of the experiment
+	:type peaks: list of pyms.Peak.Class.Peak
+
+	:author: Dominic Davis-Foster
+	"""
+
+	__slots__ = ["peaks", "rt", "area", "_spectra"]
+
+	def __init__(self, peaks):
+		"""
+		The peaks of one experiment in an alignment
+		"""
+
+		self.peaks = list(peaks)
+		self.rt = numpy.array([peak.rt for peak in self.peaks], dtype=float)
+		self.area = numpy.array([numpy.nan if peak.area is None else peak.area for peak in self.peaks], dtype=float)
+		self._spectra = None
+
+	def __len__(self):
+		return len(self.peaks)
+
+	@property
+	def spectra(self):
+		"""
+		The mass spectra of the peaks, calculated the first time they are needed
+
+		:return: Array of shape ``(peaks, masses)``
+		:rtype: numpy.ndarray
+		"""
+
+		if self._spectra is None:
+			mass_specs = [peak.mass_spectrum.mass_spec for peak in self.peaks]
+
+			if len({len(mass_spec) for mass_spec in mass_specs}) > 1:
+				raise ValueError("""Mass Spectra are of different lengths.
+Use IntensityMatrix.crop_mass() to set same length for all Mass Spectra""")
+
+			if mass_specs:
+				self._spectra = numpy.array(mass_specs, dtype=float)
+			else:
+				self._spectra = numpy.zeros((0, 0))
+
+		return self._spectra
+
+
 def exprl2alignment(expr_list):
 	"""
 	Converts experiments into alignments
@@ -25,8 +25,9 @@ Classes for peak alignment by dynamic programming
 
 # stdlib
 import copy
-import math
 import functools
+import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # 3rd party
 import numpy
@@ -46,7 +47,15 @@ except ModuleNotFoundError:
 Please install one of them and try again.""")
 
 # this package
-from pyms.DPA.Alignment import Alignment
+from pyms.DPA.Alignment import Alignment, exprl2alignment
+from pyms.Utils.Executor import MPIExecutor, SerialExecutor, get_executor
+
+# Tolerance of the retention time weighting of position_similarity, 1/1000.
+# Peaks further apart than D * sqrt(-2 * ln(_TOL)) are considered not to match.
+_TOL = 0.001
+
+# The maximum number of pairs of peaks scored at once by score_matrix
+_SCORE_BLOCK_ELEMENTS = 2 ** 22
 
 
 class PairwiseAlignment:
@@ -59,12 +68,21 @@ class PairwiseAlignment:
 	:type D: float
 	:param gap: Gap parameter for pairwise alignments
 	:type gap: float
+	:param n_workers: The number of processes (or threads) to calculate the pairwise
+		alignments with. If :py:obj:`None` they are calculated in the calling thread.
+	:type n_workers: int, optional
+	:param use_processes: Whether to use a pool of processes rather than threads
+	:type use_processes: bool, optional
+	:param progress: A function to call after each pairwise alignment, with the
+		number of pairwise alignments done and the total number
+	:type progress: callable, optional
 
 	:author: Woon Wai Keen
 	:author: Vladimir Likic
+	:author: Dominic Davis-Foster (parallelisation)
 	"""
 
-	def __init__(self, alignments, D, gap):
+	def __init__(self, alignments, D, gap, n_workers=None, use_processes=True, progress=None):
 		"""
 		Models pairwise alignment of alignments
 		"""
@@ -75,10 +93,17 @@ class PairwiseAlignment:
 			raise TypeError("'D' must be a float")
 		if not isinstance(gap, float):
 			raise TypeError("'gap' must be a float")
+		if n_workers is not None and not isinstance(n_workers, int):
+			raise TypeError("'n_workers' must be an integer")
+		if progress is not None and not callable(progress):
+			raise TypeError("'progress' must be callable")
 
 		self.alignments = alignments
 		self.D = D
 		self.gap = gap
+		self.n_workers = n_workers
+		self.use_processes = use_processes
+		self.progress = progress
 
 		self._sim_matrix()
 		self._dist_matrix()
@@ -88,8 +113,12 @@ class PairwiseAlignment:
 		"""
 		Calculates the similarity matrix for the set of alignments
 
+		Each alignment is converted to arrays of retention times and mass
+		spectra once, and only these arrays are sent to the worker processes.
+
 		:author: Woon Wai Keen
 		:author: Vladimir Likic
+		:author: Dominic Davis-Foster (parallelisation)
 		"""
 
 		n = len(self.alignments)
@@ -100,13 +129,44 @@ class PairwiseAlignment:
 
 		self.sim_matrix = numpy.zeros((n, n), dtype='f')
 
-		# Could we parallelize this pairwise alignment loop??
-		for i in range(n - 1):
-			for j in range(i + 1, n):
-				ma = align(self.alignments[i], self.alignments[j], self.D, self.gap)
-				self.sim_matrix[i, j] = self.sim_matrix[j, i] = ma.similarity
-				total_n = total_n - 1
-				print(f" -> {total_n:d} pairs remaining")
+		arrays = [_position_arrays(alignment) for alignment in self.alignments]
+		pairs = [(i, j) for i in range(n - 1) for j in range(i + 1, n)]
+
+		if self.n_workers is None:
+			similarities = map(functools.partial(_pair_similarity, arrays, self.D, self.gap), pairs)
+			self._fill_sim_matrix(pairs, similarities, total_n)
+
+		elif self.use_processes:
+			with ProcessPoolExecutor(
+					max_workers=self.n_workers,
+					initializer=_init_similarity_worker,
+					initargs=(arrays, self.D, self.gap),
+					) as executor:
+				chunksize = max(1, total_n // (4 * self.n_workers))
+				similarities = executor.map(_worker_pair_similarity, pairs, chunksize=chunksize)
+				self._fill_sim_matrix(pairs, similarities, total_n)
+
+		else:
+			with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+				similarities = executor.map(functools.partial(_pair_similarity, arrays, self.D, self.gap), pairs)
+				self._fill_sim_matrix(pairs, similarities, total_n)
+
+	def _fill_sim_matrix(self, pairs, similarities, total_n):
+		"""
+		Fills the similarity matrix with the similarities of the pairs of alignments as they arrive
+
+		:param pairs: The indices of the pairs of alignments
+		:type pairs: list of tuple
+		:param similarities: The similarity of each pair
+		:type similarities: ~collections.abc.Iterable[float]
+		:param total_n: The total number of pairs
+		:type total_n: int
+		"""
+
+		for done, ((i, j), similarity) in enumerate(zip(pairs, similarities), start=1):
+			self.sim_matrix[i, j] = self.sim_matrix[j, i] = similarity
+			if self.progress is not None:
+				self.progress(done, total_n)
 
 	def _dist_matrix(self):
 		"""
@@ -139,7 +199,7 @@ class PairwiseAlignment:
 		print("Done")
 
 
-def align(a1, a2, D, gap):
+def align(a1, a2, D, gap, executor=None):
 	"""
 	Aligns two alignments
 
@@ -151,6 +211,9 @@ def align(a1, a2, D, gap):
 	:type D: float
 	:param gap: Gap penalty
 	:type gap: float
+	:param executor: The executor to calculate the score matrix with.
+		See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
 
 	:return: Aligned alignments
 	:rtype: pyms.Peak.List.Class.Alignment
@@ -159,12 +222,9 @@ def align(a1, a2, D, gap):
 	:author: Vladimir Likic
 	"""
 
-	# comm = MPI.COMM_WORLD
-	# rank = comm.Get_rank()
-
-	# calculate score matrix for two alignments
-	M = score_matrix(a1, a2, D)
-	# print("calculated score matrix on rank", rank)
+	# calculate score matrix for two alignments, skipping the pairs of
+	# positions too far apart in retention time to match
+	M = score_matrix(a1, a2, D, band=rt_band(a1, a2, D), executor=executor)
 
 	# run dynamic programming
 	result = dp(M, gap)
@@ -178,43 +238,299 @@ def align(a1, a2, D, gap):
 	return ma
 
 
-def score_matrix(a1, a2, D):
+def _pair_similarity(arrays, D, gap, pair):
+	"""
+	Calculates the similarity score of a pair of alignments,
+	as :func:`pyms.DPA.PairwiseAlignment.align` would
+
+	:param arrays: The arrays returned by :func:`pyms.DPA.PairwiseAlignment._position_arrays`
+		for each alignment
+	:type arrays: list of tuple
+	:param D: Retention time tolerance
+	:type D: float
+	:param gap: Gap penalty
+	:type gap: float
+	:param pair: The indices of the two alignments in ``arrays``
+	:type pair: tuple
+
+	:rtype: float
+	"""
+
+	arrays1, arrays2 = arrays[pair[0]], arrays[pair[1]]
+
+	M = _score_positions(arrays1, arrays2, D, band=_position_band(arrays1, arrays2, D))
+	result = dp(M, gap)
+
+	return alignment_similarity(result['trace'], M, gap)
+
+
+# The arrays of the alignments, and D and gap, in each worker process
+_worker_state = {}
+
+
+def _init_similarity_worker(arrays, D, gap):
+	"""
+	Stores the arrays of the alignments in a worker process, so only the
+	indices of each pair need to be sent with each task.
+	"""
+
+	_worker_state["args"] = (arrays, D, gap)
+
+
+def _worker_pair_similarity(pair):
+	"""
+	Calculates the similarity score of a pair of alignments in a worker process
+	"""
+
+	return _pair_similarity(*_worker_state["args"], pair)
+
+
+def score_matrix(a1, a2, D, band=None, executor=None):
 	"""
 	Calculates the score matrix between two alignments
 
+	This gives the same scores as calling :func:`pyms.DPA.PairwiseAlignment.position_similarity`
+	for every pair of positions, but the cosine similarities between the spectra
+	of all the peaks are calculated as a single matrix multiplication.
+
 	:param a1: The first alignment
 	:type a1: pyms.DPA.Alignment.Alignment
 	:param a2: The second alignment
 	:type a2: pyms.DPA.Alignment.Alignment
 	:param D: Retention time tolerance
 	:type D: float
+	:param band: Boolean matrix of the pairs of positions to calculate the
+		similarity of, as returned by :func:`pyms.DPA.PairwiseAlignment.rt_band`.
+		The other pairs are given the worst score of 1.
+		If :py:obj:`None` the similarity of every pair is calculated.
+	:type band: numpy.ndarray, optional
+	:param executor: The executor to calculate the rows of the score matrix with.
+		See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
 
 	:return: Aligned alignments
 	:rtype: pyms.DPA.Alignment.Alignment
 
 	:author: Qiao Wang
 	:author: Andrew Isaac
+	:author: Dominic Davis-Foster (vectorisation and executors)
+	"""
+
+	arrays1 = _position_arrays(a1)
+	arrays2 = _position_arrays(a2)
+
+	executor = get_executor(executor)
+	if isinstance(executor, SerialExecutor):
+		return _score_positions(arrays1, arrays2, D, band)
+
+	M = numpy.empty((len(arrays1[0]), len(arrays2[0])))
+	executor.fill_rows(_score_rows, M, arrays1, arrays2, D, band)
+
+	return M
+
+
+def _score_rows(start, stop, arrays1, arrays2, D, band):
+	"""
+	Calculates rows ``start`` to ``stop`` of the score matrix between two alignments,
+	for :meth:`pyms.Utils.Executor.Executor.fill_rows`
+	"""
+
+	rt1, spectra1, present1 = arrays1
+	arrays1 = (rt1[start:stop], spectra1[start:stop], present1[start:stop])
+
+	if band is not None:
+		band = band[start:stop]
+
+	return _score_positions(arrays1, arrays2, D, band)
+
+
+def _score_positions(arrays1, arrays2, D, band=None):
+	"""
+	Calculates the score matrix between two alignments from the arrays
+	returned by :func:`pyms.DPA.PairwiseAlignment._position_arrays`
+
+	:type arrays1: tuple of numpy.ndarray
+	:type arrays2: tuple of numpy.ndarray
+	:type D: float
+	:type band: numpy.ndarray, optional
+
+	:rtype: numpy.ndarray
 	"""
 
-	# sim_score = 0
+	rt1, spectra1, present1 = arrays1
+	rt2, spectra2, present2 = arrays2
 
-	score_matrix = numpy.zeros((len(a1.peakalgt), len(a2.peakalgt)))
+	if spectra1.shape[2] != spectra2.shape[2]:
+		raise ValueError("""Mass Spectra are of different lengths.
+Use IntensityMatrix.crop_mass() to set same length for all Mass Spectra""")
+
+	n_positions1, n_peaks1, spectrum_length = spectra1.shape
+	n_positions2, n_peaks2, _ = spectra2.shape
 
-	for i, algt1pos in enumerate(a1.peakalgt):
-		for j, algt2pos in enumerate(a2.peakalgt):
-			sim_score = position_similarity(algt1pos, algt2pos, D)
-			score_matrix[i][j] = sim_score
+	score_matrix = numpy.ones((n_positions1, n_positions2))
+
+	# The number of pairs of peaks at each pair of positions
+	count = numpy.count_nonzero(present1, axis=1)[:, numpy.newaxis] * numpy.count_nonzero(present2, axis=1)
+	cutoff = D * math.sqrt(-2.0 * math.log(_TOL))
+
+	# Score the positions of a1 in blocks to limit the size of the intermediate arrays
+	block_size = max(1, _SCORE_BLOCK_ELEMENTS // max(1, n_peaks1 * n_positions2 * n_peaks2))
+
+	for start in range(0, n_positions1, block_size):
+		stop = min(start + block_size, n_positions1)
+
+		# Only the columns spanned by the band need calculating
+		if band is None:
+			lo, hi = 0, n_positions2
+		else:
+			columns = numpy.flatnonzero(band[start:stop].any(axis=0))
+			if not len(columns):
+				continue
+			lo, hi = columns[0], columns[-1] + 1
+
+		cos = numpy.dot(
+				spectra1[start:stop].reshape(-1, spectrum_length),
+				spectra2[lo:hi].reshape(-1, spectrum_length).T,
+				).reshape(stop - start, n_peaks1, hi - lo, n_peaks2)
+
+		rt_diff = rt1[start:stop, :, numpy.newaxis, numpy.newaxis] - rt2[lo:hi]
+		rtime = numpy.exp(-(rt_diff / float(D)) ** 2 / 2.0)
+
+		# NB score of 1 is worst
+		scores = numpy.where(numpy.abs(rt_diff) > cutoff, 1.0, 1.0 - (cos * rtime))
+		present = present1[start:stop, :, numpy.newaxis, numpy.newaxis] & present2[lo:hi]
+		total = numpy.where(present, scores, 0.0).sum(axis=(1, 3))
+
+		block_count = count[start:stop, lo:hi]
+		score_matrix[start:stop, lo:hi] = numpy.where(
+				block_count > 0,
+				total / numpy.maximum(block_count, 1),
+				1.0,
+				)
 
 	return score_matrix
 
 
+def _position_arrays(alignment):
+	"""
+	Returns the retention times and normalised mass spectra of the peaks
+	at each position of an alignment, and whether each peak is present.
+
+	The arrays are calculated once and stored on the alignment, until its positions change.
+
+	:type alignment: pyms.DPA.Alignment.Alignment
+
+	:return: Arrays of shape ``(positions, peaks)``, ``(positions, peaks, masses)``
+		and ``(positions, peaks)``
+	:rtype: tuple of numpy.ndarray
+	"""
+
+	cached = getattr(alignment, "_position_arrays", None)
+	if cached is not None and cached[0] is alignment.peak_indices:
+		return cached[1]
+
+	indices = alignment.peak_indices.T
+	n_positions, n_peaks = indices.shape
+
+	spectrum_lengths = {table.spectra.shape[1] for table in alignment._peak_tables if len(table)}
+	if len(spectrum_lengths) > 1:
+		raise ValueError("""Mass Spectra are of different lengths.
+Use IntensityMatrix.crop_mass() to set same length for all Mass Spectra""")
+	spectrum_length = spectrum_lengths.pop() if spectrum_lengths else 0
+
+	rt = numpy.zeros((n_positions, n_peaks))
+	spectra = numpy.zeros((n_positions, n_peaks, spectrum_length))
+	present = indices >= 0
+
+	for j, table in enumerate(alignment._peak_tables):
+		rows = present[:, j]
+		rt[rows, j] = table.rt[indices[rows, j]]
+		spectra[rows, j] = table.spectra[indices[rows, j]]
+
+	norm = numpy.sqrt(numpy.sum(spectra ** 2, axis=2, keepdims=True))
+	spectra = numpy.divide(spectra, norm, out=numpy.zeros_like(spectra), where=norm > 0)
+
+	arrays = (rt, spectra, present)
+	alignment._position_arrays = (alignment.peak_indices, arrays)
+
+	return arrays
+
+
+def rt_band(a1, a2, D):
+	"""
+	Finds the pairs of positions of two alignments which contain at least one
+	pair of peaks within the retention time cutoff of
+	:func:`pyms.DPA.PairwiseAlignment.position_similarity`.
+
+	Every other pair of positions has the worst score of 1,
+	so its similarity does not need to be calculated.
+
+	:param a1: The first alignment
+	:type a1: pyms.DPA.Alignment.Alignment
+	:param a2: The second alignment
+	:type a2: pyms.DPA.Alignment.Alignment
+	:param D: Retention time tolerance
+	:type D: float
+
+	:return: Boolean matrix of the pairs of positions
+	:rtype: numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	return _position_band(_position_arrays(a1), _position_arrays(a2), D)
+
+
+def _position_band(arrays1, arrays2, D):
+	"""
+	Finds the pairs of positions of two alignments which might be in range, from the arrays
+	returned by :func:`pyms.DPA.PairwiseAlignment._position_arrays`
+
+	:type arrays1: tuple of numpy.ndarray
+	:type arrays2: tuple of numpy.ndarray
+	:type D: float
+
+	:rtype: numpy.ndarray
+	"""
+
+	rt_min1, rt_max1 = _rt_range(arrays1)
+	rt_min2, rt_max2 = _rt_range(arrays2)
+
+	# Widen the cutoff slightly so rounding can never exclude a pair that is in range
+	cutoff = D * math.sqrt(-2.0 * math.log(_TOL))
+	cutoff += 1e-9 * (cutoff + max(numpy.abs(rt_max1).max(initial=0), numpy.abs(rt_max2).max(initial=0)))
+
+	return (rt_min1[:, numpy.newaxis] - cutoff <= rt_max2) & (rt_min2 <= rt_max1[:, numpy.newaxis] + cutoff)
+
+
+def _rt_range(arrays):
+	"""
+	Returns the minimum and maximum retention times of the peaks at each position of an alignment
+
+	:param arrays: The arrays returned by :func:`pyms.DPA.PairwiseAlignment._position_arrays`
+	:type arrays: tuple of numpy.ndarray
+
+	:rtype: tuple of numpy.ndarray
+	"""
+
+	rt, _, present = arrays
+
+	rt_min = numpy.where(present, rt, numpy.inf).min(axis=1, initial=numpy.inf)
+	rt_max = numpy.where(present, rt, -numpy.inf).max(axis=1, initial=-numpy.inf)
+
+	return rt_min, rt_max
+
+
 def dp(S, gap_penalty):
 	"""
 	Solves optimal path in score matrix based on global sequence
 		alignment
 
+	The cost matrix is filled one anti-diagonal at a time, as every cell on an
+	anti-diagonal only depends on the two anti-diagonals before it.
+
 	:param S: Score matrix
-	:type S:
+	:type S: numpy.ndarray
 	:param gap_penalty: Gap penalty
 	:type gap_penalty: float
 
@@ -222,10 +538,8 @@ def dp(S, gap_penalty):
 	:rtype: dict
 
 	:author: Tim Erwin
+	:author: Dominic Davis-Foster (vectorisation)
 	"""
-	# comm = MPI.COMM_WORLD
-	# rank = comm.Get_rank()
-	# print " In DP.py, I am rank", rank
 
 	try:
 		row_length = len(S[:, 0])
@@ -235,37 +549,49 @@ def dp(S, gap_penalty):
 
 	# D contains the score of the optimal alignment
 	D = numpy.zeros((row_length + 1, col_length + 1), dtype='d')
-	for i in range(1, row_length + 1):
-		D[i, 0] = gap_penalty * i
-	for j in range(1, col_length + 1):
-		D[0, j] = gap_penalty * j
+	D[1:, 0] = gap_penalty * numpy.arange(1, row_length + 1)
+	D[0, 1:] = gap_penalty * numpy.arange(1, col_length + 1)
 	D[0, 0] = 0.0
-	D[1:(row_length + 1), 1:(col_length + 1)] = S.copy()
+	D[1:(row_length + 1), 1:(col_length + 1)] = S
 
 	# Directions for trace
 	# 0 - match               (move diagonal)
 	# 1 - peaks1 has no match (move up)
 	# 2 - peaks2 has no match (move left)
 	# 3 - stop
-	trace_matrix = numpy.zeros((row_length + 1, col_length + 1))
+	trace_matrix = numpy.zeros((row_length + 1, col_length + 1), dtype=numpy.int8)
 	trace_matrix[:, 0] = 1
 	trace_matrix[0, :] = 2
 	trace_matrix[0, 0] = 3
 
-	for i in range(1, row_length + 1):
-		for j in range(1, col_length + 1):
-			#
-			# Needleman-Wunsch Algorithm assuming a score function S(x,x)=0
-			#
-			#              | D[i-1,j-1] + S(i,j)
-			# D[i,j] = min | D(i-1,j] + gap
-			#              | D[i,j-1] + gap
-			#
-
-			darray = [D[i - 1, j - 1] + S[i - 1, j - 1], D[i - 1, j] + gap_penalty, D[i, j - 1] + gap_penalty]
-			D[i, j] = min(darray)
-			# Store direction in trace matrix
-			trace_matrix[i, j] = darray.index(D[i, j])
+	#
+	# Needleman-Wunsch Algorithm assuming a score function S(x,x)=0
+	#
+	#              | D[i-1,j-1] + S(i,j)
+	# D[i,j] = min | D(i-1,j] + gap
+	#              | D[i,j-1] + gap
+	#
+	# In the flattened matrices the cells (i, k-i) of anti-diagonal k are
+	# evenly spaced, 'col_length' apart, so each anti-diagonal is a strided slice.
+	D_flat = D.reshape(-1)
+	trace_flat = trace_matrix.reshape(-1)
+	up_offset = col_length + 1
+	diagonal_offset = col_length + 2
+
+	for k in range(2, row_length + col_length + 1):
+		first_row = max(1, k - col_length)
+		last_row = min(row_length, k - 1)
+		start = k + first_row * col_length
+		stop = k + last_row * col_length + 1
+
+		match = D_flat[start - diagonal_offset:stop - diagonal_offset:col_length] + D_flat[start:stop:col_length]
+		up = D_flat[start - up_offset:stop - up_offset:col_length] + gap_penalty
+		left = D_flat[start - 1:stop - 1:col_length] + gap_penalty
+
+		# Ties are resolved in the order match, up, left
+		best = numpy.minimum(numpy.minimum(match, up), left)
+		D_flat[start:stop:col_length] = best
+		trace_flat[start:stop:col_length] = numpy.where(match == best, 0, numpy.where(up == best, 1, 2))
 
 	# Trace back from bottom right
 	trace = []
@@ -288,7 +614,7 @@ def dp(S, gap_penalty):
 			j = j - 1
 		p.append(i - 1)
 		q.append(j - 1)
-		trace.append(direction)
+		trace.append(int(direction))
 		direction = trace_matrix[i, j]
 
 	# remove 'stop' entry
@@ -327,8 +653,6 @@ def position_similarity(pos1, pos2, D):
 	count = 0
 
 	# Attempt to speed up by only calculating 'in-range' values
-	# set tolerance to 1/1000
-	_TOL = 0.001
 	cutoff = D * math.sqrt(-2.0 * math.log(_TOL))
 
 	for a in pos1:
@@ -390,55 +714,44 @@ def merge_alignments(A1, A2, traces):
 	:author: Woon Wai Keen
 	:author: Vladimir Likic
 	:author: Qiao Wang
+	:author: Dominic Davis-Foster (vectorisation)
 	"""
 
 	# Create object to hold new merged alignment and fill in its expr_codes
 	ma = Alignment(None)
 	ma.expr_code = A1.expr_code + A2.expr_code
-
-	# create empty lists of dimension |A1| + |A2|
-	dimension = len(A1.peakpos) + len(A2.peakpos)
-	merged = [[] for _ in range(dimension)]
-	A1 = A1.peakpos
-	A2 = A2.peakpos
-
-	idx1 = idx2 = 0
+	ma._peak_tables = A1._peak_tables + A2._peak_tables
 
 	# trace can either be 0, 1, or 2
 	# if it is 0, there are no gaps. otherwise, if it is 1 or 2,
 	# there is a gap in A2 or A1 respectively.
+	traces = numpy.asarray(traces, dtype=int)
+	from_A1 = numpy.where(traces != 2, numpy.cumsum(traces != 2) - 1, -1)
+	from_A2 = numpy.where(traces != 1, numpy.cumsum(traces != 1) - 1, -1)
 
-	for trace in traces:
-
-		if trace in {0, 1}:
-			for i, _ in enumerate(A1):
-				merged[i].append(A1[i][idx1])
+	ma.peak_indices = numpy.vstack([_take_positions(A1, from_A1), _take_positions(A2, from_A2)])
 
-			idx1 = idx1 + 1
+	# sort according to average peak
+	ma._sort_by_rt()
 
-		elif trace == 2:
-			for i, _ in enumerate(A1):
-				merged[i].append(None)
+	return ma
 
-		# ---
 
-		if trace in {0, 2}:
-			for j, peak in enumerate(A2):
-				merged[1 + i + j].append(peak[idx2])
+def _take_positions(alignment, positions):
+	"""
+	Returns the peak indices of the given positions of an alignment, with gaps where the position is -1
 
-			idx2 = idx2 + 1
+	:type alignment: pyms.DPA.Alignment.Alignment
+	:type positions: numpy.ndarray
 
-		elif trace == 1:
-			for j, _ in enumerate(A2):
-				merged[1 + i + j].append(None)
+	:rtype: numpy.ndarray
+	"""
 
-	ma.peakalgt = numpy.transpose(merged)
-	# sort according to average peak
-	ma.peakalgt = list(ma.peakalgt)
-	ma.peakalgt.sort(key=functools.cmp_to_key(alignment_compare))
-	ma.peakpos = numpy.transpose(ma.peakalgt)
+	# The extra column of gaps is selected by the positions of -1
+	indices = alignment.peak_indices
+	gaps = numpy.full((indices.shape[0], 1), -1, dtype=indices.dtype)
 
-	return ma
+	return numpy.hstack([indices, gaps])[:, positions]
 
 
 def alignment_similarity(traces, score_matrix, gap):
@@ -513,6 +826,11 @@ def score_matrix_mpi(a1, a2, D):
 	"""
 	Calculates the score matrix between two alignments
 
+	Each rank calculates a range of the rows of the score matrix,
+	and every rank receives the whole matrix. This is the same as calling
+	:func:`pyms.DPA.PairwiseAlignment.score_matrix` with a
+	:class:`pyms.Utils.Executor.MPIExecutor`.
+
 	:param a1: The first alignment
 	:type a1: :class:`pyms.DPA.Class.Alignment`
 	:param a2: The second alignment
@@ -525,67 +843,10 @@ def score_matrix_mpi(a1, a2, D):
 
 	:author: Qiao Wang
 	:author: Andrew Isaac
+	:author: Dominic Davis-Foster (executors)
 	"""
 
-	# sim_score = 0
-
-	comm = MPI.COMM_WORLD
-	rank = comm.Get_rank()
-	size = comm.Get_size()
-
-	portion = int(float(len(a1.peakalgt)) / size)
-
-	# print("length of a1.peakalgt =", len(a1.peakalgt))
-	# print("portion size = ", portion)
-
-	# if rank == 0:
-	score_matrix = numpy.zeros((len(a1.peakalgt), len(a2.peakalgt)))
-
-	if rank < size - 1:  # if it's not the last slice
-		score_matrix_part = numpy.zeros((portion, len(a2.peakalgt)))
-		a1_part = a1.peakalgt[rank * portion:(rank + 1) * portion]
-	else:  # if it's the last strip, prob not full portion
-		score_matrix_part = numpy.zeros((
-				len(a1.peakalgt) - (rank * portion),
-				len(a2.peakalgt),
-				))
-		a1_part = a1.peakalgt[rank * portion:len(a1.peakalgt)]
-
-	for i, algt1pos in enumerate(a1_part):
-		for j, algt2pos in enumerate(a2.peakalgt):
-			sim_score = position_similarity(algt1pos, algt2pos, D)
-			score_matrix_part[i][j] = sim_score
-
-	if rank == 0:
-		score_matrix[0:portion] = score_matrix_part
-		for i in range(1, size):
-			if i == size - 1:
-				recv_buffer = numpy.zeros(
-					(len(a1.peakalgt) - (i * portion), len(a2.peakalgt))
-				)
-				comm.Recv(recv_buffer, i)
-				score_matrix[i * portion:len(a1.peakalgt)] = recv_buffer
-			else:
-				recv_buffer = numpy.zeros((portion, len(a2.peakalgt)))
-				comm.Recv(recv_buffer, i)
-				score_matrix[i * portion:(i + 1) * portion] = recv_buffer
-
-	# print("I am rank 0, done!", score_matrix)
-
-	else:
-		# all other process send their result
-		comm.Send(score_matrix_part)
-
-	outputs = []
-	if rank == 0:
-		for rank in range(size):
-			# print rank
-			outputs.append(score_matrix)
-
-	score_matrix = comm.scatter(outputs, root=0)
-
-	# print("before return, rank", rank)
-	return score_matrix
+	return score_matrix(a1, a2, D, executor=MPIExecutor())
 
 
 def align_with_tree(T, min_peaks=1):
@@ -613,8 +874,9 @@ def align_with_tree(T, min_peaks=1):
 	#   nodes are numbered {-1, ... , -(n-1)}. Note that the number of nodes
 	#   is one less than the number of items.
 
-	# extend As to length 2n to hold the n items, n-1 nodes, and 1 root
-	As = copy.deepcopy(T.alignments) + [None for _ in range(len(T.alignments))]
+	# extend As to length 2n to hold the n items, n-1 nodes, and 1 root.
+	# Merging never modifies the alignments, so they do not need to be deep copied
+	As = [copy.copy(alignment) for alignment in T.alignments] + [None for _ in range(len(T.alignments))]
 
 	# align the alignments into positions -1, ... ,-(n-1)
 	total = len(T.tree)
@@ -636,6 +898,93 @@ def align_with_tree(T, min_peaks=1):
 	return final_algt
 
 
+def align_new_experiments(alignment, expr_list, D, gap, min_peaks=1, rebalance=False):
+	"""
+	Adds experiments to an existing alignment
+
+	The new experiments are aligned with one another using a guide tree, and the
+	result is aligned to the existing alignment as a whole (profile alignment).
+	Only the new experiments are aligned pairwise, so the cost depends on the
+	number of new experiments rather than the size of the existing alignment.
+
+	The guide tree of the existing alignment is not recalculated, so the result
+	can differ slightly from aligning all of the experiments from scratch.
+	Set ``rebalance`` to :py:obj:`True` from time to time to realign every
+	experiment with a new guide tree.
+
+	:param alignment: The existing alignment, which is not modified. This should
+		not have been filtered with ``min_peaks``, as the peaks that were removed
+		are only included again when the alignment is rebalanced.
+	:type alignment: pyms.DPA.Alignment.Alignment
+	:param expr_list: The experiments to add to the alignment
+	:type expr_list: list of :class:`pyms.Experiment.Experiment`
+	:param D: Retention time tolerance
+	:type D: float
+	:param gap: Gap penalty
+	:type gap: float
+	:param min_peaks: Minimum number of peaks required for an alignment
+		position to be kept in the result
+	:type min_peaks: int, optional
+	:param rebalance: Whether to realign all the experiments with a new guide tree
+	:type rebalance: bool, optional
+
+	:return: The alignment of the existing and new experiments
+	:rtype: pyms.DPA.Alignment.Alignment
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(alignment, Alignment):
+		raise TypeError("'alignment' must be an Alignment object")
+	if not isinstance(min_peaks, int):
+		raise TypeError("'min_peaks' must be an integer")
+
+	new_alignments = exprl2alignment(expr_list)
+
+	if rebalance:
+		T = PairwiseAlignment(_experiment_alignments(alignment) + new_alignments, D, gap)
+		return align_with_tree(T, min_peaks)
+
+	if not new_alignments:
+		raise ValueError("'expr_list' must contain at least one experiment")
+
+	print(f" Adding {len(new_alignments):d} items to an alignment of {len(alignment.expr_code):d} items")
+
+	if len(new_alignments) == 1:
+		new_alignment = new_alignments[0]
+	else:
+		new_alignment = align_with_tree(PairwiseAlignment(new_alignments, D, gap))
+
+	final_algt = align(alignment, new_alignment, D, gap)
+
+	# useful for within state alignment only
+	if min_peaks > 1:
+		final_algt.filter_min_peaks(min_peaks)
+
+	return final_algt
+
+
+def _experiment_alignments(alignment):
+	"""
+	Returns an alignment of all the peaks of each experiment in an alignment
+
+	:type alignment: pyms.DPA.Alignment.Alignment
+
+	:rtype: list of :class:`pyms.DPA.Alignment.Alignment`
+	"""
+
+	alignments = []
+
+	for expr_code, table in zip(alignment.expr_code, alignment._peak_tables):
+		single = Alignment(None)
+		single.expr_code = [expr_code]
+		single._peak_tables = [table]
+		single.peak_indices = numpy.arange(len(table))[numpy.newaxis, :]
+		alignments.append(single)
+
+	return alignments
+
+
 def align_with_tree_mpi(T, min_peaks=1):
 	"""
 	Aligns a list of alignments using the supplied guide tree
@@ -667,8 +1016,9 @@ def align_with_tree_mpi(T, min_peaks=1):
 	#   nodes are numbered {-1, ... , -(n-1)}. Note that the number of nodes
 	#   is one less than the number of items.
 
-	# extend As to length 2n to hold the n items, n-1 nodes, and 1 root
-	As = copy.deepcopy(T.alignments) + [None for _ in range(len(T.alignments))]
+	# extend As to length 2n to hold the n items, n-1 nodes, and 1 root.
+	# Merging never modifies the alignments, so they do not need to be deep copied
+	As = [copy.copy(alignment) for alignment in T.alignments] + [None for _ in range(len(T.alignments))]
 
 	# align the alignments into positions -1, ... ,-(n-1)
 	total = len(T.tree)
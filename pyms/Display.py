@@ -172,7 +172,7 @@ Please call a plotting function before calling 'do_plotting()'""", UserWarning)
 		for peak in self.__peak_list:
 			# if event.xdata > 0.9999*peak.rt and event.xdata < 1.0001*peak.rt:
 			if 0.9999 * peak.rt < event.xdata < 1.0001 * peak.rt:
-				intensity_list = peak.get_mass_spectrum().mass_spec
+				intensity_list = peak.get_mass_spectrum().intensity_list
 				mass_list = peak.get_mass_spectrum().mass_list
 
 		largest = self.get_5_largest(intensity_list)
@@ -571,7 +571,7 @@ class ClickEventHandler:
 		for peak in self.peak_list:
 			# if event.xdata > 0.9999*peak.rt and event.xdata < 1.0001*peak.rt:
 			if self._min * peak.rt < event.xdata < self._max * peak.rt:
-				intensity_list = peak.get_mass_spectrum().mass_spec
+				intensity_list = peak.get_mass_spectrum().intensity_list
 				mass_list = peak.get_mass_spectrum().mass_list
 
 				largest = self.get_n_largest(intensity_list)
@@ -38,8 +38,8 @@ from pyms import __version__
 from pyms.Base import pymsBaseClass
 from pyms.IonChromatogram import IonChromatogram
 from pyms.Mixins import GetIndexTimeMixin, MaxMinMassMixin, TimeListMixin
-from pyms.Spectrum import MassSpectrum, Scan
-from pyms.Utils.IO import prepare_filepath
+from pyms.Spectrum import MassSpectrum, Scan, _read_only
+from pyms.Utils.IO import load_arrays, prepare_filepath, save_arrays
 from pyms.Utils.Time import time_str_secs
 from pyms.Utils.Utils import is_path, is_sequence_of
 
@@ -51,6 +51,12 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 	Generic object for GC-MS data. Contains raw data
 		as a list of scans and times
 
+	Internally the raw data is stored in a columnar layout, in the same way as
+	ANDI-MS files: one flat array of mass values, one flat array of intensity
+	values, and the offset of the first point of each scan in those arrays.
+	:class:`~pyms.Spectrum.Scan` objects are only created on demand by
+	:attr:`~pyms.GCMS.Class.GCMS_data.scan_list`.
+
 	:param time_list: List of scan retention times
 	:type time_list: list
 	:param scan_list: List of Scan objects
@@ -74,11 +80,75 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 			raise TypeError("'scan_list' must be a Sequence of Scan objects")
 
 		self._time_list = time_list
-		self._scan_list = scan_list
+		self._mass_values, self._intensity_values, self._scan_offsets = _scans_to_arrays(scan_list)
 		self.__set_time()
 		self.__set_min_max_mass()
 		self.__calc_tic()
 
+	@classmethod
+	def from_arrays(cls, time_list, mass_values, intensity_values, scan_offsets):
+		"""
+		Construct a GCMS_data object from flat arrays of mass and intensity values
+
+		The points of scan ``i`` are ``scan_offsets[i]`` to ``scan_offsets[i + 1]``,
+		so ``scan_offsets`` has one more element than ``time_list``. Scans with
+		masses in descending or unknown order are sorted into ascending order.
+
+		:param time_list: List of scan retention times
+		:type time_list: list
+		:param mass_values: The mass values of all scans
+		:type mass_values: numpy.ndarray
+		:param intensity_values: The intensity values of all scans
+		:type intensity_values: numpy.ndarray
+		:param scan_offsets: Offsets of the start of each scan in ``mass_values``,
+			with the total number of points as the final element
+		:type scan_offsets: numpy.ndarray
+
+		:rtype: pyms.GCMS.Class.GCMS_data
+
+		:author: Dominic Davis-Foster
+		"""
+
+		if not is_sequence_of(time_list, Number):
+			raise TypeError("'time_list' must be a Sequence of numbers")
+
+		mass_values = numpy.asarray(mass_values)
+		intensity_values = numpy.asarray(intensity_values)
+		scan_offsets = numpy.asarray(scan_offsets, dtype=numpy.intp)
+
+		if mass_values.ndim != 1 or intensity_values.ndim != 1:
+			raise ValueError("'mass_values' and 'intensity_values' must be one-dimensional")
+
+		if len(mass_values) != len(intensity_values):
+			raise ValueError("The lengths of the mass and intensity arrays differ!")
+
+		if len(scan_offsets) != len(time_list) + 1:
+			raise ValueError("number of time points does not equal the number of scans")
+
+		if scan_offsets[0] != 0 or scan_offsets[-1] != len(mass_values) or (numpy.diff(scan_offsets) < 0).any():
+			raise ValueError("'scan_offsets' are not consistent with the mass and intensity arrays")
+
+		# Sort any scans whose masses are not in ascending order
+		descending = numpy.diff(mass_values) < 0
+		boundaries = scan_offsets[1:-1]
+		descending[boundaries[(boundaries > 0) & (boundaries < len(mass_values))] - 1] = False  # ignore steps between scans
+		if descending.any():
+			scan_numbers = numpy.repeat(numpy.arange(len(time_list)), numpy.diff(scan_offsets))
+			order = numpy.lexsort((mass_values, scan_numbers))
+			mass_values = mass_values[order]
+			intensity_values = intensity_values[order]
+
+		data = cls.__new__(cls)
+		data._time_list = list(time_list)
+		data._mass_values = mass_values
+		data._intensity_values = intensity_values
+		data._scan_offsets = scan_offsets
+		data.__set_time()
+		data.__set_min_max_mass()
+		data.__calc_tic()
+
+		return data
+
 	def __eq__(self, other):
 		"""
 		Return whether this GCMS_data object is equal to another object
@@ -90,11 +160,21 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		"""
 
 		if isinstance(other, self.__class__):
-			return self.scan_list == other.scan_list \
+			return numpy.array_equal(self._scan_offsets, other._scan_offsets) \
+					and numpy.array_equal(self._mass_values, other._mass_values) \
+					and numpy.array_equal(self._intensity_values, other._intensity_values) \
 					and self.time_list == other.time_list
 
 		return NotImplemented
 
+	def __setstate__(self, state):
+		# Objects pickled before the columnar layout was introduced store a list of scans
+		if "_scan_list" in state:
+			scan_list = state.pop("_scan_list")
+			state["_mass_values"], state["_intensity_values"], state["_scan_offsets"] = _scans_to_arrays(scan_list)
+
+		self.__dict__.update(state)
+
 	def __len__(self):
 		"""
 		Returns the length of the data object, defined as the number of scans
@@ -105,7 +185,7 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		:author: Vladimir Likic
 		"""
 
-		return len(self._scan_list)
+		return len(self._scan_offsets) - 1
 
 	def __repr__(self):
 		return f"GCMS_data(rt range {self.min_rt} - {self.max_rt}, time_step {self.time_step}, length {len(self)})"
@@ -125,10 +205,11 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		:author: Vladimir Likic
 		"""
 
-		intensities = []
-		for scan in self._scan_list:
-			intensities.append(sum(scan.intensity_list))
-		ia = numpy.array(intensities)
+		ia = numpy.bincount(
+				self._scan_numbers(),
+				weights=self._intensity_values,
+				minlength=len(self),
+				)
 		rt = copy.deepcopy(self._time_list)
 		tic = IonChromatogram(ia, rt)
 
@@ -154,8 +235,9 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 			time_diff = t2 - t1
 			time_diff_list.append(time_diff)
 
-		time_step = mean(time_diff_list)
-		time_step_std = stdev(time_diff_list)
+		# A chunk of a longer run may contain only one or two scans
+		time_step = mean(time_diff_list) if time_diff_list else 0.0
+		time_step_std = stdev(time_diff_list) if len(time_diff_list) > 1 else 0.0
 
 		self._time_step = time_step
 		self._time_step_std = time_step_std
@@ -171,22 +253,21 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		:author: Vladimir Likic
 		"""
 
-		mini = self._scan_list[0].min_mass
-		maxi = self._scan_list[0].max_mass
-		for scan in self._scan_list:
+		if len(self._mass_values):
+			self._min_mass = self._mass_values.min().item()
+			self._max_mass = self._mass_values.max().item()
+		else:
+			self._min_mass = None
+			self._max_mass = None
 
-			tmp_mini = scan.min_mass
-			if tmp_mini is not None:
-				if tmp_mini < mini:
-					mini = tmp_mini
+	def _scan_numbers(self):
+		"""
+		Returns the index of the scan each point belongs to
 
-			tmp_maxi = scan.max_mass
-			if tmp_maxi is not None:
-				if tmp_maxi > maxi:
-					maxi = tmp_maxi
+		:rtype: numpy.ndarray
+		"""
 
-		self._min_mass = mini
-		self._max_mass = maxi
+		return numpy.repeat(numpy.arange(len(self), dtype=numpy.intp), numpy.diff(self._scan_offsets))
 
 	@deprecation.deprecated(deprecated_in="2.1.2", removed_in="2.2.0",
 							current_version=__version__,
@@ -231,17 +312,14 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		# print the summary of simply attributes
 		print(f" Data retention time range: {self._min_rt / 60.0:.3f} min -- {self._max_rt / 60:.3f} min")
 		print(f" Time step: {self._time_step:.3f} s (std={self._time_step_std:.3f} s)")
-		print(f" Number of scans: {len(self._scan_list):d}")
+		print(f" Number of scans: {len(self):d}")
 		print(f" Minimum m/z measured: {self._min_mass:.3f}")
 		print(f" Maximum m/z measured: {self._max_mass:.3f}")
 
 		# calculate median number of m/z values measured per scan
-		n_list = []
-		for ii in range(len(self._scan_list)):
-			scan = self._scan_list[ii]
-			n = len(scan)
-			n_list.append(n)
-			if print_scan_n:
+		n_list = numpy.diff(self._scan_offsets).tolist()
+		if print_scan_n:
+			for n in n_list:
 				print(n)
 		mz_mean = mean(n_list)
 		mz_median = median(n_list)
@@ -253,6 +331,9 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		"""
 		Return a list of the scan objects
 
+		The scans are created from the raw data each time this is called,
+		so changes made to them do not affect the data.
+
 		:rtype: :class:`list` of :class:`pyms.Spectrum.Scan` objects
 
 		:author: Qiao Wang
@@ -260,7 +341,62 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		:author: Vladimir Likic
 		"""
 
-		return copy.deepcopy(self._scan_list)
+		return [self.get_scan_at_index(ix) for ix in range(len(self))]
+
+	def get_scan_at_index(self, ix):
+		"""
+		Returns the scan at the given index
+
+		:param ix: The index of the scan
+		:type ix: int
+
+		:rtype: pyms.Spectrum.Scan
+		"""
+
+		if not isinstance(ix, int):
+			raise TypeError("'ix' must be an integer")
+
+		if ix < 0 or ix >= len(self):
+			raise IndexError("index out of range")
+
+		start, stop = self._scan_offsets[ix], self._scan_offsets[ix + 1]
+
+		return Scan._from_sorted(
+				self._mass_values[start:stop].copy(),
+				self._intensity_values[start:stop].copy(),
+				)
+
+	@property
+	def mass_values(self):
+		"""
+		Returns a read-only view of the mass values of all scans, as a flat array
+
+		:rtype: numpy.ndarray
+		"""
+
+		return _read_only(self._mass_values)
+
+	@property
+	def intensity_values(self):
+		"""
+		Returns a read-only view of the intensity values of all scans, as a flat array
+
+		:rtype: numpy.ndarray
+		"""
+
+		return _read_only(self._intensity_values)
+
+	@property
+	def scan_offsets(self):
+		"""
+		Returns a read-only view of the offsets of the start of each scan in
+		:attr:`~pyms.GCMS.Class.GCMS_data.mass_values`. The final element is
+		the total number of points.
+
+		:rtype: numpy.ndarray
+		"""
+
+		return _read_only(self._scan_offsets)
 
 	@property
 	def time_list(self):
@@ -350,7 +486,7 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		if begin is None and end is None:
 			raise SyntaxError("At least one of 'begin' and 'end' is required")
 
-		N = len(self._scan_list)
+		N = len(self)
 
 		# process 'begin' and 'end'
 		if begin is None:
@@ -383,18 +519,14 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 
 		print(f"Trimming data to between {first_scan + 1:d} and {last_scan + 1:d} scans")
 
-		scan_list_new = []
-		time_list_new = []
-		for ii in range(len(self._scan_list)):
-			if first_scan <= ii <= last_scan:
-				scan = self._scan_list[ii]
-				time = self._time_list[ii]
-				scan_list_new.append(scan)
-				time_list_new.append(time)
+		start = self._scan_offsets[first_scan]
+		stop = self._scan_offsets[last_scan + 1]
 
 		# update info
-		self._scan_list = scan_list_new
-		self._time_list = time_list_new
+		self._mass_values = self._mass_values[start:stop].copy()
+		self._intensity_values = self._intensity_values[start:stop].copy()
+		self._scan_offsets = self._scan_offsets[first_scan:last_scan + 2] - start
+		self._time_list = self._time_list[first_scan:last_scan + 1]
 		self.__set_time()
 		self.__set_min_max_mass()
 		self.__calc_tic()
@@ -427,27 +559,27 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 		print(f" -> Writing intensities to '{file_name1}'")
 		print(f" -> Writing m/z values to '{file_name2}'")
 
-		fp1 = open(file_name1, "w")
-		fp2 = open(file_name2, "w")
+		with open(file_name1, "w") as fp1:
+			fp1.writelines(self.__format_scans(self._intensity_values))
 
-		for scan in self._scan_list:
+		with open(file_name2, "w") as fp2:
+			fp2.writelines(self.__format_scans(self._mass_values))
 
-			for index, intensity in enumerate(scan.intensity_list):
-				if index == 0:
-					fp1.write(f"{intensity:.4f}")
-				else:
-					fp1.write(f",{intensity:.4f}")
-			fp1.write("\n")
+	def __format_scans(self, values):
+		"""
+		Formats the values of each scan as a line of comma-separated values
 
-			for index, mass in enumerate(scan.mass_list):
-				if index == 0:
-					fp2.write(f"{mass:.4f}")
-				else:
-					fp2.write(f",{mass:.4f}")
-			fp2.write("\n")
+		:param values: Flat array of values for all scans
+		:type values: numpy.ndarray
 
-		fp1.close()
-		fp2.close()
+		:rtype: Iterator[str]
+		"""
+
+		formatted = [f"{value:.4f}" for value in values.tolist()]
+		offsets = self._scan_offsets.tolist()
+
+		for start, stop in zip(offsets[:-1], offsets[1:]):
+			yield ",".join(formatted[start:stop]) + "\n"
 
 	def write_intensities_stream(self, file_name):
 		"""
@@ -467,15 +599,97 @@ class GCMS_data(pymsBaseClass, TimeListMixin, MaxMinMassMixin, GetIndexTimeMixin
 
 		file_name = prepare_filepath(file_name)
 
-		# n = len(self._scan_list)
-
 		print(" -> Writing scans to a file")
 
-		fp = file_name.open("w")
+		with file_name.open("w") as fp:
+			numpy.savetxt(fp, self._intensity_values, fmt="%8.4f")
+
+
+	def save(self, file_name):
+		"""
+		Saves the data to a file in PyMassSpec's native binary format,
+		which can be loaded much faster than the original data file
+
+		:param file_name: Output file name
+		:type file_name: str or pathlib.Path
+
+		:author: Dominic Davis-Foster
+		"""
+
+		if not is_path(file_name):
+			raise TypeError("'file_name' must be a string or a PathLike object")
+
+		save_arrays(
+				file_name,
+				{
+						"time_list": numpy.asarray(self._time_list, dtype=numpy.float64),
+						"mass_values": self._mass_values,
+						"intensity_values": self._intensity_values,
+						"scan_offsets": self._scan_offsets.astype(numpy.int64),
+						"tic": self._tic.intensity_array,
+						},
+				{
+						"class": self.__class__.__name__,
+						"version": __version__,
+						"min_mass": self._min_mass,
+						"max_mass": self._max_mass,
+						},
+				)
+
+	@classmethod
+	def load(cls, file_name, mmap=False):
+		"""
+		Loads data saved with :meth:`~pyms.GCMS.Class.GCMS_data.save`
+
+		:param file_name: The name of the file
+		:type file_name: str or pathlib.Path
+		:param mmap: Whether to memory-map the mass and intensity values rather
+			than reading them into memory
+		:type mmap: bool, optional
+
+		:rtype: pyms.GCMS.Class.GCMS_data
+
+		:author: Dominic Davis-Foster
+		"""
+
+		arrays, header = load_arrays(file_name, mmap=mmap)
+
+		if header.get("class") != cls.__name__:
+			raise ValueError(f"'{file_name}' does not contain {cls.__name__} data")
+
+		data = cls.__new__(cls)
+		data._time_list = arrays["time_list"].tolist()
+		data._mass_values = arrays["mass_values"]
+		data._intensity_values = arrays["intensity_values"]
+		data._scan_offsets = arrays["scan_offsets"].astype(numpy.intp, copy=False)
+		data._min_mass = header["min_mass"]
+		data._max_mass = header["max_mass"]
+		data._tic = IonChromatogram(numpy.array(arrays["tic"]), copy.deepcopy(data._time_list))
+		data.__set_time()
+
+		return data
+
+
+def _scans_to_arrays(scan_list):
+	"""
+	Concatenates the mass and intensity values of a list of scans into flat arrays
+
+	:param scan_list: A list of Scan objects
+	:type scan_list: :class:`list` of :class:`pyms.Spectrum.Scan` objects
+
+	:return: The mass values, the intensity values and the offset of the start of each scan
+	:rtype: tuple of :class:`numpy.ndarray`
+	"""
+
+	scan_offsets = numpy.zeros(len(scan_list) + 1, dtype=numpy.intp)
+	numpy.cumsum([len(scan) for scan in scan_list], out=scan_offsets[1:])
+	n_points = int(scan_offsets[-1])
+
+	mass_values = numpy.empty(n_points, dtype=numpy.float64)
+	intensity_values = numpy.empty(n_points, dtype=numpy.float64)
 
-		for scan in self._scan_list:
-			intensities = scan.intensity_list
-			for i in intensities:
-				fp.write(f"{i:8.4f}\n")
+	if scan_list:
+		numpy.concatenate([scan.mass_array for scan in scan_list], out=mass_values)
+		numpy.concatenate([scan.mass_spec for scan in scan_list], out=intensity_values)
 
-		fp.close()
+	return mass_values, intensity_values, scan_offsets
@@ -27,7 +27,9 @@ Functions for reading manufacturer specific ANDI-MS data files
 import pathlib
 
 # 3rd party
+import numpy
 from netCDF4 import Dataset
+from scipy.io import netcdf_file
 
 try:
 	from mpi4py import MPI
@@ -36,7 +38,7 @@ except ModuleNotFoundError:
 
 # this package
 from pyms.GCMS.Class import GCMS_data
-from pyms.Spectrum import Scan
+from pyms.IntensityMatrix import build_intensity_matrix_streamed
 
 
 # netCDF dimension names
@@ -49,13 +51,23 @@ __INTENSITY_STRING = "intensity_values"
 __TIME_STRING = "scan_acquisition_time"
 __POINT_COUNT = "point_count"
 
+__REQUIRED_VARIABLES = {__MASS_STRING, __INTENSITY_STRING, __TIME_STRING, __POINT_COUNT}
 
-def ANDI_reader(file_name):
+
+def ANDI_reader(file_name, mmap=False):
 	"""
 	A reader for ANDI-MS NetCDF files
 
+	The file is opened read-only and the mass and intensity values are kept as
+	NumPy arrays in the columnar layout used by
+	:class:`~pyms.GCMS.Class.GCMS_data`.
+
 	:param file_name: The path of the ANDI-MS file
 	:type file_name: str or pathlib.Path
+	:param mmap: Whether to memory-map the mass and intensity values rather than
+		reading them into memory. The data is then only read from disk when it is
+		used. Only supported for NetCDF3 files, which includes all ANDI-MS files.
+	:type mmap: bool, optional
 
 	:return: GC-MS data object
 	:rtype: :class:`pyms.GCMS.Class.GCMS_data`
@@ -69,42 +81,202 @@ def ANDI_reader(file_name):
 	if not isinstance(file_name, (str, pathlib.Path)):
 		raise TypeError("'file_name' must be a string or a pathlib.Path object")
 
-	rootgrp = Dataset(file_name, "r+", format='NETCDF3_CLASSIC')
-	# TODO: find out if netCDF4 throws specific errors that we can use here
+	if mmap:
+		rootgrp = netcdf_file(file_name, "r", mmap=True)
+		variables = {name: _scaled(rootgrp.variables[name]) for name in __REQUIRED_VARIABLES}
+	else:
+		rootgrp = Dataset(file_name, "r")
+		# TODO: find out if netCDF4 throws specific errors that we can use here
+		rootgrp.set_auto_mask(False)
+		variables = {name: rootgrp.variables[name][:] for name in __REQUIRED_VARIABLES}
+		rootgrp.close()
 
 	print(f" -> Reading netCDF file '{file_name}'")
 
-	scan_list = []
-	mass = rootgrp.variables[__MASS_STRING][:]
-	intensity = rootgrp.variables[__INTENSITY_STRING][:]
-
-	scan_lengths = rootgrp.variables["point_count"]  # The number of data points in each scan
-
-	mass_values = mass.tolist()
-	intensity_values = intensity.tolist()
+	mass_values = variables[__MASS_STRING]
+	intensity_values = variables[__INTENSITY_STRING]
 
 	if len(mass_values) != len(intensity_values):
 		raise ValueError("The lengths of the mass and intensity lists differ!")
 
-	offset = 0
-	for idx, length in enumerate(scan_lengths):
-		mass_list = mass_values[offset:offset + length]
-		assert len(mass_values[offset:offset + length]) == length
-		intensity_list = intensity_values[offset:offset + length]
-		assert len(intensity_values[offset:offset + length]) == length
-		scan_list.append(Scan(mass_list, intensity_list))
-		offset += length
+	# The number of data points in each scan
+	scan_lengths = variables[__POINT_COUNT]
+	scan_offsets = numpy.zeros(len(scan_lengths) + 1, dtype=numpy.intp)
+	numpy.cumsum(scan_lengths, out=scan_offsets[1:])
 
-	assert offset == len(mass_values)
+	if scan_offsets[-1] != len(mass_values):
+		raise ValueError("The number of points in the scans does not equal the number of mass values")
 
-	time = rootgrp.variables[__TIME_STRING][:]
-	time_list = time.tolist()
+	time_list = numpy.asarray(variables[__TIME_STRING]).tolist()
 
 	# sanity check
-	if not len(time_list) == len(scan_list):
+	if not len(time_list) == len(scan_lengths):
 		raise ValueError("number of time points does not equal the number of scans")
 
-	return GCMS_data(time_list, scan_list)
+	return GCMS_data.from_arrays(time_list, mass_values, intensity_values, scan_offsets)
+
+
+def ANDI_chunks(file_name, chunk_size=1000):
+	"""
+	Reads an ANDI-MS NetCDF file a chunk of scans at a time
+
+	Only the scans in the current chunk are read from the file.
+
+	:param file_name: The path of the ANDI-MS file
+	:type file_name: str or pathlib.Path
+	:param chunk_size: The number of scans in each chunk
+	:type chunk_size: int, optional
+
+	:return: Generator of GC-MS data objects containing consecutive scans
+	:rtype: Iterator[:class:`pyms.GCMS.Class.GCMS_data`]
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(file_name, (str, pathlib.Path)):
+		raise TypeError("'file_name' must be a string or a pathlib.Path object")
+
+	if not isinstance(chunk_size, int):
+		raise TypeError("'chunk_size' must be an integer")
+
+	if chunk_size < 1:
+		raise ValueError("'chunk_size' must be at least 1")
+
+	return _iter_chunks(file_name, chunk_size)
+
+
+def _iter_chunks(file_name, chunk_size):
+	"""
+	Generator of the chunks of scans in an ANDI-MS NetCDF file
+
+	:type file_name: str or pathlib.Path
+	:type chunk_size: int
+
+	:rtype: Iterator[:class:`pyms.GCMS.Class.GCMS_data`]
+	"""
+
+	with Dataset(file_name, "r") as rootgrp:
+		rootgrp.set_auto_mask(False)
+
+		print(f" -> Reading netCDF file '{file_name}'")
+
+		mass_values = rootgrp.variables[__MASS_STRING]
+		intensity_values = rootgrp.variables[__INTENSITY_STRING]
+
+		time_list = rootgrp.variables[__TIME_STRING][:].tolist()
+		scan_offsets = numpy.zeros(len(time_list) + 1, dtype=numpy.intp)
+		numpy.cumsum(rootgrp.variables[__POINT_COUNT][:], out=scan_offsets[1:])
+
+		if scan_offsets[-1] != len(mass_values):
+			raise ValueError("The number of points in the scans does not equal the number of mass values")
+
+		for first_scan in range(0, len(time_list), chunk_size):
+			last_scan = min(first_scan + chunk_size, len(time_list))
+			start, stop = scan_offsets[first_scan], scan_offsets[last_scan]
+
+			yield GCMS_data.from_arrays(
+					time_list[first_scan:last_scan],
+					mass_values[start:stop],
+					intensity_values[start:stop],
+					scan_offsets[first_scan:last_scan + 1] - start,
+					)
+
+
+def ANDI_intensity_matrix(
+		file_name, bin_interval=1, bin_left=0.5, bin_right=0.5,
+		min_mass=None, chunk_size=1000, memmap_file=None,
+		):
+	"""
+	Builds an intensity matrix with flexible bins directly from an ANDI-MS
+	NetCDF file, reading and binning a chunk of scans at a time
+
+	See :func:`pyms.IntensityMatrix.build_intensity_matrix_streamed` for details.
+
+	:param file_name: The path of the ANDI-MS file
+	:type file_name: str or pathlib.Path
+	:param bin_interval: interval between bin centres (default 1)
+	:type bin_interval: int or float
+	:param bin_left: left bin boundary offset (default 0.5)
+	:type bin_left: float
+	:param bin_right: right bin boundary offset (default 0.5)
+	:type bin_right: float
+	:param min_mass: Minimum mass to bin (default minimum mass from data)
+	:type min_mass: int or float, optional
+	:param chunk_size: The number of scans to read at a time
+	:type chunk_size: int, optional
+	:param memmap_file: Optional ``.npy`` file to store the intensity array in
+	:type memmap_file: str or pathlib.Path, optional
+
+	:return: Binned IntensityMatrix object
+	:rtype: pyms.IntensityMatrix.IntensityMatrix
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(file_name, (str, pathlib.Path)):
+		raise TypeError("'file_name' must be a string or a pathlib.Path object")
+
+	with Dataset(file_name, "r") as rootgrp:
+		rootgrp.set_auto_mask(False)
+		n_scans = len(rootgrp.variables[__TIME_STRING])
+		data_min_mass, max_mass = _mass_range(rootgrp.variables[__MASS_STRING])
+
+	if not min_mass:
+		min_mass = data_min_mass
+
+	return build_intensity_matrix_streamed(
+			ANDI_chunks(file_name, chunk_size),
+			n_scans,
+			min_mass,
+			max_mass,
+			bin_interval=bin_interval,
+			bin_left=bin_left,
+			bin_right=bin_right,
+			memmap_file=memmap_file,
+			)
+
+
+def _mass_range(mass_values, chunk_points=2 ** 22):
+	"""
+	Returns the minimum and maximum of the mass values in a netCDF variable,
+	reading the variable a chunk at a time
+
+	:type mass_values: netCDF4.Variable
+	:param chunk_points: The number of values to read at a time
+	:type chunk_points: int
+
+	:rtype: tuple of float
+	"""
+
+	min_mass = numpy.inf
+	max_mass = -numpy.inf
+
+	for start in range(0, len(mass_values), chunk_points):
+		chunk = mass_values[start:start + chunk_points]
+		min_mass = min(min_mass, chunk.min().item())
+		max_mass = max(max_mass, chunk.max().item())
+
+	return min_mass, max_mass
+
+
+def _scaled(variable):
+	"""
+	Returns the data of a memory-mapped netCDF variable, applying its
+	``scale_factor`` and ``add_offset`` attributes if they change the values
+
+	:type variable: scipy.io.netcdf.netcdf_variable
+
+	:rtype: numpy.ndarray
+	"""
+
+	data = variable.data
+	scale_factor = getattr(variable, "scale_factor", 1.0)
+	add_offset = getattr(variable, "add_offset", 0.0)
+
+	if scale_factor != 1.0 or add_offset != 0.0:
+		data = data * scale_factor + add_offset
+
+	return data
 
 
 def ANDI_writer(file_name, im):
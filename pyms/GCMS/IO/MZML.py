@@ -24,28 +24,60 @@ Functions for reading mzML format data files
 ################################################################################
 
 # stdlib
-import pathlib
+import base64
+import mmap
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from xml.etree import ElementTree
 
 # 3rd party
-import pymzml
-
-try:
-	from mpi4py import MPI
-except ModuleNotFoundError:
-	pass
+import numpy
 
 # this package
 from pyms.GCMS.Class import GCMS_data
-from pyms.Spectrum import Scan
+from pyms.IntensityMatrix import build_intensity_matrix_streamed
 from pyms.Base import is_path
 
 
-def mzML_reader(file_name):
+# Controlled vocabulary accessions
+__SCAN_START_TIME = "MS:1000016"
+__MZ_ARRAY = "MS:1000514"
+__INTENSITY_ARRAY = "MS:1000515"
+__ZLIB_COMPRESSION = "MS:1000574"
+__NO_COMPRESSION = "MS:1000576"
+__DTYPES = {
+		"MS:1000521": numpy.dtype("<f4"),  # 32-bit float
+		"MS:1000523": numpy.dtype("<f8"),  # 64-bit float
+		"MS:1000519": numpy.dtype("<i4"),  # 32-bit integer
+		"MS:1000522": numpy.dtype("<i8"),  # 64-bit integer
+		}
+
+__INDEX_LIST_OFFSET = re.compile(rb"<indexListOffset>\s*(\d+)\s*</indexListOffset>")
+__SPECTRUM_INDEX = re.compile(rb'<index\s+name="spectrum"\s*>(.*?)</index>', re.DOTALL)
+__OFFSET = re.compile(rb"<offset[^>]*>\s*(\d+)\s*</offset>")
+__SPECTRUM_START = re.compile(rb"<(?:\w+:)?spectrum[\s>]")
+__SPECTRUM_END = re.compile(rb"</(?:\w+:)?spectrum>")
+__NAMESPACE = re.compile(r"^{[^}]*}")
+
+
+def mzML_reader(file_name, n_workers=None, use_processes=False):
 	"""
 	A reader for mzML files
 
+	The positions of the spectra are taken from the index of indexed mzML files,
+	or found by searching the file otherwise. Each spectrum is then parsed on its
+	own, and its binary data arrays are decoded straight into NumPy arrays.
+	Spectra without a scan start time are ignored.
+
 	:param file_name: The name of the mzML file
 	:type file_name: str or pathlib.Path
+	:param n_workers: The number of threads (or processes) to decode the spectra with.
+		If :py:obj:`None` the spectra are decoded in the calling thread.
+	:type n_workers: int, optional
+	:param use_processes: Whether to decode the spectra in a pool of processes
+		rather than threads
+	:type use_processes: bool, optional
 
 	:return: GC-MS data object
 	:rtype: :class:`pyms.GCMS.Class.GCMS_data`
@@ -57,55 +89,338 @@ def mzML_reader(file_name):
 	if not is_path(file_name):
 		raise TypeError("'file_name' must be a string or a PathLike object")
 
-	mzml_file = pymzml.run.Reader(str(file_name))
-
-	try:  # avoid printing from each rank
-		comm = MPI.COMM_WORLD
-		rank = comm.Get_rank()
-		size = comm.Get_size()
+	if n_workers is not None and not isinstance(n_workers, int):
+		raise TypeError("'n_workers' must be an integer")
 
-		if rank == 0:
-			file_names = []
+	print(f" -> Reading mzML file '{file_name}'")
 
-			for i in range(1, size):
-				recv_buffer = ""
-				file_n = comm.recv(recv_buffer, i)
-				file_names.append(file_n)
+	with _MzMLFile(file_name) as mzml_file:
+		spectra = mzml_file.spectra()
 
-			print(" -> Reading mzML files:")
-			print(file_name)
-			for file_n in file_names:
-				print(file_n)
+		if n_workers is None:
+			decoded = [_decode_spectrum(spectrum) for spectrum in spectra]
 		else:
-			comm.send(file_name, dest=0)
-	# TODO: Find specific error
-	except Exception as e:
-		print(e)
-		print(f" -> Reading mzML file '{file_name}'")
-
-	scan_list = []
-	time_list = []
-
-	for spectrum in mzml_file:
-		mass_list = []
-		intensity_list = []
-
-		for mz, i in spectrum.peaks:
-			mass_list.append(mz)
-			intensity_list.append(i)
-
-		# scan_list.append(Scan(mass_list, intensity_list))
-		for element in spectrum.xmlTree:
-			# For some reason there are spectra with no time value,
-			# Ignore these????????????
-			if element.get('accession') == "MS:1000016":  # time value
-				# We need time in seconds not minutes
-				time_list.append(60 * float(element.get('value')))
-				scan_list.append(Scan(mass_list, intensity_list))
-
-	# print("time:", len(time_list))
-	# print("scan:", len(scan_list))
-
-	data = GCMS_data(time_list, scan_list)
-
-	return data
+			pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+			with pool(max_workers=n_workers) as executor:
+				decoded = list(executor.map(_decode_spectrum, spectra, chunksize=64))
+
+	return _to_gcms_data(decoded)
+
+
+def _to_gcms_data(decoded):
+	"""
+	Concatenates decoded spectra into a GCMS_data object, skipping any without a retention time
+
+	:param decoded: Sequence of ``(retention time, mass array, intensity array)`` tuples
+	:type decoded: list of tuple
+
+	:rtype: pyms.GCMS.Class.GCMS_data
+	"""
+
+	decoded = [spectrum for spectrum in decoded if spectrum[0] is not None]
+
+	time_list = [rt for rt, *_ in decoded]
+	scan_offsets = numpy.zeros(len(decoded) + 1, dtype=numpy.intp)
+	numpy.cumsum([len(masses) for _, masses, _ in decoded], out=scan_offsets[1:])
+
+	if decoded:
+		mass_values = numpy.concatenate([masses for _, masses, _ in decoded])
+		intensity_values = numpy.concatenate([intensities for *_, intensities in decoded])
+	else:
+		mass_values = intensity_values = numpy.zeros(0)
+
+	return GCMS_data.from_arrays(time_list, mass_values, intensity_values, scan_offsets)
+
+
+class _MzMLFile:
+	"""
+	Memory-mapped mzML file, giving access to the raw XML of each spectrum
+
+	:param file_name: The name of the mzML file
+	:type file_name: str or pathlib.Path
+	"""
+
+	def __init__(self, file_name):
+		self._fp = open(file_name, "rb")
+		try:
+			self._mmap = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:  # Empty file
+			self._fp.close()
+			raise ValueError(f"'{file_name}' is empty")
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._mmap.close()
+		self._fp.close()
+
+	def spectrum_ranges(self):
+		"""
+		Returns the start and end byte offsets of each spectrum in the file
+
+		:rtype: list of tuple
+		"""
+
+		return _spectrum_ranges(self._mmap)
+
+	def read(self, start, end):
+		"""
+		Returns the bytes of the file between the given offsets
+
+		:type start: int
+		:type end: int
+
+		:rtype: bytes
+		"""
+
+		return self._mmap[start:end]
+
+	def spectra(self):
+		"""
+		Returns the raw XML of each spectrum in the file
+
+		:rtype: list of bytes
+		"""
+
+		return [self.read(start, end) for start, end in self.spectrum_ranges()]
+
+
+def _spectrum_ranges(buffer):
+	"""
+	Returns the start and end byte offsets of each spectrum in an mzML file
+
+	:param buffer: The contents of the mzML file
+	:type buffer: mmap.mmap or bytes
+
+	:rtype: list of tuple
+	"""
+
+	starts = _indexed_offsets(buffer)
+	if starts is None:
+		starts = [match.start() for match in __SPECTRUM_START.finditer(buffer)]
+
+	ranges = []
+	for start in starts:
+		end = __SPECTRUM_END.search(buffer, start)
+		if end is None:
+			raise ValueError(f"Unterminated spectrum at offset {start}")
+		ranges.append((start, end.end()))
+
+	return ranges
+
+
+def _indexed_offsets(buffer):
+	"""
+	Returns the offsets of the spectra from the index of an indexed mzML file,
+	or :py:obj:`None` if the file has no usable index
+
+	:param buffer: The contents of the mzML file
+	:type buffer: mmap.mmap or bytes
+
+	:rtype: list of int or None
+	"""
+
+	tail = buffer[max(0, len(buffer) - 4096):]
+	index_list_offset = __INDEX_LIST_OFFSET.search(tail)
+	if index_list_offset is None:
+		return None
+
+	spectrum_index = __SPECTRUM_INDEX.search(buffer, int(index_list_offset.group(1)))
+	if spectrum_index is None:
+		return None
+
+	offsets = [int(offset) for offset in __OFFSET.findall(spectrum_index.group(1))]
+
+	# Check the index actually points at the spectra
+	for offset in offsets:
+		if not __SPECTRUM_START.match(buffer, offset):
+			return None
+
+	return offsets
+
+
+def _decode_spectrum(spectrum_xml):
+	"""
+	Parses the XML of a single spectrum and decodes its binary data arrays
+
+	:param spectrum_xml: The ``<spectrum>`` element of an mzML file
+	:type spectrum_xml: bytes
+
+	:return: The retention time in seconds (or :py:obj:`None` if the spectrum
+		does not have one), the mass values and the intensity values
+	:rtype: tuple
+	"""
+
+	element = ElementTree.fromstring(spectrum_xml)
+
+	# Remove any namespaces so the spectrum can be searched by tag alone
+	for child in element.iter():
+		child.tag = __NAMESPACE.sub('', child.tag)
+
+	rt = None
+	scan_start_time = element.find(f".//cvParam[@accession='{__SCAN_START_TIME}']")
+	if scan_start_time is not None:
+		rt = float(scan_start_time.get("value"))
+		if scan_start_time.get("unitName", "minute") != "second":
+			# We need time in seconds not minutes
+			rt *= 60
+
+	arrays = {}
+	for binary_data_array in element.iter("binaryDataArray"):
+		accessions = {param.get("accession") for param in binary_data_array.iter("cvParam")}
+
+		binary = binary_data_array.find("binary")
+		data = base64.b64decode(binary.text or '')
+
+		if __ZLIB_COMPRESSION in accessions:
+			data = zlib.decompress(data)
+		elif __NO_COMPRESSION not in accessions:
+			raise ValueError("Unsupported compression for binary data array")
+
+		dtype = next((__DTYPES[acc] for acc in accessions if acc in __DTYPES), None)
+		if dtype is None:
+			raise ValueError("Unsupported data type for binary data array")
+
+		values = numpy.frombuffer(data, dtype=dtype).astype(numpy.float64)
+
+		if __MZ_ARRAY in accessions:
+			arrays[__MZ_ARRAY] = values
+		elif __INTENSITY_ARRAY in accessions:
+			arrays[__INTENSITY_ARRAY] = values
+
+	mass_values = arrays.get(__MZ_ARRAY, numpy.zeros(0))
+	intensity_values = arrays.get(__INTENSITY_ARRAY, numpy.zeros(0))
+
+	return rt, mass_values, intensity_values
+
+
+def mzML_chunks(file_name, chunk_size=1000):
+	"""
+	Reads an mzML file a chunk of scans at a time
+
+	Spectra without a retention time are skipped, as in :func:`mzML_reader`.
+
+	:param file_name: The name of the mzML file
+	:type file_name: str or pathlib.Path
+	:param chunk_size: The number of scans in each chunk
+	:type chunk_size: int, optional
+
+	:return: Generator of GC-MS data objects containing consecutive scans
+	:rtype: Iterator[:class:`pyms.GCMS.Class.GCMS_data`]
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not is_path(file_name):
+		raise TypeError("'file_name' must be a string or a PathLike object")
+
+	if not isinstance(chunk_size, int):
+		raise TypeError("'chunk_size' must be an integer")
+
+	if chunk_size < 1:
+		raise ValueError("'chunk_size' must be at least 1")
+
+	return _iter_chunks(file_name, chunk_size)
+
+
+def _iter_chunks(file_name, chunk_size):
+	"""
+	Generator of the chunks of scans in an mzML file
+
+	:type file_name: str or pathlib.Path
+	:type chunk_size: int
+
+	:rtype: Iterator[:class:`pyms.GCMS.Class.GCMS_data`]
+	"""
+
+	print(f" -> Reading mzML file '{file_name}'")
+
+	with _MzMLFile(file_name) as mzml_file:
+		decoded = []
+
+		for start, end in mzml_file.spectrum_ranges():
+			spectrum = _decode_spectrum(mzml_file.read(start, end))
+			if spectrum[0] is None:
+				continue
+
+			decoded.append(spectrum)
+
+			if len(decoded) == chunk_size:
+				yield _to_gcms_data(decoded)
+				decoded = []
+
+		if decoded:
+			yield _to_gcms_data(decoded)
+
+
+def mzML_intensity_matrix(
+		file_name, bin_interval=1, bin_left=0.5, bin_right=0.5,
+		min_mass=None, max_mass=None, chunk_size=1000, memmap_file=None,
+		):
+	"""
+	Builds an intensity matrix with flexible bins directly from an mzML file,
+	reading and binning a chunk of scans at a time
+
+	If ``min_mass`` or ``max_mass`` are not given the file is read twice:
+	once to find the mass range and once to bin the data.
+
+	See :func:`pyms.IntensityMatrix.build_intensity_matrix_streamed` for details.
+
+	:param file_name: The name of the mzML file
+	:type file_name: str or pathlib.Path
+	:param bin_interval: interval between bin centres (default 1)
+	:type bin_interval: int or float
+	:param bin_left: left bin boundary offset (default 0.5)
+	:type bin_left: float
+	:param bin_right: right bin boundary offset (default 0.5)
+	:type bin_right: float
+	:param min_mass: Minimum mass to bin (default minimum mass from data)
+	:type min_mass: int or float, optional
+	:param max_mass: Maximum mass to bin (default maximum mass from data)
+	:type max_mass: int or float, optional
+	:param chunk_size: The number of scans to read at a time
+	:type chunk_size: int, optional
+	:param memmap_file: Optional ``.npy`` file to store the intensity array in
+	:type memmap_file: str or pathlib.Path, optional
+
+	:return: Binned IntensityMatrix object
+	:rtype: pyms.IntensityMatrix.IntensityMatrix
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not is_path(file_name):
+		raise TypeError("'file_name' must be a string or a PathLike object")
+
+	with _MzMLFile(file_name) as mzml_file:
+		n_scans = len(mzml_file.spectrum_ranges())
+
+	if not min_mass or max_mass is None:
+		n_scans = 0
+		data_min_mass = data_max_mass = None
+
+		for chunk in mzML_chunks(file_name, chunk_size):
+			n_scans += len(chunk)
+			if chunk.min_mass is not None:
+				data_min_mass = chunk.min_mass if data_min_mass is None else min(data_min_mass, chunk.min_mass)
+				data_max_mass = chunk.max_mass if data_max_mass is None else max(data_max_mass, chunk.max_mass)
+
+		if not min_mass:
+			min_mass = data_min_mass
+		if max_mass is None:
+			max_mass = data_max_mass
+
+	return build_intensity_matrix_streamed(
+			mzML_chunks(file_name, chunk_size),
+			n_scans,
+			min_mass,
+			max_mass,
+			bin_interval=bin_interval,
+			bin_left=bin_left,
+			bin_right=bin_right,
+			memmap_file=memmap_file,
+			)
@@ -16,7 +16,6 @@ import numpy as np
 
 # Project files
 from pyms.GCMS.Class import GCMS_data
-from pyms.Spectrum import Scan
 
 
 
@@ -61,10 +60,15 @@ def Agilent_reader(file_name):
     load_xic(d_file, data, options)
 
     time_list = list(data.time)
-    rows, _ = data.xic.shape
-    scan_list = [Scan(data.mz,list(data.xic[r,:])) for r in range(rows)]
+    rows, cols = data.xic.shape
 
-    return GCMS_data(time_list, scan_list)
+    # Every scan contains all the mass values found in the file
+    return GCMS_data.from_arrays(
+            time_list,
+            np.tile(data.mz, rows),
+            data.xic.ravel(),
+            np.arange(rows + 1) * cols,
+            )
 
 def load_file_info(d_file, data, options):
 
@@ -128,13 +132,10 @@ def load_file_info(d_file, data, options):
     ### end if
 
     # XIC Offset
+    # The table at the TIC offset has a 12 byte record for each scan:
+    # the XIC offset, the retention time and the total intensity.
     d_file.seek(options.offset_tic)
-    options.offset_xic = []
-    for _ in range(options.scans):
-        options.offset_xic.append(2 * int32(d_file.read(4)) - 2)
-        d_file.seek(d_file.tell() + 8) # Skipping 8 bytes after each read
-
-#     options.offset_xic = [2 * int32(d_file.read(4)) - 2 for x in range(options.scans)]
+    options.offset_xic = (2 * read_scan_table(d_file, options.scans)[:, 0] - 2).tolist()
 
     # Normalization Offset
     dat =  d_file.read(4)
@@ -149,23 +150,25 @@ def load_tic(d_file, data, options):
     offset = options.offset_tic
     time_scale = 60000.
 
-    data.time = []
-    data.tic = []
+    # Read the whole table in one go
+    d_file.seek(offset)
+    table = read_scan_table(d_file, scans)
 
     # Time values
-    d_file.seek(offset+4)
-    for _ in range(scans):
-        data.time.append(int32(d_file.read(4))/time_scale)
-        d_file.seek(d_file.tell() + 8) # Skip 8 bytes after the last read
-    ### end for
+    data.time = (table[:, 1] / time_scale).tolist()
 
     # Total Intensity Values
-    d_file.seek(offset+8)
-    for _ in range(scans):
-        data.tic.append(int32(d_file.read(4)))
-        d_file.seek(d_file.tell() + 8) # Skip 8 bytes after the last read
+    data.tic = table[:, 2].tolist()
 ### end load_tic
 
+def read_scan_table(d_file, scans):
+    """
+    Reads the table of 12 byte per-scan records at the current position
+    of the file, returning it as an array of big-endian int32 with one row per scan
+    """
+
+    return np.frombuffer(d_file.read(12 * scans), dtype='>i4').reshape(scans, 3).astype(np.int64)
+
 def load_xic(d_file, data, options):
 
     assert options.scans is not None and options.offset_xic is not None
@@ -173,48 +176,54 @@ def load_xic(d_file, data, options):
     scans = options.scans
     offset = options.offset_xic
 
-    mz = []
-    xic = []
-    ns = []
+    ns = np.zeros(scans, dtype=int)
+    blocks = []
     for i in range(scans):
         # Scan size
         d_file.seek(offset[i])
-        n_i = (int16(d_file.read(2)) -18) // 2 + 2
+        n_i = (int16(d_file.read(2)) - 18) // 2 + 2
+        ns[i] = n_i
 
-        # Mass values
+        # Mass and abundance values, interleaved as big-endian uint16
         d_file.seek(offset[i] + 18)
-        for _ in range(n_i):
-            mz_reading = uint16(d_file.read(2))
-            mz_val =  mz_reading / 20
-            mz_val = round(mz_val * 10**options.precision) / (10**options.precision)
-            mz.append(mz_val)
-
-            xic_val = uint16(d_file.read(2))
-            xic.append((xic_val & 16383) * (8**(xic_val >> 14)))
-        ### end for _ in range(n_i)
-        ns.append(n_i)
+        blocks.append(np.frombuffer(d_file.read(4 * n_i), dtype='>u2'))
     ### end for
 
-    data.mz =  np.unique(mz)
-    index = np.zeros((scans,2),dtype=int)
+    pairs = np.concatenate(blocks).astype(np.int64) if blocks else np.zeros(0, dtype=np.int64)
 
-    index[:,1] = np.cumsum(ns,dtype=int)
-    index[:,0] = np.roll(index[:,1],1)
-    index[0,0] = 0
+    # Mass values
+    mz = pairs[0::2] / 20
+    mz = np.rint(mz * 10**options.precision) / (10**options.precision)
+
+    # Abundance values are compressed with a 2 bit exponent (base 8) and 14 bit mantissa
+    abundances = pairs[1::2]
+    xic = (abundances & 16383) * (8**(abundances >> 14))
 
-    xic = np.array(xic)
-    data.xic = np.zeros((len(data.time), len(data.mz)))
     # Index columns
-    (in_data, cols) = ismember(mz, data.mz)
+    data.mz, cols = np.unique(mz, return_inverse=True)
+    rows = np.repeat(np.arange(scans), ns)
 
-    for i in range(scans):
-        data.xic[i,cols[index[i,0]:index[i,1]+1]] = xic[index[i,0]:index[i,1]+1]
-    ### end for
+    data.xic = np.zeros((len(data.time), len(data.mz)))
+    data.xic[rows, cols] = xic
 ### end load_xic # Don't need to return data, options because of side-effects.
 
 def ismember(xs, ys):
-    lia_b = np.array([(x in ys, np.min(np.where(x == ys))) for x in xs])
-    return zip(*lia_b)
+    """
+    For each value in ``xs``, returns whether it is in ``ys``, and the
+    lowest index of that value in ``ys`` (or -1 if it is not present)
+    """
+
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+
+    sorter = np.argsort(ys, kind='stable')
+    sorted_ys = ys[sorter]
+
+    pos = np.searchsorted(sorted_ys, xs).clip(max=len(ys) - 1)
+    lia = sorted_ys[pos] == xs
+    locb = np.where(lia, sorter[pos], -1)
+
+    return zip(lia, locb)
 
 
 class SampleInfo:
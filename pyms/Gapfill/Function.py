@@ -25,6 +25,7 @@ Functions to fill missing peak objects
 
 # stdlib
 import csv
+import functools
 import pathlib
 
 # 3rd party
@@ -34,7 +35,7 @@ import numpy
 from pyms.Utils.Utils import is_path
 from pyms.BillerBiemann import get_maxima_list_reduced
 from pyms.Gapfill.Class import MissingPeak, Sample
-from pyms.IntensityMatrix import build_intensity_matrix_i
+from pyms.IntensityMatrix import apply_to_ions, build_intensity_matrix_i
 from pyms.Noise.SavitzkyGolay import savitzky_golay
 from pyms.Peak.Function import ion_area
 from pyms.TopHat import tophat
@@ -81,8 +82,24 @@ def file2matrix(file_name):
 	return numpy.array(matrix)
 
 
+def _smooth_ic(ic, points):
+	"""
+	Smooths and baseline corrects an ion chromatogram for :func:`pyms.Gapfill.Function.missing_peak_finder`
+
+	:type ic: pyms.IonChromatogram.IonChromatogram
+	:type points: int
+
+	:rtype: pyms.IonChromatogram.IonChromatogram
+	"""
+
+	ic1 = savitzky_golay(ic, points)
+	ic_smooth = savitzky_golay(ic1, points)
+
+	return tophat(ic_smooth, struct="1.5m")
+
+
 def missing_peak_finder(sample, file_name, points=3, null_ions=None,
-						crop_ions=None, threshold=1000, rt_window=1, filetype=MZML):
+						crop_ions=None, threshold=1000, rt_window=1, filetype=MZML, executor=None):
 	"""
 	Integrates raw data around missing peak locations to fill NAs in the data matrix
 
@@ -103,6 +120,9 @@ def missing_peak_finder(sample, file_name, points=3, null_ions=None,
 	:type rt_window: float, optional
 	:param filetype: either `MZML` (default) or `NETCDF`
 	:type filetype: int, optional
+	:param executor: The executor to divide the ion chromatograms between when smoothing.
+		See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
 
 	:author: Sean O'Callaghan
 	"""
@@ -134,16 +154,8 @@ def missing_peak_finder(sample, file_name, points=3, null_ions=None,
 
 	im.crop_mass(crop_ions[0], crop_ions[1])
 
-	# get the size of the intensity matrix
-	n_scan, n_mz = im.size
-
 	# smooth data
-	for ii in range(n_mz):
-		ic = im.get_ic_at_index(ii)
-		ic1 = savitzky_golay(ic, points)
-		ic_smooth = savitzky_golay(ic1, points)
-		ic_base = tophat(ic_smooth, struct="1.5m")
-		im.set_ic_at_index(ii, ic_base)
+	apply_to_ions(im, functools.partial(_smooth_ic, points=points), executor)
 
 	for mp in sample.get_missing_peaks():
 
@@ -177,23 +189,21 @@ def missing_peak_finder(sample, file_name, points=3, null_ions=None,
 
 		large_peaks = []
 
-		for rt, intens in maxima_list:
-			if intens > threshold:
-				q1_index = qi1_ion_chrom.get_index_at_time(rt)
-				q2_index = qi2_ion_chrom.get_index_at_time(rt)
-
-				q1_intensity = qi1_ion_chrom.get_intensity_at_index(q1_index)
-				q2_intensity = qi2_ion_chrom.get_intensity_at_index(q2_index)
+		maxima_list = [(rt, intens) for rt, intens in maxima_list if intens > threshold]
+		maxima_rts = [rt for rt, intens in maxima_list]
+		q1_intensities = qi1_ion_chrom.intensity_array[qi1_ion_chrom.get_indices_at_times(maxima_rts)]
+		q2_intensities = qi2_ion_chrom.intensity_array[qi2_ion_chrom.get_indices_at_times(maxima_rts)]
 
-				if q1_intensity > threshold / 2 and q2_intensity > threshold / 2:
-					large_peaks.append([rt, intens])
+		for (rt, intens), q1_intensity, q2_intensity in zip(maxima_list, q1_intensities, q2_intensities):
+			if q1_intensity > threshold / 2 and q2_intensity > threshold / 2:
+				large_peaks.append([rt, intens])
 
 		print(f'found {len(large_peaks):d} peaks above threshold')
 
 		areas = []
-		for peak in large_peaks:
-			apex = ci_ion_chrom.get_index_at_time(peak[0])
-			ia = ci_ion_chrom.get_intensity_array().tolist()
+		apexes = ci_ion_chrom.get_indices_at_times([peak[0] for peak in large_peaks]).tolist()
+		ia = ci_ion_chrom.intensity_array.tolist()
+		for apex in apexes:
 			area, left, right, l_share, r_share = ion_area(ia, apex, 0)
 			areas.append(area)
 
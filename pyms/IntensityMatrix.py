@@ -40,7 +40,8 @@ from pyms.Base import pymsBaseClass
 from pyms.IonChromatogram import IonChromatogram
 from pyms.Mixins import GetIndexTimeMixin, IntensityArrayMixin, MassListMixin, TimeListMixin
 from pyms.Spectrum import MassSpectrum
-from pyms.Utils.IO import prepare_filepath, save_data
+from pyms.Utils.Executor import MPIExecutor, ProcessExecutor, get_executor, row_ranges
+from pyms.Utils.IO import load_arrays, prepare_filepath, save_arrays, save_data
 from pyms.Utils.Utils import is_sequence_of, is_sequence, is_path
 
 
@@ -107,30 +108,6 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		self._min_mass = min(mass_list)
 		self._max_mass = max(mass_list)
 
-		# Try to include parallelism.
-		try:
-			from mpi4py import MPI
-			comm = MPI.COMM_WORLD
-			num_ranks = comm.Get_size()
-			rank = comm.Get_rank()
-			M, N = len(intensity_array), len(intensity_array[0])
-			lrr = (rank * M / num_ranks, (rank + 1) * M / num_ranks)
-			lcr = (rank * N / num_ranks, (rank + 1) * N / num_ranks)
-			m, n = (lrr[1] - lrr[0], lcr[1] - lcr[0])
-			self.comm = comm
-			self.num_ranks = num_ranks
-			self.rank = rank
-			self.M = M
-			self.N = N
-			self.local_row_range = lrr
-			self.local_col_range = lcr
-			self.m = m
-			self.n = n
-
-		# If we can't import mpi4py then continue in serial.
-		except ModuleNotFoundError:
-			pass
-
 	def __len__(self):
 		"""
 		Returns the number of scans in the Intensity Matrix
@@ -183,11 +160,8 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		:author: Luke Hodkinson
 		"""
 
-		# Check for parallel.
-		if hasattr(self, 'comm'):
-			return self.m, self.n
-
-		# If serial call the regular routine.
+		# The whole matrix is local. Parallel work is divided with
+		# an executor from pyms.Utils.Executor instead.
 		return self.size
 
 	@deprecation.deprecated(deprecated_in="2.1.2", removed_in="2.2.0",
@@ -231,19 +205,10 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		:author: Luke Hodkinson
 		"""
 
-		# Check for parallel.
-		if hasattr(self, 'comm'):
-			# At the moment we assume we break the matrix into contiguous
-			# ranges. We've allowed for this to change by wrapping up the
-			# iteration in this method.
-			for i in range(self.local_row_range[0], self.local_row_range[1]):
-				yield i
-
-		else:
-			# Iterate over global indices.
-			n_scan = len(self._intensity_array)
-			for i in range(0, n_scan):
-				yield i
+		# Iterate over global indices.
+		n_scan = len(self._intensity_array)
+		for i in range(0, n_scan):
+			yield i
 
 	def iter_ic_indices(self):
 		"""
@@ -255,19 +220,10 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		:author: Luke Hodkinson
 		"""
 
-		# Check for parallel.
-		if hasattr(self, 'comm'):
-			# At the moment we assume we break the matrix into contiguous
-			# ranges. We've allowed for this to change by wrapping up the
-			# iteration in this method.
-			for i in range(self.local_col_range[0], self.local_col_range[1]):
-				yield i
-
-		else:
-			# Iterate over global indices.
-			n_mz = len(self._intensity_array[0])
-			for i in range(0, n_mz):
-				yield i
+		# Iterate over global indices.
+		n_mz = len(self._intensity_array[0])
+		for i in range(0, n_mz):
+			yield i
 
 	def set_ic_at_index(self, ix, ic):
 		"""
@@ -298,15 +254,7 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		if len(ia) != len(self._intensity_array):
 			raise ValueError("ion chromatogram incompatible with the intensity matrix")
 
-		# Convert 'ia' to a list. By convention, the attribute
-		# _intensity_array of the class IntensityMatrix is a list
-		# of lists. This makes pickling instances of IntensityMatrix
-		# practically possible, since pickling numpy.array objects
-		# produces ten times larger files compared to pickling python
-		# lists.
-		ial = ia.tolist()
-		for i in range(len(ia)):
-			self._intensity_array[i][ix] = ial[i]
+		self._intensity_array[:, ix] = ia
 
 	def get_ic_at_index(self, ix):
 		"""
@@ -325,13 +273,9 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 		if not isinstance(ix, int):
 			raise TypeError("'ix' must be an integer")
 
-		ia = []
-		for i in range(len(self._intensity_array)):
-			ia.append(self._intensity_array[i][ix])
-
-		ic_ia = numpy.array(ia)
+		ic_ia = numpy.array(self._intensity_array[:, ix])
 		mass = self.get_mass_at_index(ix)
-		rt = copy.deepcopy(self._time_list)
+		rt = copy.copy(self._time_list)
 
 		return IonChromatogram(ic_ia, rt, mass)
 
@@ -650,6 +594,284 @@ class IntensityMatrix(pymsBaseClass, TimeListMixin, MassListMixin, IntensityArra
 
 		fp.close()
 
+	def save(self, file_name):
+		"""
+		Saves the intensity matrix to a file in PyMassSpec's native binary format
+
+		:param file_name: The name of the output file
+		:type file_name: str or pathlib.Path
+
+		:author: Dominic Davis-Foster
+		"""
+
+		if not is_path(file_name):
+			raise TypeError("'file_name' must be a string or a PathLike object")
+
+		save_arrays(
+				file_name,
+				{
+						"time_list": numpy.asarray(self._time_list, dtype=numpy.float64),
+						"mass_list": numpy.asarray(self._mass_list, dtype=numpy.float64),
+						"intensity_array": self._intensity_array,
+						},
+				{"class": self.__class__.__name__, "version": __version__},
+				)
+
+	@classmethod
+	def load(cls, file_name, mmap=False):
+		"""
+		Loads an intensity matrix saved with :meth:`~pyms.IntensityMatrix.IntensityMatrix.save`
+
+		:param file_name: The name of the file
+		:type file_name: str or pathlib.Path
+		:param mmap: Whether to memory-map the intensity array rather than reading it
+			into memory. The array is copy-on-write, so changes are not saved to the file.
+		:type mmap: bool, optional
+
+		:rtype: pyms.IntensityMatrix.IntensityMatrix
+
+		:author: Dominic Davis-Foster
+		"""
+
+		arrays, header = load_arrays(file_name, mmap=mmap)
+
+		if header.get("class") != cls.__name__:
+			raise ValueError(f"'{file_name}' does not contain {cls.__name__} data")
+
+		return cls(arrays["time_list"].tolist(), arrays["mass_list"].tolist(), arrays["intensity_array"])
+
+
+class SharedIntensityMatrix(IntensityMatrix):
+	"""
+	Intensity matrix whose intensity array is held in a block of shared memory.
+	Requires Python 3.8 or later.
+
+	Pickling a SharedIntensityMatrix only sends the name of the block, so worker
+	processes which receive it modify the same intensity array as the parent process.
+	This is used by :func:`pyms.IntensityMatrix.apply_to_ions` to transform
+	disjoint blocks of ion chromatograms in place.
+
+	The block is freed by :meth:`~pyms.IntensityMatrix.SharedIntensityMatrix.close`,
+	or when the ``with`` block the matrix is used in ends. The intensity array
+	is then copied back into ordinary memory, so the matrix can still be used.
+
+	:param time_list: Retention time values
+	:type time_list: list
+
+	:param mass_list: Binned mass values
+	:type mass_list: list
+
+	:param intensity_array: Binned intensity values per scan, copied into the shared memory
+	:type intensity_array: a :class:`list` of lists of numbers; or a :class:`numpy.ndarray`
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, time_list, mass_list, intensity_array):
+		"""
+		Initialize the IntensityMatrix data in shared memory
+		"""
+
+		from multiprocessing import shared_memory
+
+		if not is_sequence(intensity_array):
+			raise TypeError("'intensity_array' must be a Sequence, of Sequences, of Numbers")
+
+		intensity_array = numpy.asarray(intensity_array)
+
+		self._shared_memory = shared_memory.SharedMemory(create=True, size=max(1, intensity_array.nbytes))
+		self._shared_name = self._shared_memory.name
+		_shared_blocks[self._shared_name] = self._shared_memory
+
+		shared_array = numpy.ndarray(intensity_array.shape, dtype=intensity_array.dtype, buffer=self._shared_memory.buf)
+		shared_array[:] = intensity_array
+
+		try:
+			super().__init__(time_list, mass_list, shared_array)
+		except Exception:
+			del shared_array
+			self.close()
+			raise
+
+	@classmethod
+	def from_intensity_matrix(cls, im):
+		"""
+		Copies an intensity matrix into shared memory
+
+		:param im: The intensity matrix
+		:type im: pyms.IntensityMatrix.IntensityMatrix
+
+		:rtype: pyms.IntensityMatrix.SharedIntensityMatrix
+		"""
+
+		if not isinstance(im, IntensityMatrix):
+			raise TypeError("'im' must be an IntensityMatrix object")
+
+		return cls(im._time_list, im._mass_list, im._intensity_array)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+	def __reduce__(self):
+		if not self.is_shared:
+			return IntensityMatrix, (self._time_list, self._mass_list, self._intensity_array)
+
+		return (
+				_attach_shared_intensity_matrix,
+				(
+						self._shared_name,
+						self._intensity_array.shape,
+						self._intensity_array.dtype.str,
+						self._time_list,
+						self._mass_list,
+						),
+				)
+
+	@property
+	def is_shared(self):
+		"""
+		Returns whether the intensity array is still in shared memory
+
+		:rtype: bool
+		"""
+
+		return self._shared_name is not None
+
+	def close(self):
+		"""
+		Copies the intensity array back into ordinary memory and releases the
+		shared memory. The block is freed if it was created by this process.
+		"""
+
+		if self._shared_name is None:
+			return
+
+		if hasattr(self, "_intensity_array"):
+			self._intensity_array = numpy.array(self._intensity_array)
+
+		if self._shared_memory is not None:
+			_shared_blocks.pop(self._shared_name, None)
+			try:
+				self._shared_memory.close()
+			except BufferError:
+				# Copies of the matrix unpickled in this process still use the block.
+				# It is unmapped once they have been garbage collected.
+				pass
+			self._shared_memory.unlink()
+			self._shared_memory = None
+
+		self._shared_name = None
+
+
+# The blocks of shared memory created or attached to in this process, by name.
+# Attached blocks are kept open until the process exits, as NumPy arrays may still be using them.
+_shared_blocks = {}
+
+
+def _attach_shared_intensity_matrix(name, shape, dtype, time_list, mass_list):
+	"""
+	Recreates a pickled :class:`pyms.IntensityMatrix.SharedIntensityMatrix`
+	from the name of its block of shared memory
+	"""
+
+	from multiprocessing import resource_tracker, shared_memory
+
+	if name not in _shared_blocks:
+		try:
+			_shared_blocks[name] = shared_memory.SharedMemory(name=name, track=False)
+		except TypeError:
+			# Before Python 3.13 every process which attaches to the block registers
+			# it, and the block would be freed when the first worker process exits.
+			_shared_blocks[name] = shared_memory.SharedMemory(name=name)
+			resource_tracker.unregister(_shared_blocks[name]._name, "shared_memory")
+
+	block = _shared_blocks[name]
+
+	im = SharedIntensityMatrix.__new__(SharedIntensityMatrix)
+	im._shared_name = name
+	# Only the process which created the block frees it
+	im._shared_memory = None
+
+	intensity_array = numpy.ndarray(shape, dtype=dtype, buffer=block.buf)
+	IntensityMatrix.__init__(im, time_list, mass_list, intensity_array)
+
+	return im
+
+
+def apply_to_ions(im, function, executor=None):
+	"""
+	Applies a function to every ion chromatogram of an intensity matrix, in place
+
+	Each worker transforms a contiguous block of the ion chromatograms.
+	With a :class:`pyms.Utils.Executor.ProcessExecutor` the workers modify a
+	:class:`pyms.IntensityMatrix.SharedIntensityMatrix` in place, so the
+	intensity matrix is never pickled. If ``im`` is not already a
+	SharedIntensityMatrix it is copied into shared memory and back.
+
+	:param im: The intensity matrix
+	:type im: pyms.IntensityMatrix.IntensityMatrix
+	:param function: A function which takes an ion chromatogram and returns the
+		new ion chromatogram. For a ProcessExecutor this must be picklable,
+		such as a function defined at the top level of a module or a
+		:func:`functools.partial` of one.
+	:type function: callable
+	:param executor: The executor to divide the ion chromatograms between.
+		See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(im, IntensityMatrix):
+		raise TypeError("'im' must be an IntensityMatrix object")
+	if not callable(function):
+		raise TypeError("'function' must be callable")
+
+	executor = get_executor(executor)
+	n_scan, n_mz = im.size
+
+	if isinstance(executor, MPIExecutor):
+		# Each rank has its own copy of the matrix, so gather the transformed ions on every rank
+		ion_intensities = numpy.empty((n_mz, n_scan), dtype=im._intensity_array.dtype)
+		executor.fill_rows(_transform_ions, ion_intensities, im, function)
+		im._intensity_array[:] = ion_intensities.T
+
+	elif isinstance(executor, ProcessExecutor) and not isinstance(im, SharedIntensityMatrix):
+		with SharedIntensityMatrix.from_intensity_matrix(im) as shared_im:
+			apply_to_ions(shared_im, function, executor)
+			im._intensity_array[:] = shared_im._intensity_array
+
+	else:
+		tasks = [(start, stop, im, function) for start, stop in row_ranges(n_mz, executor.n_workers)]
+		with executor.pool() as pool:
+			# Wait for every block, so any error in the workers is raised here
+			list(pool.map(_apply_to_ion_block, tasks))
+
+
+def _transform_ions(start, stop, im, function):
+	"""
+	Returns the intensities of the ion chromatograms ``start`` to ``stop``
+	transformed by ``function``, for :meth:`pyms.Utils.Executor.Executor.fill_rows`
+
+	:rtype: list of numpy.ndarray
+	"""
+
+	return [function(im.get_ic_at_index(ii)).intensity_array for ii in range(start, stop)]
+
+
+def _apply_to_ion_block(task):
+	"""
+	Transforms the ion chromatograms ``start`` to ``stop`` of an intensity matrix in place
+	"""
+
+	start, stop, im, function = task
+
+	for ii in range(start, stop):
+		im.set_ic_at_index(ii, function(im.get_ic_at_index(ii)))
+
 
 def import_leco_csv(file_name):
 	"""
@@ -849,6 +1071,241 @@ def __fill_bins(data, min_mass, max_mass, bin_interval, bin_left, bin_right):
 	:authors: Qiao Wang, Andrew Isaac, Moshe Olshansky, Vladimir Likic
 	"""
 
+	bl, num_bins, mass_list = _bin_layout(min_mass, max_mass, bin_interval, bin_left, bin_right)
+
+	intensity_matrix = bin_intensities(
+			data.mass_values, data.intensity_values, data.scan_offsets,
+			min_mass, bin_interval, bl, num_bins,
+			)
+
+	return IntensityMatrix(data.time_list, mass_list, intensity_matrix)
+
+
+def _bin_layout(min_mass, max_mass, bin_interval, bin_left, bin_right):
+	"""
+	Calculates the layout of the mass bins
+
+	:param min_mass: minimum mass value
+	:type min_mass: int or float
+	:param max_mass: maximum mass value
+	:type max_mass: int or float
+	:param bin_interval: interval between bin centres
+	:type bin_interval: int or float
+	:param bin_left: left bin boundary offset
+	:type bin_left: float
+	:param bin_right: right bin boundary offset
+	:type bin_right: float
+
+	:return: The left bin boundary offset to use for binning, the number of bins and the bin centres
+	:rtype: tuple
+	"""
+
+	if not (abs(bin_left + bin_right - bin_interval) < 1.0e-6 * bin_interval):
+		raise ValueError("there should be no gaps or overlap.")
+
+	bin_left = abs(bin_left)
+
+	# To convert to int range, ensure bounds are < 1
+	bl = bin_left - int(bin_left)
+
+	# Number of bins
+	num_bins = int(float(max_mass + bl - min_mass) / bin_interval) + 1
+
+	# initialise masses to bin centres
+	mass_list = [i * bin_interval + min_mass for i in range(num_bins)]
+
+	return bl, num_bins, mass_list
+
+
+def build_intensity_matrix_streamed(
+		chunks, n_scans, min_mass, max_mass,
+		bin_interval=1, bin_left=0.5, bin_right=0.5, memmap_file=None,
+		):
+	"""
+	Builds an intensity matrix with flexible bins from raw data that is read
+	a chunk of scans at a time, so the full raw data is never held in memory
+
+	The intensity array is allocated once, before any data is read, and
+	each chunk is binned directly into it. If ``memmap_file`` is given the
+	array is a memory-mapped ``.npy`` file, so the matrix itself does not
+	need to fit in memory either.
+
+	:param chunks: Consecutive chunks of raw data, such as from
+		:func:`pyms.GCMS.IO.ANDI.ANDI_chunks` or :func:`pyms.GCMS.IO.MZML.mzML_chunks`
+	:type chunks: Iterable[pyms.GCMS.Class.GCMS_data]
+	:param n_scans: The total number of scans in ``chunks``. If fewer scans are read
+		the intensity matrix is truncated.
+	:type n_scans: int
+	:param min_mass: Minimum mass to bin
+	:type min_mass: int or float
+	:param max_mass: Maximum mass to bin
+	:type max_mass: int or float
+	:param bin_interval: interval between bin centres (default 1)
+	:type bin_interval: int or float
+	:param bin_left: left bin boundary offset (default 0.5)
+	:type bin_left: float
+	:param bin_right: right bin boundary offset (default 0.5)
+	:type bin_right: float
+	:param memmap_file: Optional ``.npy`` file to store the intensity array in
+	:type memmap_file: str or pathlib.Path, optional
+
+	:return: Binned IntensityMatrix object
+	:rtype: pyms.IntensityMatrix.IntensityMatrix
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(n_scans, int):
+		raise TypeError("'n_scans' must be an integer")
+
+	if not isinstance(min_mass, Number) or not isinstance(max_mass, Number):
+		raise TypeError("'min_mass' and 'max_mass' must be numbers")
+
+	if bin_interval <= 0:
+		raise ValueError("The bin interval must be larger than zero.")
+
+	if not isinstance(bin_left, Number):
+		raise TypeError("'bin_left' must be a Number.")
+
+	if not isinstance(bin_right, Number):
+		raise TypeError("'bin_right' must be a Number.")
+
+	if memmap_file is not None and not is_path(memmap_file):
+		raise TypeError("'memmap_file' must be a string or a PathLike object")
+
+	bl, num_bins, mass_list = _bin_layout(min_mass, max_mass, bin_interval, bin_left, bin_right)
+
+	if memmap_file is None:
+		intensity_array = numpy.zeros((n_scans, num_bins))
+	else:
+		intensity_array = numpy.lib.format.open_memmap(
+				prepare_filepath(memmap_file), mode="w+", dtype=numpy.float64, shape=(n_scans, num_bins),
+				)
+
+	time_list = []
+
+	for chunk in chunks:
+		start = len(time_list)
+		stop = start + len(chunk)
+
+		if stop > n_scans:
+			raise ValueError("'chunks' contains more than 'n_scans' scans")
+
+		bin_intensities(
+				chunk.mass_values, chunk.intensity_values, chunk.scan_offsets,
+				min_mass, bin_interval, bl, num_bins, out=intensity_array[start:stop],
+				)
+		time_list.extend(chunk.time_list)
+
+	if len(time_list) < n_scans:
+		intensity_array = intensity_array[:len(time_list)]
+
+	return IntensityMatrix(time_list, mass_list, intensity_array)
+
+
+def bin_intensities(mass_values, intensity_values, scan_offsets, min_mass, bin_interval, bl, num_bins, out=None):
+	"""
+	Bins the raw intensities of a run of scans in a single vectorised pass
+
+	The mass and intensity values of all scans are given as two flat arrays,
+	with the scan boundaries given by ``scan_offsets``, in the same way as the
+	``point_count`` layout of ANDI-MS files. Scan ``i`` is made up of the
+	points ``scan_offsets[i]`` to ``scan_offsets[i + 1]``.
+
+	The bin index of each point is ``int((mass + bl - min_mass) / bin_interval)``,
+	as for the original loop-based binning, and the intensities are accumulated
+	in point order, so the results are identical. Points which fall below the
+	first bin are discarded.
+
+	:param mass_values: The mass values of all scans
+	:type mass_values: numpy.ndarray
+	:param intensity_values: The intensity values of all scans
+	:type intensity_values: numpy.ndarray
+	:param scan_offsets: Offsets of the start of each scan in ``mass_values``,
+		with the total number of points as the final element
+	:type scan_offsets: numpy.ndarray
+	:param min_mass: The mass of the first bin centre
+	:type min_mass: int or float
+	:param bin_interval: interval between bin centres
+	:type bin_interval: int or float
+	:param bl: Fractional part of the left bin boundary offset
+	:type bl: float
+	:param num_bins: The number of bins
+	:type num_bins: int
+	:param out: Optional array of shape ``(len(scan_offsets) - 1, num_bins)``
+		to accumulate the binned intensities into, e.g. a memory-mapped array
+	:type out: numpy.ndarray, optional
+
+	:return: Binned intensity values, one row per scan
+	:rtype: numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	mass_values = numpy.asarray(mass_values, dtype=numpy.float64)
+	intensity_values = numpy.asarray(intensity_values, dtype=numpy.float64)
+	scan_offsets = numpy.asarray(scan_offsets, dtype=numpy.intp)
+
+	if len(mass_values) != len(intensity_values):
+		raise ValueError("'mass_values' and 'intensity_values' are not the same length")
+
+	n_scans = len(scan_offsets) - 1
+
+	if out is not None and out.shape != (n_scans, num_bins):
+		raise ValueError(f"'out' must have shape {(n_scans, num_bins)}")
+
+	# The scan each point belongs to
+	scan_numbers = numpy.repeat(numpy.arange(n_scans, dtype=numpy.intp), numpy.diff(scan_offsets))
+
+	# Truncate towards zero, as int() does
+	bin_numbers = ((mass_values + bl - min_mass) / bin_interval).astype(numpy.intp)
+
+	if bin_numbers.size and bin_numbers.max() >= num_bins:
+		raise IndexError("mass value out of range of the bins")
+
+	in_range = bin_numbers >= 0
+	if not in_range.all():
+		scan_numbers = scan_numbers[in_range]
+		bin_numbers = bin_numbers[in_range]
+		intensity_values = intensity_values[in_range]
+
+	flat_index = scan_numbers * num_bins + bin_numbers
+	binned = numpy.bincount(flat_index, weights=intensity_values, minlength=n_scans * num_bins)
+	binned = binned.reshape(n_scans, num_bins)
+
+	if out is None:
+		return binned
+
+	out += binned
+	return out
+
+
+def __fill_bins_loop(data, min_mass, max_mass, bin_interval, bin_left, bin_right):
+	"""
+	Fills the intensity values for all bins, one point at a time
+
+	Superseded by the vectorised :func:`~pyms.IntensityMatrix.bin_intensities`,
+	but retained as a reference implementation for testing and benchmarking.
+
+	:param data: Raw GCMS data
+	:type data: pyms.GCMS.Class.GCMS_data
+	:param min_mass: minimum mass value
+	:type min_mass: int or float
+	:param max_mass: maximum mass value
+	:type max_mass: int or float
+	:param bin_interval: interval between bin centres
+	:type bin_interval: int or float
+	:param bin_left: left bin boundary offset
+	:type bin_left: float
+	:param bin_right: right bin boundary offset
+	:type bin_right: float
+
+	:return: Binned IntensityMatrix object
+	:rtype: pyms.IntensityMatrix.IntensityMatrix
+
+	:authors: Qiao Wang, Andrew Isaac, Moshe Olshansky, Vladimir Likic
+	"""
+
 	if not (abs(bin_left + bin_right - bin_interval) < 1.0e-6 * bin_interval):
 		raise ValueError("there should be no gaps or overlap.")
 
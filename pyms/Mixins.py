@@ -24,7 +24,6 @@ Mixins for pyms Classes
 ################################################################################
 
 # stdlib
-import math
 from numbers import Number
 from warnings import warn
 
@@ -34,9 +33,12 @@ import numpy
 
 # this package
 from pyms import __version__
+from pyms.Utils.Utils import is_sequence
 
 
 class MaxMinMassMixin:
+	__slots__ = ()
+
 	@deprecation.deprecated(deprecated_in="2.1.2", removed_in="2.2.0",
 							current_version=__version__,
 							details="Use 'max_mass' attribute instead")
@@ -99,6 +101,7 @@ class MaxMinMassMixin:
 
 
 class MassListMixin(MaxMinMassMixin):
+	__slots__ = ()
 
 	@property
 	def mass_list(self):
@@ -260,6 +263,8 @@ class GetIndexTimeMixin:
 		"""
 		Returns the nearest index corresponding to the given time
 
+		If the time is equally close to two scans the lower index is returned.
+
 		:param time: Time in seconds
 		:type time: float
 
@@ -269,27 +274,92 @@ class GetIndexTimeMixin:
 		:author: Lewis Lee
 		:author: Tim Erwin
 		:author: Vladimir Likic
+		:author: Dominic Davis-Foster (binary search)
 		"""
 
 		if not isinstance(time, Number):
 			raise TypeError("'time' must be a number")
 
-		if (time < self._min_rt) or (time > self._max_rt):
+		if not self._min_rt <= time <= self._max_rt:
+			raise IndexError(f"time {time:.2f} is out of bounds (min: {self._min_rt:.2f}, max: {self._max_rt:.2f})")
+
+		return int(self._nearest_indices(numpy.array([time], dtype=float))[0])
+
+	def get_indices_at_times(self, times):
+		"""
+		Returns the nearest index corresponding to each of the given times
+
+		This gives the same results as calling
+		:meth:`~pyms.Mixins.GetIndexTimeMixin.get_index_at_time` for each time.
+
+		:param times: Times in seconds
+		:type times: list or numpy.ndarray
+
+		:return: Nearest index corresponding to each time
+		:rtype: numpy.ndarray
+
+		:author: Dominic Davis-Foster
+		"""
+
+		if not is_sequence(times):
+			raise TypeError("'times' must be a Sequence of numbers")
+
+		times = numpy.asarray(times)
+		if times.size and times.dtype.kind not in "biuf":
+			raise TypeError("'times' must be a Sequence of numbers")
+		times = times.astype(float)
+
+		out_of_bounds = ~((self._min_rt <= times) & (times <= self._max_rt))
+		if out_of_bounds.any():
+			time = times[out_of_bounds][0]
 			raise IndexError(f"time {time:.2f} is out of bounds (min: {self._min_rt:.2f}, max: {self._max_rt:.2f})")
 
-		time_list = self._time_list
-		time_diff_min = self._max_rt
-		ix_match = None
+		return self._nearest_indices(times)
+
+	def _get_time_array(self):
+		"""
+		Returns the time list as an array, and whether it is in ascending order.
+
+		The array is cached until the time list is replaced.
+
+		:rtype: tuple
+		"""
+
+		cache = getattr(self, "_time_array_cache", None)
+
+		if cache is None or cache[0] is not self._time_list or cache[1].size != len(self._time_list):
+			time_array = numpy.array(self._time_list, dtype=float).reshape(-1)
+			time_array.flags.writeable = False
+			is_sorted = bool(numpy.all(time_array[1:] >= time_array[:-1]))
+			cache = self._time_array_cache = (self._time_list, time_array, is_sorted)
+
+		return cache[1], cache[2]
+
+	def _nearest_indices(self, times):
+		"""
+		Returns the index of the nearest time in the time list to each of the given times,
+		which must be within its bounds
+
+		:param times: Times in seconds
+		:type times: numpy.ndarray
+
+		:rtype: numpy.ndarray
+		"""
+
+		time_array, is_sorted = self._get_time_array()
 
-		for ix in range(len(time_list)):
+		if not is_sorted:
+			return numpy.array([numpy.argmin(numpy.abs(time_array - time)) for time in times], dtype=int)
 
-			time_diff = math.fabs(time - time_list[ix])
+		# The first scans at or after, and before, each time
+		right = numpy.minimum(numpy.searchsorted(time_array, times, side="left"), time_array.size - 1)
+		left = numpy.maximum(right - 1, 0)
+		# Use the first of any repeated times
+		left = numpy.searchsorted(time_array, time_array[left], side="left")
 
-			if time_diff < time_diff_min:
-				ix_match = ix
-				time_diff_min = time_diff
+		closer_left = numpy.abs(times - time_array[left]) <= numpy.abs(times - time_array[right])
 
-		return ix_match
+		return numpy.where(closer_left, left, right).astype(int)
 
 	def get_time_at_index(self, ix):
 		"""
@@ -25,20 +25,24 @@ Savitzky-Golay noise filter
 
 # stdlib
 import copy
+import functools
+import math
 
 # 3rd party
 import numpy
+from scipy import ndimage
 
 # this package
 from pyms.GCMS.Function import ic_window_points
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
+from pyms.Utils.Executor import SerialExecutor, get_executor
 
 __DEFAULT_WINDOW = 7
 __DEFAULT_POLYNOMIAL_DEGREE = 2
 
 
-def savitzky_golay(ic, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGREE):
+def savitzky_golay(ic, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGREE, deriv=0):
 	"""
 	Applies Savitzky-Golay filter on ion chromatogram
 
@@ -51,6 +55,11 @@ def savitzky_golay(ic, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGR
 	:type window: int or str, optional
 	:param degree: degree of the fitting polynomial for the Savitzky-Golay filter
 	:type degree: int, optional
+	:param deriv: The order of the derivative to return. 0 smooths the ion
+		chromatogram, 1 returns its smoothed first derivative, and so on.
+		Derivatives are per scan; divide by ``ic.time_step ** deriv`` for
+		derivatives per second.
+	:type deriv: int, optional
 
 	:return: Smoothed ion chromatogram
 	:rtype: pyms.IonChromatogram.IonChromatogram
@@ -75,7 +84,7 @@ def savitzky_golay(ic, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGR
 	# print("      Window width (points): %d" % ( 2*wing_length+1 ))
 	# print("      Polynomial degree: %d" % ( degree ))
 
-	coeff = __calc_coeff(wing_length, degree)
+	coeff = _filter_kernel(wing_length, degree, deriv)
 	ia_denoise = __smooth(ia, coeff)
 
 	ic_denoise = copy.deepcopy(ic)
@@ -84,11 +93,14 @@ def savitzky_golay(ic, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGR
 	return ic_denoise
 
 
-def savitzky_golay_im(im, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGREE):
+def savitzky_golay_im(im, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_DEGREE, executor=None, deriv=0):
 	"""
 	Applies Savitzky-Golay filter on Intensity Matrix
 
-	Simply wraps around the Savitzky Golay function above
+	All ion chromatograms are filtered at once by convolving the intensity
+	array with the filter coefficients along the time axis. The result is the
+	same as applying :func:`~pyms.Noise.SavitzkyGolay.savitzky_golay` to each
+	ion chromatogram.
 
 	:param im: The input IntensityMatrix
 	:type im: pyms.IntensityMatrix.IntensityMatrix
@@ -97,6 +109,12 @@ def savitzky_golay_im(im, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_D
 	:param degree: degree of the fitting polynomial for the Savitzky-Golay
 		filter
 	:type degree: int, optional
+	:param executor: The executor to divide the ion chromatograms between.
+		See :func:`pyms.Utils.Executor.get_executor`.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
+	:param deriv: The order of the derivative to return.
+		See :func:`~pyms.Noise.SavitzkyGolay.savitzky_golay`.
+	:type deriv: int, optional
 
 	:return: Smoothed IntensityMatrix
 	:rtype: pyms.IntensityMatrix.IntensityMatrix
@@ -113,16 +131,93 @@ def savitzky_golay_im(im, window=__DEFAULT_WINDOW, degree=__DEFAULT_POLYNOMIAL_D
 	if not isinstance(degree, int):
 		raise TypeError("'degree' must be an integer")
 
-	n_scan, n_mz = im.size
+	wing_length = ic_window_points(im.get_ic_at_index(0), window, half_window=True)
+	coeff = _filter_kernel(wing_length, degree, deriv)
 
-	im_smooth = copy.deepcopy(im)
+	executor = get_executor(executor)
+	intensity_array = im._intensity_array
 
-	for ii in range(n_mz):
-		ic = im_smooth.get_ic_at_index(ii)
-		ic_smooth = savitzky_golay(ic, window, degree)
-		im_smooth.set_ic_at_index(ii, ic_smooth)
+	if isinstance(executor, SerialExecutor):
+		ia_denoise = _convolve_columns(intensity_array, coeff)
+	else:
+		# Each worker filters a block of the ion chromatograms
+		ion_intensities = numpy.empty((intensity_array.shape[1], intensity_array.shape[0]))
+		executor.fill_rows(_convolve_ion_rows, ion_intensities, intensity_array, coeff)
+		ia_denoise = numpy.ascontiguousarray(ion_intensities.T)
 
-	return im_smooth
+	return IntensityMatrix(copy.copy(im._time_list), copy.copy(im._mass_list), ia_denoise)
+
+
+def _convolve_columns(intensity_array, coeff):
+	"""
+	Convolves each column of an intensity array with the filter coefficients
+
+	Values beyond either end of the array are taken to be zero, as in :func:`numpy.convolve`.
+
+	:param intensity_array: Intensity values, with one row per scan
+	:type intensity_array: numpy.ndarray
+	:param coeff: Filter coefficients, from :func:`~pyms.Noise.SavitzkyGolay._filter_kernel`
+	:type coeff: numpy.ndarray
+
+	:rtype: numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	return ndimage.convolve1d(
+			numpy.asarray(intensity_array, dtype=float),
+			coeff,
+			axis=0,
+			mode="constant",
+			cval=0.0,
+			)
+
+
+def _convolve_ion_rows(start, stop, intensity_array, coeff):
+	"""
+	Returns the filtered intensities of the ion chromatograms ``start`` to ``stop``,
+	for :meth:`pyms.Utils.Executor.Executor.fill_rows`
+
+	:rtype: numpy.ndarray
+	"""
+
+	return _convolve_columns(intensity_array[:, start:stop], coeff).T
+
+
+@functools.lru_cache(maxsize=32)
+def _filter_kernel(num_points, pol_degree, diff_order=0):
+	"""
+	Returns the convolution kernel of a Savitzky-Golay filter
+
+	The coefficients calculated by __calc_coeff() are scaled by ``diff_order!``,
+	so derivatives are per point, and reversed for derivatives, as
+	:func:`numpy.convolve` reverses the kernel. The kernels are cached,
+	so must not be modified.
+
+	:param num_points: Means that 2*num_points+1 values contribute to the smoother
+	:type num_points: int
+	:param pol_degree: The degree of fitting polynomial
+	:type pol_degree: int
+	:param diff_order: The order of the derivative
+	:type diff_order: int, optional
+
+	:rtype: numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(diff_order, int):
+		raise TypeError("'deriv' must be an integer")
+	if not 0 <= diff_order <= pol_degree:
+		raise ValueError("'deriv' must be between 0 and the degree of the polynomial")
+
+	coeff = __calc_coeff(num_points, pol_degree, diff_order)
+
+	if diff_order:
+		coeff = coeff[::-1] * math.factorial(diff_order)
+
+	coeff.flags.writeable = False
+	return coeff
 
 
 def __calc_coeff(num_points, pol_degree, diff_order=0):
@@ -141,7 +236,6 @@ def __calc_coeff(num_points, pol_degree, diff_order=0):
 	:param diff_order: The degree of implicit differentiation.  0 means
 		that filter results in smoothing of function, 1 means that filter
 		results in smoothing the first derivative of function, and so on.
-		Always use 0
 	:type diff_order: int, optional
 
 	:return: Filter coefficients
@@ -25,15 +25,16 @@ Moving window noise filter
 
 # stdlib
 import copy
-from statistics import median
 
 # 3rd party
 import numpy
+from scipy import ndimage
 
 # this package
 from pyms.GCMS.Function import ic_window_points
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
+from pyms.Utils.Executor import SerialExecutor, get_executor
 
 
 __DEFAULT_WINDOW = 3
@@ -83,11 +84,13 @@ def window_smooth(ic, window=__DEFAULT_WINDOW, use_median=False):
     return ic_denoise
 
 
-def window_smooth_im(im, window=__DEFAULT_WINDOW, use_median=False):
+def window_smooth_im(im, window=__DEFAULT_WINDOW, use_median=False, executor=None):
     """
     Applies window smoothing on Intensity Matrix
 
-              Simply wraps around the window smooth function above
+    All ion chromatograms are smoothed at once along the time axis of the
+    intensity array. The result is the same as applying
+    :func:`~pyms.Noise.Window.window_smooth` to each ion chromatogram.
 
     :param im: The input Intensity Matrix
     :type im: pyms.IntensityMatrix.IntensityMatrix
@@ -96,34 +99,76 @@ def window_smooth_im(im, window=__DEFAULT_WINDOW, use_median=False):
     :param use_median: An indicator whether the mean or median window smoothing
         to be used
     :type use_median: bool, optional
+    :param executor: The executor to divide the ion chromatograms between.
+        See :func:`pyms.Utils.Executor.get_executor`.
+    :type executor: pyms.Utils.Executor.Executor or str, optional
 
     :return: Smoothed Intensity Matrix
     :rtype: pyms.IntensityMatrix.IntensityMatrix
 
     :author: Sean O'Callaghan
     :author: Vladimir Likic
+    :author: Dominic Davis-Foster
     """
 
     if not isinstance(im, IntensityMatrix):
         raise TypeError("'im' must be an IntensityMatrix object")
+    if not isinstance(window, (int, str)):
+        raise TypeError("'window' must be a int or string")
+    if not isinstance(use_median, bool):
+        raise TypeError("'median' must be a Boolean")
+
+    wing_length = ic_window_points(im.get_ic_at_index(0), window, half_window=True)
+
+    executor = get_executor(executor)
+    intensity_array = im._intensity_array
+
+    if isinstance(executor, SerialExecutor):
+        ia_denoise = _smooth_columns(intensity_array, wing_length, use_median)
+    else:
+        # Each worker smooths a block of the ion chromatograms
+        ion_intensities = numpy.empty((intensity_array.shape[1], intensity_array.shape[0]))
+        executor.fill_rows(_smooth_ion_rows, ion_intensities, intensity_array, wing_length, use_median)
+        ia_denoise = numpy.ascontiguousarray(ion_intensities.T)
+
+    return IntensityMatrix(copy.copy(im._time_list), copy.copy(im._mass_list), ia_denoise)
+
+
+def _smooth_columns(intensity_array, wing_length, use_median):
+    """
+    Applies mean- or median-window averaging to each column of an intensity array
 
-    n_scan, n_mz = im.size
+    :rtype: numpy.ndarray
 
-    im_smooth = copy.deepcopy(im)
+    :author: Dominic Davis-Foster
+    """
+
+    if use_median:
+        return __median_window(intensity_array, wing_length)
+    else:
+        return __mean_window(intensity_array, wing_length)
+
+
+def _smooth_ion_rows(start, stop, intensity_array, wing_length, use_median):
+    """
+    Returns the smoothed intensities of the ion chromatograms ``start`` to ``stop``,
+    for :meth:`pyms.Utils.Executor.Executor.fill_rows`
 
-    for ii in range(n_mz):
-        ic = im_smooth.get_ic_at_index(ii)
-        ic_smooth = window_smooth(ic, window, use_median)
-        im_smooth.set_ic_at_index(ii, ic_smooth)
+    :rtype: numpy.ndarray
+    """
 
-    return im_smooth
+    return _smooth_columns(intensity_array[:, start:stop], wing_length, use_median).T
 
 
 def __mean_window(ia, wing_length):
     """
     Applies mean-window averaging on the array of intensities.
 
-    :param ia: Intensity array
+    The window is truncated at either end of the array. The means are
+    calculated from the cumulative sum of the intensities, so the time taken
+    does not depend on the size of the window.
+
+    :param ia: Intensity array. For a 2-D array each column is smoothed.
     :type ia: numpy.core.ndarray
     :param wing_length: An integer value representing the number of
         points on either side of a point in the ion chromatogram
@@ -133,29 +178,32 @@ def __mean_window(ia, wing_length):
     :rtype: numpy.core.ndarray
 
     :author: Vladimir Likic
+    :author: Dominic Davis-Foster (cumulative sum)
     """
 
-    ia_denoise = numpy.repeat([0], ia.size)
+    ia = numpy.asarray(ia, dtype=float)
+    n_points = ia.shape[0]
 
-    index = 0
-    end = ia.size - 1
+    cumulative = numpy.zeros((n_points + 1, ) + ia.shape[1:])
+    numpy.cumsum(ia, axis=0, out=cumulative[1:])
 
-    while index <= end:
-        left = index - wing_length
-        right = index + wing_length + 1
-        if left < 0:
-            left = 0
-        ia_denoise[index] = ia[left:right].mean()
-        index = index + 1
+    index = numpy.arange(n_points)
+    left = numpy.maximum(index - wing_length, 0)
+    right = numpy.minimum(index + wing_length + 1, n_points)
+    counts = (right - left).reshape((n_points, ) + (1, ) * (ia.ndim - 1))
 
-    return ia_denoise
+    return (cumulative[right] - cumulative[left]) / counts
 
 
 def __median_window(ia, wing_length):
     """
     Applies median-window averaging on the array of intensities.
 
-    :param ia: Intensity array
+    The window is truncated at either end of the array. Away from the ends
+    the sliding median is calculated by :func:`scipy.ndimage.median_filter`,
+    and only the truncated windows are handled separately.
+
+    :param ia: Intensity array. For a 2-D array each column is smoothed.
     :type ia: numpy.core.ndarray
     :param wing_length: An integer value representing the number of
         points on either side of a point in the ion chromatogram
@@ -165,19 +213,20 @@ def __median_window(ia, wing_length):
     :rtype: numpy.core.ndarray
 
     :author: Vladimir Likic
+    :author: Dominic Davis-Foster (sliding median)
     """
 
-    ia_denoise = numpy.repeat([0], ia.size)
+    ia = numpy.asarray(ia, dtype=float)
+    n_points = ia.shape[0]
 
-    index = 0
-    end = ia.size - 1
+    size = (2 * wing_length + 1, ) + (1, ) * (ia.ndim - 1)
+    ia_denoise = ndimage.median_filter(ia, size=size, mode="nearest")
 
-    while index <= end:
-        left = index - wing_length
+    # The windows at either end are truncated rather than padded
+    truncated = set(range(min(wing_length, n_points))) | set(range(max(n_points - wing_length, 0), n_points))
+    for index in truncated:
+        left = max(index - wing_length, 0)
         right = index + wing_length + 1
-        if left < 0:
-            left = 0
-        ia_denoise[index] = median(ia[left:right])
-        index = index + 1
+        ia_denoise[index] = numpy.median(ia[left:right], axis=0)
 
     return ia_denoise
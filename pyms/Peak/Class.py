@@ -30,6 +30,7 @@ from warnings import warn
 
 # 3rd party
 import deprecation
+import numpy
 
 # this package
 from pyms import __version__
@@ -221,29 +222,19 @@ class Peak(pymsBaseClass):
 		if mass_min >= mass_max:
 			raise ValueError("'mass_min' must be less than 'mass_max'")
 
-		mass_list = self._mass_spectrum.mass_list
-
-		if mass_min < min(mass_list):
-			raise ValueError(f"'mass_min' is less than the smallest mass: {min(mass_list)}")
-		if mass_max > max(mass_list):
-			raise ValueError(f"'mass_max' is greater than the largest mass: {max(mass_list)}")
+		min_mass = self._mass_spectrum.min_mass
+		max_mass = self._mass_spectrum.max_mass
 
-		# pre build mass_list and list of indices
-		new_mass_list = []
-		new_mass_spec = []
-		mass_spec = self._mass_spectrum.mass_spec
-		for ii in range(len(mass_list)):
-			mass = mass_list[ii]
-			if mass_min <= mass <= mass_max:
-				new_mass_list.append(mass)
-				new_mass_spec.append(mass_spec[ii])
+		if mass_min < min_mass:
+			raise ValueError(f"'mass_min' is less than the smallest mass: {min_mass}")
+		if mass_max > max_mass:
+			raise ValueError(f"'mass_max' is greater than the largest mass: {max_mass}")
 
-		self._mass_spectrum.mass_list = new_mass_list
-		self._mass_spectrum.mass_spec = new_mass_spec
+		self._mass_spectrum.crop(mass_min, mass_max, inplace=True)
 
-		if len(new_mass_list) == 0:
+		if len(self._mass_spectrum) == 0:
 			raise ValueError("mass spectrum is now empty")
-		elif len(new_mass_list) < 10:
+		elif len(self._mass_spectrum) < 10:
 			warn("peak mass spectrum contains < 10 points", Warning)
 
 		# update UID
@@ -288,8 +279,7 @@ class Peak(pymsBaseClass):
 		"""
 
 		try:
-			index = self._mass_spectrum.mass_list.index(ion)
-			return self._mass_spectrum.mass_spec[index]
+			return self._mass_spectrum.get_intensity_for_mass(ion)
 		except (ValueError, IndexError):
 			raise IndexError(
 					f"'ion' out of range of mass spectrum (range "
@@ -374,7 +364,7 @@ class Peak(pymsBaseClass):
 
 		if self._mass_spectrum is not None:
 			mass_list = self._mass_spectrum.mass_list
-			mass_spec = self._mass_spectrum.mass_spec
+			mass_spec = self._mass_spectrum.intensity_list
 			# find top two masses
 			best = 0
 			best_ii = 0
@@ -473,7 +463,7 @@ class Peak(pymsBaseClass):
 
 		if self._mass_spectrum is not None:
 			mass_list = self._mass_spectrum.mass_list
-			mass_spec = self._mass_spectrum.mass_spec
+			mass_spec = self._mass_spectrum.intensity_list
 			# find top two masses
 			best = 0
 			best_ii = 0
@@ -519,6 +509,21 @@ class Peak(pymsBaseClass):
 		self._ic_mass = None
 		self.make_UID()
 
+	def _set_mass_spectrum(self, ms, uid):
+		"""
+		Sets the mass spectrum along with its UID, calculated for many peaks
+		at once by :func:`pyms.Peak.Class._make_uids`
+
+		:param ms: The mass spectrum at the apex of the peak
+		:type ms: pyms.Spectrum.MassSpectrum
+		:param uid: The UID for the peak with this mass spectrum
+		:type uid: str
+		"""
+
+		self._mass_spectrum = ms
+		self._ic_mass = None
+		self._UID = uid
+
 	def null_mass(self, mass):
 		"""
 		Ignore given mass in spectra
@@ -747,8 +752,8 @@ class Peak(pymsBaseClass):
 		if not isinstance(num_ions, int):
 			raise TypeError("'n_top_ions' must be an integer")
 
-		intensity_list = self.mass_spectrum.mass_spec
-		mass_list = self.mass_spectrum.mass_list
+		intensity_list = self._mass_spectrum.intensity_list
+		mass_list = self._mass_spectrum.mass_list
 
 		ic_tuple = zip(intensity_list, mass_list)
 
@@ -781,3 +786,56 @@ class Peak(pymsBaseClass):
 	# def __iter__(self):
 	# 	for key, value in self.__dict__().items():
 	# 		yield key, value
+
+
+def _make_uids(rt, mass_list, spectra):
+	"""
+	Calculates the UIDs of many peaks at once, following :meth:`pyms.Peak.Class.Peak.make_UID`
+
+	The UID uses the last two intensities which were larger than every
+	intensity before them. Peaks with no positive intensities are
+	identified by their retention time alone.
+
+	:param rt: The retention time of each peak
+	:type rt: numpy.ndarray
+	:param mass_list: The mass values shared by the spectra,
+		or the mass values of each spectrum as the rows of a 2-D array
+	:type mass_list: numpy.ndarray
+	:param spectra: The intensities of each peak's mass spectrum, one row per peak
+	:type spectra: numpy.ndarray
+
+	:rtype: numpy.ndarray
+	"""
+
+	n_peaks, n_masses = spectra.shape
+	uids = numpy.empty(n_peaks, dtype=object)
+	mass_list = numpy.broadcast_to(mass_list, spectra.shape)
+
+	if not n_masses:
+		uids[:] = [f"{peak_rt:.2f}" for peak_rt in rt]
+		return uids
+
+	# Positions where the intensity exceeds the running maximum of those before it
+	previous_max = numpy.zeros_like(spectra)
+	numpy.maximum.accumulate(spectra[:, :-1], axis=1, out=previous_max[:, 1:])
+	numpy.maximum(previous_max, 0, out=previous_max)
+	records = spectra > previous_max
+
+	rows = numpy.arange(n_peaks)
+	has_best = records.any(axis=1)
+	best = n_masses - 1 - numpy.argmax(records[:, ::-1], axis=1)
+
+	records[rows, best] = False
+	best2 = numpy.where(records.any(axis=1), n_masses - 1 - numpy.argmax(records[:, ::-1], axis=1), 0)
+
+	for index in range(n_peaks):
+		if has_best[index]:
+			best_intensity = spectra[index, best[index]]
+			ratio = int(100 * spectra[index, best2[index]] / best_intensity)
+			best_mass = int(mass_list[index, best[index]])
+			best2_mass = int(mass_list[index, best2[index]])
+			uids[index] = f"{best_mass:d}-{best2_mass:d}-{ratio:d}-{rt[index]:.2f}"
+		else:
+			uids[index] = f"{rt[index]:.2f}"
+
+	return uids
@@ -31,13 +31,14 @@ from statistics import median
 
 # 3rd party
 import deprecation
+import numpy
 from numpy import percentile
 
 # this package
 from pyms import __version__
 from pyms.IntensityMatrix import IntensityMatrix
-from pyms.Peak import Peak
-from pyms.Utils.Utils import is_sequence
+from pyms.Peak import Peak, PeakTable
+from pyms.Utils.Utils import is_sequence, is_sequence_of
 
 
 def peak_sum_area(im, peak, single_ion=False, max_bound=0):
@@ -72,24 +73,21 @@ def peak_sum_area(im, peak, single_ion=False, max_bound=0):
 		raise TypeError("'max_bound' must be an integer")
 
 	sum_area = 0
-	# Use internal values (not copy)
-	# mat = im.matrix_list
-	mat = im.intensity_array
 	ms = peak.mass_spectrum
 	rt = peak.rt
 	apex = im.get_index_at_time(rt)
 
 	# get peak masses with non-zero intensity
-	mass_ii = [ii for ii in range(len(ms.mass_list)) if ms.mass_spec[ii] > 0]
+	mass_ii = numpy.flatnonzero(ms.mass_spec > 0)
 
-	area_dict = {}
 	# get stats on boundaries
-	for ii in mass_ii:
-		# get ion chromatogram as list
-		ia = [mat[scan][ii] for scan in range(len(mat))]
-		area, left, right, l_share, r_share = ion_area(ia, apex, max_bound)
-		# need actual mass for single ion areas
-		actual_mass = ms.mass_list[ii]
+	areas = _ion_areas(im._intensity_array, numpy.full(len(mass_ii), apex), mass_ii, max_bound)[0]
+
+	# need actual mass for single ion areas
+	actual_masses = ms.mass_array[mass_ii].tolist()
+
+	area_dict = {}
+	for actual_mass, area in zip(actual_masses, areas.tolist()):
 		area_dict[actual_mass] = area
 		sum_area += area
 
@@ -121,26 +119,17 @@ def peak_pt_bounds(im, peak):
 	if not isinstance(peak, Peak):
 		raise TypeError("'peak' must be a Peak object")
 
-	# Use internal values (not copy)
-	# mat = im.matrix_list
-	mat = im.intensity_array
 	ms = peak.mass_spectrum
 	rt = peak.rt
 	apex = im.get_index_at_time(rt)
 
 	# get peak masses with non-zero intensity
-	mass_ii = [ii for ii in range(len(ms.mass_list)) if ms.mass_spec[ii] > 0]
-
-	left_list = []
-	right_list = []
+	mass_ii = numpy.flatnonzero(ms.mass_spec > 0)
 
 	# get stats on boundaries
-	for ii in mass_ii:
-		# get ion chromatogram as list
-		ia = [mat[scan][ii] for scan in range(len(mat))]
-		area, left, right, l_share, r_share = ion_area(ia, apex, 0)
-		left_list.append(left)
-		right_list.append(right)
+	area, left, right, l_share, r_share = _ion_areas(im._intensity_array, numpy.full(len(mass_ii), apex), mass_ii)
+	left_list = left.tolist()
+	right_list = right.tolist()
 
 	left_list.sort()
 	right_list.sort()
@@ -187,17 +176,33 @@ def peak_top_ion_areas(im, peak, n_top_ions=5, max_bound=0):
 	top_ions = peak.top_ions(n_top_ions)
 	# print(top_ions)
 
-	for ion in top_ions:
-		ion_chrom = im.get_ic_at_mass(ion)
-		# need ia as a list not numpy array so use .tolist()
-		ia = ion_chrom.intensity_array.tolist()
-		area, left, right, l_share, r_share = ion_area(ia, apex, max_bound)
+	columns = [_ion_column(im, ion) for ion in top_ions]
+	areas = _ion_areas(im._intensity_array, numpy.full(len(columns), apex), columns, max_bound)[0]
+
+	for ion, area in zip(top_ions, areas.tolist()):
 		# need actual mass for single ion areas
 		ion_areas[ion] = area
 
 	return ion_areas
 
 
+def _ion_column(im, ion):
+	"""
+	Returns the index of the ion chromatogram of an intensity matrix for the given mass,
+	as used by :meth:`pyms.IntensityMatrix.IntensityMatrix.get_ic_at_mass`
+
+	:rtype: int
+	"""
+
+	if not isinstance(ion, Number):
+		raise TypeError("'mass' must be a number")
+
+	if ion < im.min_mass or ion > im.max_mass:
+		raise IndexError("mass is out of range")
+
+	return im.get_index_of_mass(ion)
+
+
 @deprecation.deprecated(deprecated_in="2.0.0", removed_in="2.2.0",
 						current_version=__version__,
 						details="Use :func:`pyms.Peak.Function.top_ions_v2` instead")
@@ -222,7 +227,7 @@ def top_ions_v1(peak, num_ions=5):
 	if not isinstance(num_ions, int):
 		raise TypeError("'n_top_ions' must be an integer")
 
-	intensity_list = peak.mass_spectrum.mass_spec
+	intensity_list = peak.mass_spectrum.intensity_list
 	mass_list = peak.mass_spectrum.mass_list
 
 	intensity_list_sorted = copy.deepcopy(intensity_list)
@@ -262,7 +267,7 @@ def top_ions_v2(peak, num_ions=5):
 	if not isinstance(num_ions, int):
 		raise TypeError("'n_top_ions' must be an integer")
 
-	intensity_list = peak.mass_spectrum.mass_spec
+	intensity_list = peak.mass_spectrum.intensity_list
 	mass_list = peak.mass_spectrum.mass_list
 
 	ic_tuple = zip(intensity_list, mass_list)
@@ -405,7 +410,6 @@ def median_bounds(im, peak, shared=True):
 	if not isinstance(shared, bool):
 		raise TypeError("'shared' must be a boolean")
 
-	mat = im.intensity_array
 	ms = peak.mass_spectrum
 	rt = peak.rt
 	apex = im.get_index_at_time(rt)
@@ -415,19 +419,17 @@ def median_bounds(im, peak, shared=True):
 		apex = tmp[1]
 
 	# get peak masses with non-zero intensity
-	mass_ii = [ii for ii in range(len(ms.mass_list)) if ms.mass_spec[ii] > 0]
+	mass_ii = numpy.flatnonzero(ms.mass_spec > 0)
 
 	# get stats on boundaries
-	left_list = []
-	right_list = []
-	for ii in mass_ii:
-		# get ion chromatogram as list
-		ia = [mat[scan][ii] for scan in range(len(mat))]
-		area, left, right, l_share, r_share = ion_area(ia, apex)
-		if shared or not l_share:
-			left_list.append(left)
-		if shared or not r_share:
-			right_list.append(right)
+	area, left, right, l_share, r_share = _ion_areas(im._intensity_array, numpy.full(len(mass_ii), apex), mass_ii)
+
+	if shared:
+		left_list = left.tolist()
+		right_list = right.tolist()
+	else:
+		left_list = left[~l_share].tolist()
+		right_list = right[~r_share].tolist()
 
 	# return medians
 	# NB if shared=True, lists maybe empty
@@ -439,3 +441,258 @@ def median_bounds(im, peak, shared=True):
 		r_med = median(right_list)
 
 	return l_med, r_med
+
+
+def batch_ion_areas(im, peaks, max_bound=0, tol=0.5):
+	"""
+	Calculates the area and bounds of every ion with non-zero intensity in the
+	mass spectra of many peaks at once.
+
+	This gives the same results as calling :func:`~pyms.Peak.Function.ion_area`
+	on the ion chromatogram of each ion of each peak, but the search for
+	the bounds is done for all (peak, ion) pairs together with array
+	operations, over a window around each apex which is widened only for
+	the pairs that need it.
+
+	As in :func:`~pyms.Peak.Function.peak_sum_area`, the apex of each peak is the
+	scan nearest its retention time, and the intensities in each peak's mass
+	spectrum correspond to the ion chromatograms of the intensity matrix in order.
+
+	:param im: The originating IntensityMatrix object
+	:type im: pyms.IntensityMatrix.IntensityMatrix
+	:param peaks: A list of Peak objects, or a PeakTable
+	:type peaks: list or pyms.Peak.Table.PeakTable
+	:param max_bound: Optional value to limit size of detected bound, default 0
+	:type max_bound: int, optional
+	:param tol: Percentage tolerance of added area to current area, default 0.5
+	:type tol: float, optional
+
+	:return: The areas, left bounds, right bounds, shared left and shared right
+		flags, each as an array of shape ``(n_peaks, n_masses)``. The elements
+		for ions with no intensity in a peak are zero.
+	:rtype: tuple of numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(im, IntensityMatrix):
+		raise TypeError("'im' must be an IntensityMatrix object")
+	if not isinstance(peaks, PeakTable) and not is_sequence_of(peaks, Peak):
+		raise TypeError("'peaks' must be a list of Peak objects or a PeakTable")
+	if not isinstance(max_bound, int):
+		raise TypeError("'max_bound' must be an integer")
+	if not isinstance(tol, float):
+		raise TypeError("'tol' must be a float")
+
+	n_peaks = len(peaks)
+	n_mz = len(im.mass_list)
+
+	if isinstance(peaks, PeakTable):
+		rts = peaks.rt.tolist()
+		peak_index, columns = numpy.nonzero(peaks.spectra[:, :n_mz] > 0)
+	else:
+		rts = [peak.rt for peak in peaks]
+		peak_index = []
+		columns = []
+		for index, peak in enumerate(peaks):
+			spec = peak._mass_spectrum.mass_spec[:n_mz]
+			ions = numpy.flatnonzero(spec > 0)
+			peak_index.append(numpy.full(ions.size, index))
+			columns.append(ions)
+		peak_index = numpy.concatenate(peak_index or [[]]).astype(int)
+		columns = numpy.concatenate(columns or [[]]).astype(int)
+
+	apexes = im.get_indices_at_times(rts)
+
+	area, left, right, l_share, r_share = _ion_areas(
+			im._intensity_array, apexes[peak_index], columns, max_bound, tol
+			)
+
+	areas = numpy.zeros((n_peaks, n_mz))
+	left_bounds = numpy.zeros((n_peaks, n_mz), dtype=int)
+	right_bounds = numpy.zeros((n_peaks, n_mz), dtype=int)
+	left_shared = numpy.zeros((n_peaks, n_mz), dtype=bool)
+	right_shared = numpy.zeros((n_peaks, n_mz), dtype=bool)
+
+	areas[peak_index, columns] = area
+	left_bounds[peak_index, columns] = left
+	right_bounds[peak_index, columns] = right
+	left_shared[peak_index, columns] = l_share
+	right_shared[peak_index, columns] = r_share
+
+	return areas, left_bounds, right_bounds, left_shared, right_shared
+
+
+def batch_peak_areas(im, peaks, n_top_ions=5, max_bound=0):
+	"""
+	Calculates the areas of many peaks at once, and stores them in the peaks.
+
+	For a list of peaks, :attr:`Peak.area <pyms.Peak.Class.Peak.area>` is set
+	as by :func:`~pyms.Peak.Function.peak_sum_area` and
+	:attr:`Peak.ion_areas <pyms.Peak.Class.Peak.ion_areas>` as by
+	:func:`~pyms.Peak.Function.peak_top_ion_areas`. For a PeakTable only
+	:attr:`PeakTable.area <pyms.Peak.Table.PeakTable.area>` is set.
+
+	:param im: The originating IntensityMatrix object
+	:type im: pyms.IntensityMatrix.IntensityMatrix
+	:param peaks: A list of Peak objects, or a PeakTable
+	:type peaks: list or pyms.Peak.Table.PeakTable
+	:param n_top_ions: Number of top ions to store areas for, default 5
+	:type n_top_ions: int, optional
+	:param max_bound: Optional value to limit size of detected bound
+		for the top ions, default 0
+	:type max_bound: int, optional
+
+	:return: The area of each peak
+	:rtype: numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if not isinstance(n_top_ions, int):
+		raise TypeError("'n_top_ions' must be an integer")
+
+	areas = batch_ion_areas(im, peaks)[0]
+
+	# The same order of summation as peak_sum_area
+	sum_areas = numpy.array([sum(row[row != 0].tolist()) for row in areas])
+
+	if isinstance(peaks, PeakTable):
+		peaks.area[:] = sum_areas
+		return sum_areas
+
+	top_ions = [peak.top_ions(n_top_ions) for peak in peaks]
+	apexes = im.get_indices_at_times([peak.rt for peak in peaks]).tolist()
+
+	pair_apexes = numpy.array([apex for apex, ions in zip(apexes, top_ions) for _ in ions], dtype=int)
+	columns = numpy.array([_ion_column(im, ion) for ions in top_ions for ion in ions], dtype=int)
+	ion_areas = iter(_ion_areas(im._intensity_array, pair_apexes, columns, max_bound)[0].tolist())
+
+	for peak, area, ions in zip(peaks, sum_areas.tolist(), top_ions):
+		peak.area = area
+		peak.ion_areas = {ion: next(ion_areas) for ion in ions}
+
+	return sum_areas
+
+
+def _ion_areas(intensity_array, apexes, columns, max_bound=0, tol=0.5):
+	"""
+	Calculates the areas and bounds of many ion chromatogram peaks at once,
+	following :func:`~pyms.Peak.Function.ion_area`
+
+	:param intensity_array: The intensity array of the intensity matrix
+	:type intensity_array: numpy.ndarray
+	:param apexes: The scan at the apex of each peak
+	:type apexes: numpy.ndarray
+	:param columns: The ion chromatogram of each peak
+	:type columns: numpy.ndarray or list
+	:param max_bound: Optional value to limit size of detected bound, default 0
+	:type max_bound: int, optional
+	:param tol: Percentage tolerance of added area to current area, default 0.5
+	:type tol: float, optional
+
+	:return: Arrays of the areas, left and right boundary offsets, shared left and shared right
+	:rtype: tuple of numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	apexes = numpy.asarray(apexes, dtype=int)
+	columns = numpy.asarray(columns, dtype=int)
+
+	l_area, left, l_share = _half_areas(intensity_array, apexes, columns, -1, max_bound, tol)
+	r_area, right, r_share = _half_areas(intensity_array, apexes, columns, 1, max_bound, tol)
+	r_area -= intensity_array[apexes, columns]  # counted apex twice for tolerance, now ignore
+
+	return l_area + r_area, left, right, l_share, r_share
+
+
+def _half_areas(intensity_array, apexes, columns, direction, max_bound=0, tol=0.5, window=32):
+	"""
+	Calculates one side of many ion chromatogram peaks at once,
+	following :func:`~pyms.Peak.Function.half_area`
+
+	The intensities are read from a window of scans either side of each apex.
+	Peaks whose bound is not found within the window are searched again with
+	a window twice the size.
+
+	:param intensity_array: The intensity array of the intensity matrix
+	:type intensity_array: numpy.ndarray
+	:param apexes: The scan at the apex of each peak
+	:type apexes: numpy.ndarray
+	:param columns: The ion chromatogram of each peak
+	:type columns: numpy.ndarray
+	:param direction: ``-1`` to search to the left of the apexes, or ``1`` to the right
+	:type direction: int
+	:param max_bound: Optional value to limit size of detected bound, default 0
+	:type max_bound: int, optional
+	:param tol: Percentage tolerance of added area to current area, default 0.5
+	:type tol: float, optional
+	:param window: The number of scans to search initially
+	:type window: int, optional
+
+	:return: Arrays of the half peak areas, boundary offsets and shared flags
+	:rtype: tuple of numpy.ndarray
+
+	:author: Dominic Davis-Foster
+	"""
+
+	n_scans = intensity_array.shape[0]
+	n_pairs = apexes.size
+
+	tol = tol / 200.0  # halve and convert from percent
+
+	# Default number of points to sum new area across, for smoothing
+	wide = 3
+
+	# The number of points from the apex to the end of the ion chromatogram
+	if direction < 0:
+		limits = apexes + 1
+	else:
+		limits = n_scans - apexes
+	if max_bound >= 1:
+		limits = numpy.minimum(max_bound + 1, limits)
+
+	areas = numpy.zeros(n_pairs)
+	bounds = numpy.zeros(n_pairs, dtype=int)
+	shared = numpy.zeros(n_pairs, dtype=bool)
+
+	todo = numpy.arange(n_pairs)
+	while todo.size:
+		steps = int(min(window, limits[todo].max()))
+
+		# The intensities moving away from the apex, with zeros past the end
+		scans = apexes[todo, numpy.newaxis] + direction * numpy.arange(steps + wide - 1)
+		inside = (scans >= 0) & (scans < n_scans)
+		ia = intensity_array[numpy.clip(scans, 0, n_scans - 1), columns[todo, numpy.newaxis]]
+		ia = numpy.where(inside, ia, 0).astype(float)
+
+		# The area and edge after each step, and the edge before it
+		area = numpy.cumsum(ia, axis=1)[:, :steps]
+		edge = ia[:, :steps].copy()
+		for offset in range(1, wide):
+			edge += ia[:, offset:offset + steps]
+		edge /= wide
+		old_edge = numpy.concatenate([2 * edge[:, :1], edge[:, :-1]], axis=1)  # bigger than expected edge
+
+		# Keep moving outwards until:
+		# i) tolerance reached
+		# ii) edge area starts increasing
+		# iii) bound reached
+		index = numpy.arange(1, steps + 1)
+		keep_going = (area * tol < edge) & (edge < old_edge) & (index < limits[todo, numpy.newaxis])
+
+		stopped = ~keep_going
+		found = stopped.any(axis=1)
+		stop = numpy.argmax(stopped, axis=1)
+		rows = numpy.arange(todo.size)
+
+		done = todo[found]
+		areas[done] = area[rows, stop][found]
+		bounds[done] = stop[found]
+		shared[done] = (edge[rows, stop] >= old_edge[rows, stop])[found]
+
+		todo = todo[~found]
+		window *= 2
+
+	return areas, bounds, shared
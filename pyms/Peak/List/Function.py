@@ -31,6 +31,7 @@ import numpy
 
 # this package
 from pyms.Peak import Peak
+from pyms.Peak.Table import PeakTable
 from pyms.Spectrum import MassSpectrum
 from pyms.Utils.Math import median_outliers
 from pyms.Utils.Time import time_str_secs
@@ -41,8 +42,8 @@ def composite_peak(peak_list, ignore_outliers=False):
     """
     Create a peak that consists of a composite spectrum from all spectra in the list of peaks.
 
-    :param peak_list: A list of peak objects
-    :type peak_list: list
+    :param peak_list: A list of peak objects, or a PeakTable
+    :type peak_list: list or pyms.Peak.Table.PeakTable
     :param ignore_outliers:
     :type ignore_outliers: bool, optional
 
@@ -50,9 +51,12 @@ def composite_peak(peak_list, ignore_outliers=False):
     :type: pyms.Peak.Class.Peak
 
     :author: Andrew Isaac
-    :author: Dominic Davis-Foster (type assertions)
+    :author: Dominic Davis-Foster (type assertions, PeakTable support)
     """
 
+    if isinstance(peak_list, PeakTable):
+        return _composite_peak_table(peak_list, ignore_outliers)
+
     if not is_peak_list(peak_list):
         raise TypeError("'peak_list' must be a list of Peak objects")
 
@@ -103,6 +107,47 @@ def composite_peak(peak_list, ignore_outliers=False):
         return None
 
 
+def _composite_peak_table(table, ignore_outliers=False):
+    """
+    Create a peak that consists of a composite spectrum from all spectra in a PeakTable.
+
+    With ``ignore_outliers``, peaks which are outliers by retention time are
+    marked in :attr:`pyms.Peak.Table.PeakTable.is_outlier` and left out,
+    as well as peaks which were already marked.
+
+    :param table: The peaks
+    :type table: pyms.Peak.Table.PeakTable
+    :param ignore_outliers:
+    :type ignore_outliers: bool, optional
+
+    :return: The composite peak
+    :type: pyms.Peak.Class.Peak
+
+    :author: Dominic Davis-Foster
+    """
+
+    if ignore_outliers:
+        if len(table) > 3:
+            table.is_outlier[median_outliers(table.rt)] = True
+        use = ~table.is_outlier
+    else:
+        use = numpy.ones(len(table), dtype=bool)
+
+    if not use.any():
+        return None
+
+    spectra = table.spectra[use]
+
+    # scale all intensities to [0,100]
+    max_spec = spectra.max(axis=1, initial=0) / 100.0
+    scale = numpy.divide(1, max_spec, out=numpy.zeros_like(max_spec), where=max_spec > 0)
+
+    avg_rt = table.rt[use].mean()
+    avg_spec = (spectra * scale[:, None]).mean(axis=0)
+
+    return Peak(float(avg_rt), MassSpectrum(table.mass_list, avg_spec))
+
+
 def fill_peaks(data, peak_list, D, minutes=False):
     """
     Gets the best matching Retention Time and spectra from 'data' for each peak
@@ -111,22 +156,22 @@ def fill_peaks(data, peak_list, D, minutes=False):
     :param data: A data IntensityMatrix that has the same mass range as the
         peaks in the peak list
     :type data: pyms.IntensityMatrix.IntensityMatrix
-    :param peak_list: A list of peak objects
-    :type peak_list: list
+    :param peak_list: A list of peak objects, or a PeakTable
+    :type peak_list: list or pyms.Peak.Table.PeakTable
     :param D: Peak width standard deviation in seconds.
         Determines search window width.
     :type D: float
     :param minutes: Return retention time as minutes
     :type minutes: bool, optional
 
-    :return: List of Peak Objects
-    :type: list of :class:`pyms.Peak.Class.Peak`
+    :return: List of Peak Objects, or a PeakTable if ``peak_list`` is a PeakTable
+    :type: list of :class:`pyms.Peak.Class.Peak` or pyms.Peak.Table.PeakTable
 
     :author: Andrew Isaac
-    :author: Dominic Davis-Foster (type assertions)
+    :author: Dominic Davis-Foster (type assertions, PeakTable support)
     """
 
-    if not is_peak_list(peak_list):
+    if not isinstance(peak_list, PeakTable) and not is_peak_list(peak_list):
         raise TypeError("'peak_list' must be a list of Peak objects")
     if not isinstance(D, float):
         raise TypeError("'D' must be a float")
@@ -141,23 +186,36 @@ def fill_peaks(data, peak_list, D, minutes=False):
 
     datamat = data.intensity_array
     mass_list = data.mass_list
-    datatimes = data.time_list
+    datatimes = numpy.array(data.time_list, dtype='d')
     minrt = min(datatimes)
     maxrt = max(datatimes)
     rtl = 0
     rtr = 0
-    new_peak_list = []
+
+    if isinstance(peak_list, PeakTable):
+        peak_rts = peak_list.rt
+        peak_spectra = peak_list.spectra
+    else:
+        peak_rts = [peak.rt for peak in peak_list]
+        peak_spectra = [peak.mass_spectrum.mass_spec for peak in peak_list]
+
+    # Get bounds
+    lowiis = data.get_indices_at_times(numpy.maximum(numpy.subtract(peak_rts, cutoff), minrt))
+    upiis = data.get_indices_at_times(numpy.minimum(numpy.add(peak_rts, cutoff), maxrt))
+
+    best_rts = []
+    best_spectra = []
     for ii in range(len(peak_list)):
-        spec = peak_list[ii].mass_spectrum.mass_spec
+        spec = peak_spectra[ii]
         spec = numpy.array(spec, dtype='d')
-        rt = peak_list[ii].rt
+        rt = peak_rts[ii]
         sum_spec_squared = numpy.sum(spec**2, axis=0)
 
         # get neighbour RT's
         if ii > 0:
-            rtl = peak_list[ii - 1].rt
+            rtl = peak_rts[ii - 1]
         if ii < len(peak_list) - 1:
-            rtr = peak_list[ii + 1].rt
+            rtr = peak_rts[ii + 1]
         # adjust weighting for neighbours
         rtclose = min(abs(rt - rtl), abs(rt - rtr))
         Dclose = rtclose / math.sqrt(-2.0 * math.log(_PEN))
@@ -167,22 +225,13 @@ def fill_peaks(data, peak_list, D, minutes=False):
         else:
             Dclose = D
 
-        # Get bounds
-        rtlow = rt - cutoff
-        if rtlow < minrt:
-            rtlow = minrt
-        lowii = data.get_index_at_time(rtlow)
-
-        rtup = rt + cutoff
-        if rtup > maxrt:
-            rtup = maxrt
-        upii = data.get_index_at_time(rtup)
+        lowii = lowiis[ii]
+        upii = upiis[ii]
 
         # Get sub matrix of scans in bounds
         submat = datamat[lowii:upii + 1]
         submat = numpy.array(submat, dtype='d')
         subrts = datatimes[lowii:upii + 1]
-        subrts = numpy.array(subrts, dtype='d')
 
         sum_summat_squared = numpy.sum(submat**2, axis=1)
 
@@ -209,8 +258,17 @@ def fill_peaks(data, peak_list, D, minutes=False):
         best_ii = scorearr.argmax()
 
         # Add new peak
-        bestrt = subrts[best_ii]
-        bestspec = submat[best_ii].tolist()
+        best_rts.append(subrts[best_ii])
+        best_spectra.append(submat[best_ii])
+
+    if isinstance(peak_list, PeakTable):
+        best_rts = numpy.array(best_rts, dtype='d')
+        if minutes:
+            best_rts = best_rts * 60.0
+        return PeakTable(best_rts, mass_list, numpy.reshape(best_spectra, (len(best_rts), len(mass_list))))
+
+    new_peak_list = []
+    for bestrt, bestspec in zip(best_rts, best_spectra):
         ms = MassSpectrum(mass_list, bestspec)
         new_peak_list.append(Peak(bestrt, ms, minutes))
 
@@ -237,17 +295,17 @@ def sele_peaks_by_rt(peaks, rt_range):
     """
     Selects peaks from a retention time range
 
-    :param peaks: A list of peak objects
-    :type peaks: list or tuple or numpy.ndarray
+    :param peaks: A list of peak objects, or a PeakTable
+    :type peaks: list or tuple or numpy.ndarray or pyms.Peak.Table.PeakTable
     :param rt_range: A list of two time strings, specifying lower and
            upper retention times
     :type rt_range: Sequence[str]
 
-    :return: A list of peak objects
-    :rtype: :class:`list` of :class:`pyms.Peak.Class.Peak`
+    :return: A list of peak objects, or a PeakTable if ``peaks`` is a PeakTable
+    :rtype: :class:`list` of :class:`pyms.Peak.Class.Peak` or pyms.Peak.Table.PeakTable
     """
 
-    if not is_peak_list(peaks):
+    if not isinstance(peaks, PeakTable) and not is_peak_list(peaks):
         raise TypeError("'peaks' not a peak list")
 
     if not is_sequence(rt_range):
@@ -265,6 +323,9 @@ def sele_peaks_by_rt(peaks, rt_range):
     if rt_lo >= rt_hi:
         raise ValueError("lower retention time limit must be less than upper")
 
+    if isinstance(peaks, PeakTable):
+        return peaks[(rt_lo < peaks.rt) & (peaks.rt < rt_hi)]
+
     peaks_sele = []
 
     for peak in peaks:
@@ -0,0 +1,372 @@
+"""
+Provides a columnar table of peaks
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import copy
+from numbers import Integral
+
+# 3rd party
+import numpy
+
+# this package
+from pyms.Base import pymsBaseClass
+from pyms.IntensityMatrix import IntensityMatrix
+from pyms.Peak.Class import Peak, _make_uids
+from pyms.Spectrum import MassSpectrum
+from pyms.Utils.Utils import is_sequence, is_sequence_of
+
+
+class PeakTable(pymsBaseClass):
+	"""
+	Stores many peaks as columns of arrays, rather than as a list of
+	:class:`pyms.Peak.Class.Peak` objects.
+
+	All peaks share one mass axis, so their mass spectra are the rows of a
+	single ``(n_peaks, n_masses)`` array. Selecting peaks with a boolean mask,
+	an array of indices or a slice returns a new PeakTable::
+
+		table = PeakTable.from_peaks(peak_list)
+		table = table[table.rt > 600]
+
+	Indexing with an integer returns a :class:`~pyms.Peak.Class.Peak`.
+
+	Unset bounds are stored as ``-1`` and unset areas as ``nan``.
+	Single-ion peaks and the areas of individual ions are not supported.
+
+	:param rt: Retention times, in seconds
+	:type rt: list or numpy.ndarray
+	:param mass_list: The mass values shared by the spectra
+	:type mass_list: list or numpy.ndarray
+	:param spectra: The mass spectrum at the apex of each peak, one row per peak
+	:type spectra: numpy.ndarray
+	:param bounds: The left, apex and right boundaries of each peak in points,
+		one row per peak. Left and right are offsets from the apex.
+	:type bounds: numpy.ndarray, optional
+	:param area: The area of each peak
+	:type area: list or numpy.ndarray, optional
+	:param is_outlier: Whether each peak is an outlier
+	:type is_outlier: list or numpy.ndarray, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, rt, mass_list, spectra, bounds=None, area=None, is_outlier=None):
+		"""
+		Initialise the table
+		"""
+
+		if not is_sequence(rt):
+			raise TypeError("'rt' must be a Sequence of numbers")
+		if not is_sequence(mass_list):
+			raise TypeError("'mass_list' must be a Sequence of numbers")
+		if not is_sequence(spectra):
+			raise TypeError("'spectra' must be a 2-D array")
+
+		self._rt = numpy.array(rt, dtype=float).reshape(-1)
+		self._mass_list = numpy.array(mass_list, dtype=float).reshape(-1)
+		n_peaks = self._rt.size
+
+		self._spectra = numpy.array(spectra, dtype=float).reshape(n_peaks, self._mass_list.size)
+
+		if bounds is None:
+			self._bounds = numpy.full((n_peaks, 3), -1, dtype=int)
+		else:
+			self._bounds = numpy.array(bounds, dtype=int).reshape(n_peaks, 3)
+
+		if area is None:
+			self._area = numpy.full(n_peaks, numpy.nan)
+		else:
+			self._area = numpy.array(area, dtype=float).reshape(n_peaks)
+
+		if is_outlier is None:
+			self._is_outlier = numpy.zeros(n_peaks, dtype=bool)
+		else:
+			self._is_outlier = numpy.array(is_outlier, dtype=bool).reshape(n_peaks)
+
+		self._uid = None
+
+	@classmethod
+	def from_peaks(cls, peaks):
+		"""
+		Construct a PeakTable from a list of peaks
+
+		:param peaks: A list of peak objects, which must all have mass spectra
+			with the same mass values
+		:type peaks: list
+
+		:rtype: pyms.Peak.Table.PeakTable
+		"""
+
+		if not is_sequence_of(peaks, Peak):
+			raise TypeError("'peaks' must be a list of Peak objects")
+
+		if not peaks:
+			return cls([], [], numpy.empty((0, 0)))
+
+		spectra = [peak._mass_spectrum for peak in peaks]
+		if any(ms is None for ms in spectra):
+			raise ValueError("Every peak must have a mass spectrum")
+
+		mass_list = spectra[0].mass_array
+		for ms in spectra[1:]:
+			if not numpy.array_equal(ms.mass_array, mass_list):
+				raise ValueError("The peaks' mass spectra must all have the same mass values")
+
+		bounds = [peak.bounds if peak.bounds is not None else (-1, -1, -1) for peak in peaks]
+		area = [peak.area if peak.area is not None else numpy.nan for peak in peaks]
+
+		table = cls(
+				rt=[peak.rt for peak in peaks],
+				mass_list=mass_list,
+				spectra=[ms.mass_spec for ms in spectra],
+				bounds=bounds,
+				area=area,
+				is_outlier=[peak.is_outlier for peak in peaks],
+				)
+		table._uid = numpy.array([peak.UID for peak in peaks], dtype=object)
+
+		return table
+
+	@classmethod
+	def from_intensity_matrix(cls, im, apex_indices):
+		"""
+		Construct a PeakTable of the peaks whose apexes are at the given scans of an intensity matrix
+
+		:param im: The intensity matrix
+		:type im: pyms.IntensityMatrix.IntensityMatrix
+		:param apex_indices: The index of the scan at the apex of each peak
+		:type apex_indices: list or numpy.ndarray
+
+		:rtype: pyms.Peak.Table.PeakTable
+		"""
+
+		if not isinstance(im, IntensityMatrix):
+			raise TypeError("'im' must be an IntensityMatrix object")
+		if not is_sequence(apex_indices):
+			raise TypeError("'apex_indices' must be a Sequence of integers")
+
+		apex_indices = numpy.asarray(apex_indices, dtype=int).reshape(-1)
+		bounds = numpy.zeros((apex_indices.size, 3), dtype=int)
+		bounds[:, 1] = apex_indices
+
+		return cls(
+				rt=numpy.asarray(im.time_list)[apex_indices],
+				mass_list=im.mass_list,
+				spectra=im._intensity_array[apex_indices],
+				bounds=bounds,
+				)
+
+	def to_peaks(self):
+		"""
+		Returns the peaks as a list of :class:`pyms.Peak.Class.Peak` objects
+
+		:rtype: :class:`list` of :class:`pyms.Peak.Class.Peak`
+		"""
+
+		return [self._make_peak(index) for index in range(len(self))]
+
+	def _make_peak(self, index):
+		"""
+		Returns the peak in the given row as a :class:`pyms.Peak.Class.Peak`
+
+		:rtype: pyms.Peak.Class.Peak
+		"""
+
+		peak = Peak(float(self._rt[index]), MassSpectrum(self._mass_list, self._spectra[index]))
+		peak.is_outlier = bool(self._is_outlier[index])
+
+		if self._bounds[index, 1] >= 0:
+			peak.bounds = [int(bound) for bound in self._bounds[index]]
+
+		area = self._area[index]
+		if area > 0:
+			peak.area = float(area)
+
+		return peak
+
+	def __len__(self):
+		"""
+		Returns the number of peaks in the table
+
+		:rtype: int
+		"""
+
+		return self._rt.size
+
+	def __iter__(self):
+		for index in range(len(self)):
+			yield self._make_peak(index)
+
+	def __getitem__(self, key):
+		"""
+		Returns a single peak, or a new PeakTable of the selected peaks
+
+		:param key: An integer, a slice, an array of indices or a boolean mask
+		:type key: int or slice or numpy.ndarray or list
+
+		:rtype: pyms.Peak.Class.Peak or pyms.Peak.Table.PeakTable
+		"""
+
+		if isinstance(key, Integral):
+			if not -len(self) <= key < len(self):
+				raise IndexError("PeakTable index out of range")
+			return self._make_peak(key)
+
+		if not isinstance(key, slice):
+			key = numpy.asarray(key)
+			if key.dtype != bool:
+				key = key.astype(int)
+
+		table = self.__class__.__new__(self.__class__)
+		table._rt = self._rt[key]
+		table._mass_list = self._mass_list
+		table._spectra = self._spectra[key]
+		table._bounds = self._bounds[key]
+		table._area = self._area[key]
+		table._is_outlier = self._is_outlier[key]
+		table._uid = None if self._uid is None else self._uid[key]
+
+		return table
+
+	def __eq__(self, other):
+		"""
+		Return whether this PeakTable object is equal to another object
+
+		:param other: The other object to test equality with
+		:type other: object
+
+		:rtype: bool
+		"""
+
+		if isinstance(other, self.__class__):
+			return numpy.array_equal(self._rt, other._rt) \
+					and numpy.array_equal(self._mass_list, other._mass_list) \
+					and numpy.array_equal(self._spectra, other._spectra) \
+					and numpy.array_equal(self._bounds, other._bounds) \
+					and numpy.array_equal(self._area, other._area, equal_nan=True)
+
+		return NotImplemented
+
+	def copy(self):
+		"""
+		Returns a copy of the table, with its own arrays
+
+		:rtype: pyms.Peak.Table.PeakTable
+		"""
+
+		return copy.deepcopy(self)
+
+	@property
+	def rt(self):
+		"""
+		The retention time of each peak, in seconds
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._rt
+
+	@property
+	def mass_list(self):
+		"""
+		The mass values shared by the spectra
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._mass_list
+
+	@property
+	def spectra(self):
+		"""
+		The mass spectrum at the apex of each peak, one row per peak
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._spectra
+
+	@spectra.setter
+	def spectra(self, value):
+		"""
+		Sets the mass spectra of the peaks
+
+		:param value: An array of shape ``(n_peaks, n_masses)``
+		:type value: numpy.ndarray
+		"""
+
+		value = numpy.asarray(value, dtype=float)
+
+		if value.shape != self._spectra.shape:
+			raise ValueError(f"'spectra' must have shape {self._spectra.shape}")
+
+		self._spectra = value
+		# The UIDs depend on the spectra
+		self._uid = None
+
+	@property
+	def bounds(self):
+		"""
+		The left, apex and right boundaries of each peak in points, one row per peak.
+		Left and right are offsets from the apex.
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._bounds
+
+	@property
+	def area(self):
+		"""
+		The area of each peak
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._area
+
+	@property
+	def is_outlier(self):
+		"""
+		Whether each peak is an outlier
+
+		:rtype: numpy.ndarray
+		"""
+
+		return self._is_outlier
+
+	@property
+	def UID(self):
+		"""
+		The unique peak ID (UID) of each peak, the same as
+		:attr:`pyms.Peak.Class.Peak.UID` for a peak with that mass spectrum
+
+		:rtype: numpy.ndarray
+		"""
+
+		if self._uid is None:
+			self._uid = _make_uids(self._rt, self._mass_list, self._spectra)
+
+		return self._uid
+
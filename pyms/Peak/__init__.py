@@ -25,3 +25,4 @@ Functions for modelling signal peaks
 
 
 from pyms.Peak.Class import Peak
+from pyms.Peak.Table import PeakTable
@@ -68,10 +68,53 @@ def array_as_numeric(array):
 	return array
 
 
+def _to_array(values, dtype=None):
+	"""
+	Returns a copy of the given values as a one-dimensional numeric array
+
+	:param values:
+	:type values: Sequence or numpy.ndarray
+	:param dtype: The data type of the array. If :py:obj:`None` the numeric type of the values is kept.
+	:type dtype: numpy.dtype, optional
+
+	:rtype: :class:`numpy.ndarray`
+	"""
+
+	array = array_as_numeric(values)
+
+	if array.ndim != 1:
+		raise TypeError("Expected a Sequence of numbers")
+
+	if dtype is None:
+		dtype = array.dtype
+
+	if array is values or array.dtype != dtype:
+		array = array.astype(dtype)
+
+	return numpy.ascontiguousarray(array)
+
+
+def _read_only(array):
+	"""
+	Returns a read-only view of the given array
+
+	:type array: numpy.ndarray
+
+	:rtype: numpy.ndarray
+	"""
+
+	view = array.view()
+	view.flags.writeable = False
+	return view
+
+
 class Scan(pymsBaseClass, MassListMixin):
 	"""
 	Generic object for a single Scan's raw data
 
+	The mass and intensity values are stored as arrays. The intensities are
+	64-bit floats, and the masses keep their numeric type.
+
 	:param mass_list: A sequence of mass values
 	:type mass_list: Sequence[:class:`python:numbers.Number`] or :class:`numpy.ndarray`
 	:param intensity_list: A sequence intensity values
@@ -80,39 +123,68 @@ class Scan(pymsBaseClass, MassListMixin):
 	:authors: Andrew Isaac, Qiao Wang, Vladimir Likic, Dominic Davis-Foster
 	"""
 
+	__slots__ = ("_mass_array", "_intensity_array", "_min_mass", "_max_mass")
+
 	def __init__(self, mass_list, intensity_list):
 		"""
 		Initialise the class
 		"""
 
-		mass_list = list(array_as_numeric(mass_list))
-		intensity_list = list(array_as_numeric(intensity_list))
+		mass_array = _to_array(mass_list)
+		intensity_array = _to_array(intensity_list, numpy.float64)
 
-		if len(mass_list) != len(intensity_list):
+		if mass_array.size != intensity_array.size:
 			raise ValueError("'mass_list' is not the same size as 'intensity_list'")
 
-		sorted_mass_list = sorted(mass_list)
+		steps = numpy.diff(mass_array)
 
-		if sorted_mass_list != mass_list:
+		if (steps < 0).any():
 			# Mass list isn't in ascending order
-			if sorted_mass_list[::-1] == mass_list:
+			if (steps <= 0).all():
 				# Mass list is in descending order
-				mass_list = mass_list[::-1]
-				intensity_list = intensity_list[::-1]
+				mass_array = numpy.ascontiguousarray(mass_array[::-1])
+				intensity_array = numpy.ascontiguousarray(intensity_array[::-1])
 			else:
 				warnings.warn("""Unknown sort order for mass list; it doesn't appear to be in either ascending or descending order.
 Please report this at https://github.com/domdfcoding/pymassspec/issues and upload an example data file if possible.
 """)
-				arg_sort = numpy.argsort(mass_list)
-				mass_list = [mass_list[i] for i in arg_sort]
-				intensity_list = [intensity_list[i] for i in arg_sort]
+				arg_sort = numpy.argsort(mass_array)
+				mass_array = mass_array[arg_sort]
+				intensity_array = intensity_array[arg_sort]
+
+		self._mass_array = mass_array
+		self._intensity_array = intensity_array
+		self._set_mass_range()
+
+	@classmethod
+	def _from_sorted(cls, mass_list, intensity_list):
+		"""
+		Construct a Scan from masses and intensities that are already
+		in ascending order of mass, without checking or copying them.
+
+		:param mass_list: The mass values, in ascending order
+		:type mass_list: list or numpy.ndarray
+		:param intensity_list: The intensity values
+		:type intensity_list: list or numpy.ndarray
+
+		:rtype: pyms.Spectrum.Scan
+		"""
 
-		self._mass_list = mass_list
-		self._intensity_list = intensity_list
+		scan = cls.__new__(cls)
+		scan._mass_array = numpy.asarray(mass_list)
+		scan._intensity_array = numpy.asarray(intensity_list, dtype=numpy.float64)
+		scan._set_mass_range()
+
+		return scan
+
+	def _set_mass_range(self):
+		"""
+		Sets the minimum and maximum mass from the mass values
+		"""
 
 		if self:
-			self._min_mass = min(mass_list)
-			self._max_mass = max(mass_list)
+			self._min_mass = self._mass_array.min().item()
+			self._max_mass = self._mass_array.max().item()
 		else:
 			self._min_mass = None
 			self._max_mass = None
@@ -126,10 +198,10 @@ Please report this at https://github.com/domdfcoding/pymassspec/issues and uploa
 		:authors: Andrew Isaac, Qiao Wang, Vladimir Likic
 		"""
 
-		return len(self._mass_list)
+		return self._mass_array.size
 
 	def __bool__(self):
-		return bool(self._mass_list)
+		return bool(self._mass_array.size)
 
 	def __eq__(self, other):
 		"""
@@ -143,8 +215,8 @@ Please report this at https://github.com/domdfcoding/pymassspec/issues and uploa
 
 		if isinstance(other, self.__class__):
 			return (
-					numpy.array_equal(self._intensity_list, other.intensity_list)
-					and numpy.array_equal(self._mass_list, other.mass_list)
+					numpy.array_equal(self._intensity_array, other._intensity_array)
+					and numpy.array_equal(self._mass_array, other._mass_array)
 					)
 
 		return NotImplemented
@@ -152,7 +224,7 @@ Please report this at https://github.com/domdfcoding/pymassspec/issues and uploa
 	def __copy__(self):
 		"""Returns a copy of the object"""
 
-		return self.__class__(self._mass_list[:], self._intensity_list[:])
+		return self.__class__._from_sorted(self._mass_array.copy(), self._intensity_array.copy())
 
 	def __deepcopy__(self, memodict={}):
 		return self.__copy__()
@@ -181,6 +253,31 @@ Please report this at https://github.com/domdfcoding/pymassspec/issues and uploa
 		for mz, intensity in zip(self.mass_list, self.intensity_list):
 			yield mz, intensity
 
+	@property
+	def mass_list(self):
+		"""
+		Returns a copy of the mass list
+
+		:return: A list of mass values
+		:rtype: list
+
+		:author: Qiao Wang
+		:author: Andrew Isaac
+		:author: Vladimir Likic
+		"""
+
+		return self._mass_array.tolist()
+
+	@property
+	def mass_array(self):
+		"""
+		Returns a read-only view of the mass values
+
+		:rtype: numpy.ndarray
+		"""
+
+		return _read_only(self._mass_array)
+
 	@property
 	def intensity_list(self):
 		"""
@@ -191,19 +288,22 @@ Please report this at https://github.com/domdfcoding/pymassspec/issues and uploa
 		:authors: Qiao Wang, Andrew Isaac, Vladimir Likic
 		"""
 
-		return self._intensity_list[:]
+		return self._intensity_array.tolist()
 
 	@property
 	def mass_spec(self):
 		"""
-		Returns the intensity list
+		Returns the intensity values.
 
-		:rtype: list
+		This is the array the intensities are stored in, so changes to it
+		change the spectrum.
+
+		:rtype: numpy.ndarray
 
 		:authors: Qiao Wang, Andrew Isaac, Vladimir Likic
 		"""
 
-		return self._intensity_list
+		return self._intensity_array
 
 	@deprecation.deprecated(deprecated_in="2.1.2", removed_in="2.2.0",
 							current_version=__version__,
@@ -264,6 +364,8 @@ class MassSpectrum(Scan):
 	:authors: Andrew Isaac, Qiao Wang, Vladimir Likic, Dominic Davis-Foster
 	"""
 
+	__slots__ = ()
+
 	def __init__(self, mass_list, intensity_list):
 		"""
 		Initialise the class
@@ -280,7 +382,7 @@ class MassSpectrum(Scan):
 		:type value: list
 		"""
 
-		value = array_as_numeric(value)
+		value = _to_array(value, numpy.float64)
 
 		# if not isinstance(value, _list_types) or not isinstance(value[0], Number):
 		# 	raise TypeError("'intensity_list' must be a list of numbers")
@@ -288,7 +390,7 @@ class MassSpectrum(Scan):
 		# if not len(self.mass_list) == len(value):
 		# 	raise ValueError("'mass_list' and 'intensity_list' are not the same size")
 
-		self._intensity_list = list(value)
+		self._intensity_array = value
 
 	@Scan.mass_spec.setter
 	def mass_spec(self, value):
@@ -299,7 +401,7 @@ class MassSpectrum(Scan):
 		:type value: list
 		"""
 
-		value = array_as_numeric(value)
+		value = _to_array(value, numpy.float64)
 
 		# if not isinstance(value, _list_types) or not isinstance(value[0], Number):
 		# 	raise TypeError("'intensity_list' must be a list of numbers")
@@ -307,9 +409,9 @@ class MassSpectrum(Scan):
 		# if not len(self.mass_list) == len(value):
 		# 	raise ValueError("'mass_list' and 'intensity_list' are not the same size")
 
-		self._intensity_list = list(value)
+		self._intensity_array = value
 
-	@MassListMixin.mass_list.setter
+	@Scan.mass_list.setter
 	def mass_list(self, value):
 		"""
 		Set the mass values for the spectrum
@@ -318,7 +420,7 @@ class MassSpectrum(Scan):
 		:type value: list
 		"""
 
-		value = array_as_numeric(value)
+		value = _to_array(value)
 
 		# if not isinstance(value, _list_types) or not isinstance(value[0], Number):
 		# 	raise TypeError("'mass_list' must be a list of numbers")
@@ -326,14 +428,8 @@ class MassSpectrum(Scan):
 		# if not len(self.mass_list) == len(value):
 		# 	raise ValueError("'mass_list' and 'intensity_list' are not the same size")
 
-		self._mass_list = list(value)
-
-		if self:
-			self._min_mass = min(value)
-			self._max_mass = max(value)
-		else:
-			self._min_mass = None
-			self._max_mass = None
+		self._mass_array = value
+		self._set_mass_range()
 
 	def crop(self, min_mz=None, max_mz=None, inplace=False):
 		"""
@@ -356,8 +452,8 @@ class MassSpectrum(Scan):
 		if max_mz is None:
 			max_mz = self.max_mass
 
-		min_mz_idx = self.intensity_list.index(min_mz)
-		max_mz_idx = self.intensity_list.index(max_mz) + 1
+		min_mz_idx = int(numpy.searchsorted(self._mass_array, min_mz, side="left"))
+		max_mz_idx = int(numpy.searchsorted(self._mass_array, max_mz, side="right"))
 
 		return self.icrop(min_mz_idx, max_mz_idx, inplace)
 
@@ -376,42 +472,30 @@ class MassSpectrum(Scan):
 		:rtype: :class:`pyms.Spectrum.MassSpectrum`
 		"""
 
-		cropped_intensity_list = self.intensity_list[min_index:max_index]
-		cropped_mass_list = self.mass_list[min_index:max_index]
+		cropped_intensity_array = self._intensity_array[min_index:max_index].copy()
+		cropped_mass_array = self._mass_array[min_index:max_index].copy()
 
 		if inplace:
-			self.intensity_list = cropped_intensity_list
-			self.mass_list = cropped_mass_list
+			self._intensity_array = cropped_intensity_array
+			self._mass_array = cropped_mass_array
+			self._set_mass_range()
 			return self
 		else:
-			return self.__class__(
-					intensity_list=cropped_intensity_list,
-					mass_list=cropped_intensity_list,
-					)
+			return self.__class__._from_sorted(cropped_mass_array, cropped_intensity_array)
 
 	def n_largest_peaks(self, n):
 		"""
 		Returns the indices of the n largest peaks in the Mass Spectrum
 
 		:param n: The number of peaks to return the indices for
-		:type n:
-		:return:
-		:rtype:
-		"""
-
-		# Make copies of the intensity_list
-		intensity_list = self.intensity_list
+		:type n: int
 
-		largest_indices = []
-
-		for i in range(0, n):
-			max_int_index = max(range(len(intensity_list)), key=intensity_list.__getitem__)
-
-			del intensity_list[max_int_index]
-
-			largest_indices.append(max_int_index)
+		:return: The indices, largest peak first
+		:rtype: list
+		"""
 
-		return largest_indices
+		# Stable sort so that equal peaks are in order of mass
+		return numpy.argsort(-self._intensity_array, kind="stable")[:n].tolist()
 
 	def get_intensity_for_mass(self, mass):
 		"""
@@ -424,8 +508,12 @@ class MassSpectrum(Scan):
 		:rtype:
 		"""
 
-		mass_idx = self._mass_list.index(mass)
-		return self._intensity_list[mass_idx]
+		mass_idx = numpy.searchsorted(self._mass_array, mass)
+
+		if mass_idx == self._mass_array.size or self._mass_array[mass_idx] != mass:
+			raise ValueError(f"{mass} is not in the mass list")
+
+		return self._intensity_array[mass_idx].item()
 
 	def get_mass_for_intensity(self, intensity):
 		"""
@@ -439,8 +527,12 @@ class MassSpectrum(Scan):
 		:rtype:
 		"""
 
-		intensity_idx = self._intensity_list.index(intensity)
-		return self._mass_list[intensity_idx]
+		indices = numpy.flatnonzero(self._intensity_array == intensity)
+
+		if not indices.size:
+			raise ValueError(f"{intensity} is not in the intensity list")
+
+		return self._mass_array[indices[0]].item()
 
 	@classmethod
 	def from_jcamp(cls, file_name):
@@ -491,13 +583,9 @@ class MassSpectrum(Scan):
 			#  Make a better error message
 			raise ValueError("data not in pair !")
 
-		mass_list = []
-		intensity_list = []
-		for i in range(len(xydata) // 2):
-			mass_list.append(xydata[i * 2])
-			intensity_list.append(xydata[i * 2 + 1])
+		xydata = numpy.reshape(xydata, (-1, 2))
 
-		return cls(mass_list, intensity_list)
+		return cls(xydata[:, 0], xydata[:, 1])
 
 	@classmethod
 	def from_mz_int_pairs(cls, mz_int_pairs):
@@ -546,26 +634,26 @@ def normalize_mass_spec(mass_spec, relative_to=None, inplace=False, max_intensit
 	:type inplace: bool, optional.
 	:param max_intensity: The maximum intensity in the normalized spectrum.
 		If omitted the range 0-100.0 is used.
-		If an integer the normalized intensities will be integers.
+		If an integer the normalized intensities will be rounded to whole numbers.
 	:type max_intensity: int, float
 	:return: The normalized mass spectrum
 	:rtype: :class:`pyms.Spectrum.MassSpectrum`
 	"""
 
+	intensity_array = mass_spec.mass_spec
+
 	if relative_to is None:
-		relative_to = max(mass_spec.intensity_list)
+		relative_to = intensity_array.max()
 
-	normalized_intensity_list = [
-			(x / float(relative_to)) * max_intensity
-			for x in mass_spec.intensity_list]
+	normalized_intensity_array = (intensity_array / float(relative_to)) * max_intensity
 
 	if isinstance(max_intensity, int):
-		normalized_intensity_list = [round(x) for x in normalized_intensity_list]
+		normalized_intensity_array = numpy.round(normalized_intensity_array)
 
 	if inplace:
-		mass_spec.intensity_list = normalized_intensity_list
+		mass_spec.intensity_list = normalized_intensity_array
 		return mass_spec
 	else:
-		normalized_mass_spec = MassSpectrum(mass_spec.mass_list, normalized_intensity_list)
+		normalized_mass_spec = MassSpectrum._from_sorted(mass_spec.mass_array.copy(), normalized_intensity_array)
 
 		return normalized_mass_spec
@@ -34,13 +34,17 @@ from scipy import ndimage
 from pyms.GCMS.Function import ic_window_points
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
+from pyms.Utils.Executor import SerialExecutor, get_executor
 
 
 # default structural element as a fraction of total number of points
 _STRUCT_ELM_FRAC = 0.2
 
+# The ways of estimating the baseline
+BASELINE_METHODS = ("tophat", "rolling_minimum")
 
-def tophat(ic, struct=None):
+
+def tophat(ic, struct=None, method="tophat"):
     """
     Top-hat baseline correction on Ion Chromatogram
 
@@ -48,6 +52,9 @@ def tophat(ic, struct=None):
     :type ic: pyms.IonChromatogram.IonChromatogram
     :param struct: Top-hat structural element as time string
     :type struct: int or str or NoneType, optional
+    :param method: How to estimate the baseline.
+        See :func:`~pyms.TopHat.baseline_correct`.
+    :type method: str, optional
 
     :return: Top-hat corrected ion chromatogram
     :rtype: pyms.IonChromatogram.IonChromatogram
@@ -68,8 +75,7 @@ def tophat(ic, struct=None):
 
     #    print(" -> Top-hat: structural element is %d point(s)" % ( struct_pts ))
 
-    str_el = numpy.repeat([1], struct_pts)
-    ia = ndimage.white_tophat(ia, footprint=str_el)
+    ia = baseline_correct(ia, struct_pts, method)
 
     ic_bc = copy.deepcopy(ic)
     ic_bc.intensity_array = ia
@@ -77,33 +83,125 @@ def tophat(ic, struct=None):
     return ic_bc
 
 
-def tophat_im(im, struct=None):
+def tophat_im(im, struct=None, executor=None, method="tophat", chunk_size=None):
     """
     Top-hat baseline correction on Intensity Matrix
 
-    Wraps around the TopHat function above
+    All ion chromatograms are corrected at once by applying the structural
+    element along the time axis of the intensity array. The result is the
+    same as applying :func:`~pyms.TopHat.tophat` to each ion chromatogram.
 
     :param im: The input Intensity Matrix
     :type im: pyms.IntensityMatrix.IntensityMatrix
     :param struct: Top-hat structural element as time string
-    :type struct: str
+    :type struct: int or str or NoneType, optional
+    :param executor: The executor to divide the ion chromatograms between.
+        See :func:`pyms.Utils.Executor.get_executor`.
+    :type executor: pyms.Utils.Executor.Executor or str, optional
+    :param method: How to estimate the baseline.
+        See :func:`~pyms.TopHat.baseline_correct`.
+    :type method: str, optional
+    :param chunk_size: The number of ion chromatograms to correct at a time,
+        to limit the memory used by the intermediate arrays.
+        By default all are corrected at once.
+    :type chunk_size: int, optional
 
     :return: Top-hat corrected IntensityMatrix Matrix
     :rtype: pyms.IntensityMatrix.IntensityMatrix
 
     :author: Sean O'Callaghan
+    :author: Dominic Davis-Foster
     """
 
     if not isinstance(im, IntensityMatrix):
         raise TypeError("'im' must be an IntensityMatrix object")
+    if chunk_size is not None:
+        if not isinstance(chunk_size, int):
+            raise TypeError("'chunk_size' must be an integer")
+        if chunk_size < 1:
+            raise ValueError("'chunk_size' must be at least 1")
+
+    intensity_array = im._intensity_array
+    n_scan, n_mz = intensity_array.shape
+
+    if struct:
+        struct_pts = ic_window_points(im.get_ic_at_index(0), struct)
+    else:
+        struct_pts = int(round(n_scan * _STRUCT_ELM_FRAC))
+
+    executor = get_executor(executor)
+
+    if isinstance(executor, SerialExecutor):
+        ia_bc = numpy.empty_like(intensity_array)
+        chunk_size = chunk_size or max(n_mz, 1)
+
+        for start in range(0, n_mz, chunk_size):
+            stop = start + chunk_size
+            ia_bc[:, start:stop] = baseline_correct(intensity_array[:, start:stop], struct_pts, method)
+    else:
+        # Each worker corrects a block of the ion chromatograms
+        ion_intensities = numpy.empty((n_mz, n_scan), dtype=intensity_array.dtype)
+        executor.fill_rows(_correct_ion_rows, ion_intensities, intensity_array, struct_pts, method)
+        ia_bc = numpy.ascontiguousarray(ion_intensities.T)
+
+    return IntensityMatrix(copy.copy(im._time_list), copy.copy(im._mass_list), ia_bc)
+
+
+def baseline_correct(ia, struct_pts, method="tophat"):
+    """
+    Subtracts the baseline from an array of intensities
 
-    n_scan, n_mz = im.size
+    The baseline is estimated with a flat structural element of
+    ``struct_pts`` points, using one of the following methods:
 
-    im_smooth = copy.deepcopy(im)
+    * ``"tophat"`` -- the morphological opening (a rolling minimum followed
+      by a rolling maximum), giving the white top-hat transform.
+    * ``"rolling_minimum"`` -- the rolling minimum alone. This is about twice
+      as fast, but the baseline is lower than the opening near peaks, so
+      less is subtracted there.
 
-    for ii in range(n_mz):
-        ic = im_smooth.get_ic_at_index(ii)
-        ic_smooth = tophat(ic, struct)
-        im_smooth.set_ic_at_index(ii, ic_smooth)
+    Both are calculated with :func:`scipy.ndimage.minimum_filter1d` and
+    :func:`scipy.ndimage.maximum_filter1d`, whose cost does not depend on
+    the size of the structural element.
+
+    :param ia: Intensity array. For a 2-D array each column is corrected.
+    :type ia: numpy.ndarray
+    :param struct_pts: The number of points in the structural element
+    :type struct_pts: int
+    :param method: How to estimate the baseline
+    :type method: str, optional
+
+    :return: Baseline corrected intensity array
+    :rtype: numpy.ndarray
+
+    :author: Dominic Davis-Foster
+    """
+
+    if not isinstance(method, str):
+        raise TypeError("'method' must be a string")
+    if method not in BASELINE_METHODS:
+        raise ValueError(f"'method' must be one of {BASELINE_METHODS}")
+
+    ia = numpy.asarray(ia)
+    struct_pts = max(struct_pts, 1)
+
+    # Matches scipy.ndimage.grey_erosion with a flat footprint
+    baseline = ndimage.minimum_filter1d(ia, struct_pts, axis=0, mode="reflect")
+
+    if method == "tophat":
+        # Matches scipy.ndimage.grey_dilation, which reflects the footprint
+        origin = 0 if struct_pts % 2 else -1
+        baseline = ndimage.maximum_filter1d(baseline, struct_pts, axis=0, mode="reflect", origin=origin)
+
+    return ia - baseline
+
+
+def _correct_ion_rows(start, stop, intensity_array, struct_pts, method):
+    """
+    Returns the baseline corrected intensities of the ion chromatograms
+    ``start`` to ``stop``, for :meth:`pyms.Utils.Executor.Executor.fill_rows`
+
+    :rtype: numpy.ndarray
+    """
 
-    return im_smooth
+    return baseline_correct(intensity_array[:, start:stop], struct_pts, method).T
@@ -0,0 +1,337 @@
+"""
+Content-addressed on-disk cache for the results of processing steps
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import functools
+import hashlib
+import os
+import pathlib
+import pickle
+import weakref
+
+# this package
+from pyms import __version__
+from pyms.Utils.IO import prepare_filepath
+from pyms.Utils.Utils import is_path
+
+#: Default maximum size of the cache, in bytes (1 GiB)
+DEFAULT_MAX_SIZE = 2 ** 30
+
+
+class ProcessingCache:
+	"""
+	Opt-in on-disk cache for the results of processing steps,
+	such as building an intensity matrix, smoothing, baseline correction
+	and peak detection.
+
+	Each result is stored under a key calculated from the name of the
+	function and a fingerprint of each of its arguments:
+
+	* Paths (:class:`pathlib.Path` objects) are fingerprinted by the contents of the file.
+	* Results returned by the cache are fingerprinted by their own key,
+	  so the keys of later steps change whenever an earlier step changes.
+	* Anything else is fingerprinted by its pickled representation.
+
+	Re-running a pipeline after changing the parameters of one step
+	therefore only recomputes that step and the steps after it.
+
+	When the total size of the cache exceeds ``max_size`` the least recently
+	used results are deleted.
+
+	Results returned by the cache should not be modified in place before
+	being passed to another cached function, as their fingerprint would
+	no longer match their contents.
+
+	:param directory: The directory to store the cached results in
+	:type directory: str or pathlib.Path
+	:param max_size: The maximum total size of the cache, in bytes.
+		:py:obj:`None` means no limit.
+	:type max_size: int, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+		"""
+		Initialise the cache
+		"""
+
+		if not is_path(directory):
+			raise TypeError("'directory' must be a string or a PathLike object")
+
+		if max_size is not None and not isinstance(max_size, int):
+			raise TypeError("'max_size' must be an integer")
+
+		self._directory = prepare_filepath(directory)
+		self._directory.mkdir(parents=True, exist_ok=True)
+		self._max_size = max_size
+
+		# Keys of results returned by the cache, by the ``id`` of the result
+		self._result_keys = {}
+
+		# Fingerprints of files, by path, modification time and size
+		self._file_fingerprints = {}
+
+	@property
+	def directory(self):
+		"""
+		Returns the directory the cached results are stored in
+
+		:rtype: pathlib.Path
+		"""
+
+		return self._directory
+
+	@property
+	def max_size(self):
+		"""
+		Returns the maximum total size of the cache, in bytes
+
+		:rtype: int or None
+		"""
+
+		return self._max_size
+
+	def run(self, function, *args, **kwargs):
+		"""
+		Calls ``function`` with the given arguments, or returns the result of
+		an earlier call with the same function and arguments from the cache
+
+		:param function: The function to call
+		:type function: callable
+
+		:return: The result of the function
+		"""
+
+		key = self.key(function, *args, **kwargs)
+
+		found, result = self._load(key)
+		if not found:
+			result = function(*args, **kwargs)
+			self._store(key, result)
+			self.evict()
+
+		self._remember(key, result)
+		return result
+
+	def cached(self, function):
+		"""
+		Decorator which caches the results of the decorated function with this cache
+
+		:param function: The function to cache
+		:type function: callable
+
+		:rtype: callable
+		"""
+
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			return self.run(function, *args, **kwargs)
+
+		return wrapper
+
+	def key(self, function, *args, **kwargs):
+		"""
+		Returns the cache key for calling ``function`` with the given arguments
+
+		:param function: The function
+		:type function: callable
+
+		:rtype: str
+		"""
+
+		hasher = hashlib.sha256()
+		hasher.update(__version__.encode("UTF-8"))
+		hasher.update(f"{function.__module__}.{function.__qualname__}".encode("UTF-8"))
+
+		for arg in args:
+			hasher.update(self.fingerprint(arg).encode("UTF-8"))
+
+		for name, value in sorted(kwargs.items()):
+			hasher.update(name.encode("UTF-8"))
+			hasher.update(self.fingerprint(value).encode("UTF-8"))
+
+		return hasher.hexdigest()
+
+	def fingerprint(self, obj):
+		"""
+		Returns a fingerprint of an argument to a function
+
+		:param obj: The argument
+
+		:rtype: str
+		"""
+
+		if id(obj) in self._result_keys:
+			return f"result:{self._result_keys[id(obj)]}"
+
+		if isinstance(obj, pathlib.PurePath):
+			return f"file:{self.file_fingerprint(obj)}"
+
+		return "pickle:" + hashlib.sha256(pickle.dumps(obj, protocol=4)).hexdigest()
+
+	def file_fingerprint(self, file_name):
+		"""
+		Returns the SHA-256 hash of the contents of a file.
+		For a directory, such as an Agilent ``.D`` directory, the names
+		and contents of all files within it are hashed.
+
+		:param file_name: The file to hash
+		:type file_name: str or pathlib.Path
+
+		:rtype: str
+		"""
+
+		file_name = pathlib.Path(file_name).resolve()
+
+		if file_name.is_dir():
+			hasher = hashlib.sha256()
+			for path in sorted(file_name.rglob("*")):
+				if path.is_file():
+					hasher.update(str(path.relative_to(file_name)).encode("UTF-8"))
+					hasher.update(self.file_fingerprint(path).encode("UTF-8"))
+			return hasher.hexdigest()
+
+		stat = file_name.stat()
+		stat_key = (file_name, stat.st_mtime_ns, stat.st_size)
+
+		if stat_key not in self._file_fingerprints:
+			hasher = hashlib.sha256()
+			with file_name.open("rb") as fp:
+				for block in iter(functools.partial(fp.read, 2 ** 20), b''):
+					hasher.update(block)
+			self._file_fingerprints[stat_key] = hasher.hexdigest()
+
+		return self._file_fingerprints[stat_key]
+
+	def size(self):
+		"""
+		Returns the total size of the cached results, in bytes
+
+		:rtype: int
+		"""
+
+		return sum(path.stat().st_size for path in self._entries())
+
+	def evict(self):
+		"""
+		Deletes the least recently used results until the cache is no larger than ``max_size``
+		"""
+
+		if self._max_size is None:
+			return
+
+		entries = sorted(self._entries(), key=lambda path: path.stat().st_mtime_ns)
+		total_size = sum(path.stat().st_size for path in entries)
+
+		for path in entries:
+			if total_size <= self._max_size:
+				break
+			total_size -= path.stat().st_size
+			path.unlink()
+
+	def clear(self):
+		"""
+		Deletes all cached results
+		"""
+
+		for path in self._entries():
+			path.unlink()
+
+	def _entries(self):
+		"""
+		Returns the files of the cached results
+
+		:rtype: list of pathlib.Path
+		"""
+
+		return [path for path in self._directory.iterdir() if path.suffix in {".pyms", ".pkl"}]
+
+	def _load(self, key):
+		"""
+		Loads the result with the given key
+
+		:type key: str
+
+		:return: Whether the result is in the cache, and the result
+		:rtype: tuple
+		"""
+
+		from pyms.GCMS.Class import GCMS_data
+		from pyms.IntensityMatrix import IntensityMatrix
+
+		for cls in (IntensityMatrix, GCMS_data):
+			path = self._directory / f"{key}.{cls.__name__}.pyms"
+			if path.exists():
+				os.utime(path)  # Mark as recently used
+				return True, cls.load(path)
+
+		path = self._directory / f"{key}.pkl"
+		if path.exists():
+			os.utime(path)  # Mark as recently used
+			with path.open("rb") as fp:
+				return True, pickle.load(fp)
+
+		return False, None
+
+	def _store(self, key, result):
+		"""
+		Stores the result with the given key
+
+		:type key: str
+		"""
+
+		from pyms.GCMS.Class import GCMS_data
+		from pyms.IntensityMatrix import IntensityMatrix
+
+		if isinstance(result, (IntensityMatrix, GCMS_data)):
+			path = self._directory / f"{key}.{result.__class__.__name__}.pyms"
+			tmp_path = path.with_name(f"{path.name}.tmp")
+			result.save(tmp_path)
+		else:
+			path = self._directory / f"{key}.pkl"
+			tmp_path = path.with_name(f"{path.name}.tmp")
+			with tmp_path.open("wb") as fp:
+				pickle.dump(result, fp, protocol=4)
+
+		# Write to a temporary file first so an interrupted write never leaves a corrupt entry
+		os.replace(tmp_path, path)
+
+	def _remember(self, key, result):
+		"""
+		Records the key of a result returned by the cache, so it can be used as
+		the fingerprint of the result when it is passed to another function.
+
+		:type key: str
+		"""
+
+		obj_id = id(result)
+		self._result_keys[obj_id] = key
+
+		try:
+			weakref.finalize(result, self._result_keys.pop, obj_id, None)
+		except TypeError:
+			# Objects which don't support weak references, such as lists,
+			# are fingerprinted by their contents instead.
+			del self._result_keys[obj_id]
@@ -0,0 +1,437 @@
+"""
+Interchangeable backends for running work in serial, in threads,
+in processes, or across MPI ranks
+"""
+
+################################################################################
+#                                                                              #
+#    PyMassSpec software for processing of mass-spectrometry data              #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                              #
+#                                                                              #
+#    This program is free software; you can redistribute it and/or modify      #
+#    it under the terms of the GNU General Public License version 2 as         #
+#    published by the Free Software Foundation.                                #
+#                                                                              #
+#    This program is distributed in the hope that it will be useful,           #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of            #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the             #
+#    GNU General Public License for more details.                              #
+#                                                                              #
+#    You should have received a copy of the GNU General Public License         #
+#    along with this program; if not, write to the Free Software               #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.                 #
+#                                                                              #
+################################################################################
+
+# stdlib
+import ctypes
+import multiprocessing
+import os
+from concurrent.futures import Executor as _FuturesExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+# 3rd party
+import numpy
+
+
+class Executor:
+	"""
+	Base class for the backends which run work for PyMassSpec
+
+	Each backend provides:
+
+	* :meth:`~pyms.Utils.Executor.Executor.pool`, a :class:`concurrent.futures.Executor`
+	  for running independent tasks, such as processing each sample of a batch;
+	* :meth:`~pyms.Utils.Executor.Executor.fill_rows`, which splits the rows of an
+	  array between the workers, such as the rows of a score matrix or the ion
+	  chromatograms of an intensity matrix.
+
+	:param n_workers: The number of workers. If :py:obj:`None` the number of
+		processors on the machine is used.
+	:type n_workers: int, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, n_workers=None):
+		"""
+		Initialise the executor
+		"""
+
+		if n_workers is not None and not isinstance(n_workers, int):
+			raise TypeError("'n_workers' must be an integer")
+
+		if n_workers is None:
+			n_workers = os.cpu_count() or 1
+
+		if n_workers < 1:
+			raise ValueError("'n_workers' must be at least 1")
+
+		self.n_workers = n_workers
+
+	def __repr__(self):
+		return f"{self.__class__.__name__}(n_workers={self.n_workers})"
+
+	def pool(self, initializer=None, initargs=()):
+		"""
+		Returns a pool to submit tasks to
+
+		:param initializer: A function to call in each worker when it starts
+		:type initializer: callable, optional
+		:param initargs: The arguments for ``initializer``
+		:type initargs: tuple, optional
+
+		:rtype: concurrent.futures.Executor
+		"""
+
+		raise NotImplementedError
+
+	def fill_rows(self, function, out, *args):
+		"""
+		Fills an array by calling ``function(start, stop, *args)`` for ranges
+		of its rows, in the workers. Each call must return the values for
+		``out[start:stop]``.
+
+		:param function: The function to calculate the rows with
+		:type function: callable
+		:param out: The array to fill
+		:type out: numpy.ndarray
+		:param args: Further arguments for ``function``
+		"""
+
+		ranges = row_ranges(len(out), self.n_workers)
+		tasks = [(function, start, stop, args) for start, stop in ranges]
+
+		with self.pool() as pool:
+			for (start, stop), rows in zip(ranges, pool.map(_call_rows, tasks)):
+				out[start:stop] = rows
+
+
+class SerialExecutor(Executor):
+	"""
+	Runs all the work in the calling thread
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self):
+		"""
+		Initialise the executor
+		"""
+
+		super().__init__(1)
+
+	def __repr__(self):
+		return f"{self.__class__.__name__}()"
+
+	def pool(self, initializer=None, initargs=()):
+		"""
+		Returns a pool which runs each task as soon as it is submitted
+
+		:param initializer: A function to call before the first task
+		:type initializer: callable, optional
+		:param initargs: The arguments for ``initializer``
+		:type initargs: tuple, optional
+
+		:rtype: concurrent.futures.Executor
+		"""
+
+		return _SerialPool(initializer, initargs)
+
+	def fill_rows(self, function, out, *args):
+		"""
+		Fills an array by calling ``function(0, len(out), *args)``
+
+		:param function: The function to calculate the rows with
+		:type function: callable
+		:param out: The array to fill
+		:type out: numpy.ndarray
+		:param args: Further arguments for ``function``
+		"""
+
+		out[:] = function(0, len(out), *args)
+
+
+class ThreadExecutor(Executor):
+	"""
+	Runs the work in a pool of threads.
+
+	This is only faster than :class:`~pyms.Utils.Executor.SerialExecutor`
+	for work which releases the GIL, such as large NumPy operations.
+
+	:param n_workers: The number of threads. If :py:obj:`None` the number of
+		processors on the machine is used.
+	:type n_workers: int, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def pool(self, initializer=None, initargs=()):
+		"""
+		Returns a pool of threads
+
+		:param initializer: A function to call in each thread when it starts
+		:type initializer: callable, optional
+		:param initargs: The arguments for ``initializer``
+		:type initargs: tuple, optional
+
+		:rtype: concurrent.futures.ThreadPoolExecutor
+		"""
+
+		return ThreadPoolExecutor(max_workers=self.n_workers, initializer=initializer, initargs=initargs)
+
+
+class ProcessExecutor(Executor):
+	"""
+	Runs the work in a pool of processes.
+
+	With :meth:`~pyms.Utils.Executor.ProcessExecutor.fill_rows` the arguments are sent
+	once to each process when it starts, and the processes write their rows directly
+	into a block of shared memory rather than sending them back to the parent process.
+
+	The functions and arguments are pickled, so the functions must be defined at
+	the top level of a module.
+
+	:param n_workers: The number of processes. If :py:obj:`None` the number of
+		processors on the machine is used.
+	:type n_workers: int, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def pool(self, initializer=None, initargs=()):
+		"""
+		Returns a pool of processes
+
+		:param initializer: A function to call in each process when it starts
+		:type initializer: callable, optional
+		:param initargs: The arguments for ``initializer``
+		:type initargs: tuple, optional
+
+		:rtype: concurrent.futures.ProcessPoolExecutor
+		"""
+
+		return ProcessPoolExecutor(max_workers=self.n_workers, initializer=initializer, initargs=initargs)
+
+	def fill_rows(self, function, out, *args):
+		"""
+		Fills an array by calling ``function(start, stop, *args)`` for ranges
+		of its rows, in the worker processes
+
+		:param function: The function to calculate the rows with
+		:type function: callable
+		:param out: The array to fill
+		:type out: numpy.ndarray
+		:param args: Further arguments for ``function``
+		"""
+
+		shared = multiprocessing.RawArray(ctypes.c_char, max(1, out.nbytes))
+		initargs = (shared, out.shape, out.dtype.str, function, args)
+
+		with self.pool(initializer=_init_fill_worker, initargs=initargs) as pool:
+			# Wait for every range, so any error in the workers is raised here
+			list(pool.map(_fill_worker_rows, row_ranges(len(out), self.n_workers)))
+
+		out[:] = _shared_array(shared, out.shape, out.dtype.str)
+
+
+class MPIExecutor(Executor):
+	"""
+	Runs the work across the ranks of an MPI job. Requires :mod:`mpi4py`.
+
+	:meth:`~pyms.Utils.Executor.MPIExecutor.fill_rows` must be called on every rank.
+	Each rank calculates a contiguous range of the rows, and the ranges are
+	gathered straight into the array on every rank.
+
+	:meth:`~pyms.Utils.Executor.MPIExecutor.pool` returns a
+	:class:`mpi4py.futures.MPIPoolExecutor`, for which the script must be run with
+	``mpiexec -n <ranks> python -m mpi4py.futures <script>``.
+
+	:param comm: The MPI communicator. If :py:obj:`None` ``MPI.COMM_WORLD`` is used.
+	:type comm: mpi4py.MPI.Comm, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	def __init__(self, comm=None):
+		"""
+		Initialise the executor
+		"""
+
+		try:
+			from mpi4py import MPI
+		except ModuleNotFoundError:
+			raise ModuleNotFoundError("mpi4py is required for the MPI executor")
+
+		if comm is None:
+			comm = MPI.COMM_WORLD
+
+		self.comm = comm
+		super().__init__(comm.Get_size())
+
+	@property
+	def rank(self):
+		"""
+		The rank of this process
+
+		:rtype: int
+		"""
+
+		return self.comm.Get_rank()
+
+	def pool(self, initializer=None, initargs=()):
+		"""
+		Returns a pool of MPI processes
+
+		:param initializer: A function to call in each process when it starts
+		:type initializer: callable, optional
+		:param initargs: The arguments for ``initializer``
+		:type initargs: tuple, optional
+
+		:rtype: mpi4py.futures.MPIPoolExecutor
+		"""
+
+		from mpi4py.futures import MPIPoolExecutor
+
+		return MPIPoolExecutor(initializer=initializer, initargs=initargs)
+
+	def fill_rows(self, function, out, *args):
+		"""
+		Fills an array by calling ``function(start, stop, *args)`` for the range
+		of rows of this rank, and gathering the rows of the other ranks
+
+		:param function: The function to calculate the rows with
+		:type function: callable
+		:param out: The array to fill
+		:type out: numpy.ndarray
+		:param args: Further arguments for ``function``
+		"""
+
+		ranges = row_ranges(len(out), self.n_workers)
+		start, stop = ranges[self.rank]
+
+		local_rows = numpy.ascontiguousarray(function(start, stop, *args), dtype=out.dtype)
+
+		row_size = int(numpy.prod(out.shape[1:], dtype=int))
+		counts = [(range_stop - range_start) * row_size for range_start, range_stop in ranges]
+		displacements = [range_start * row_size for range_start, _ in ranges]
+
+		gathered = numpy.empty(out.shape, dtype=out.dtype)
+		self.comm.Allgatherv(local_rows, [gathered, (counts, displacements)])
+		out[:] = gathered
+
+
+#: The names accepted by :func:`pyms.Utils.Executor.get_executor`
+EXECUTORS = {
+		"serial": SerialExecutor,
+		"threads": ThreadExecutor,
+		"processes": ProcessExecutor,
+		"mpi": MPIExecutor,
+		}
+
+
+def get_executor(executor=None):
+	"""
+	Returns an executor
+
+	:param executor: An :class:`~pyms.Utils.Executor.Executor`, or the name of one
+		of the backends: ``'serial'``, ``'threads'``, ``'processes'`` or ``'mpi'``.
+		If :py:obj:`None` a :class:`~pyms.Utils.Executor.SerialExecutor` is returned.
+	:type executor: pyms.Utils.Executor.Executor or str, optional
+
+	:rtype: pyms.Utils.Executor.Executor
+
+	:author: Dominic Davis-Foster
+	"""
+
+	if executor is None:
+		return SerialExecutor()
+	elif isinstance(executor, Executor):
+		return executor
+	elif isinstance(executor, str):
+		if executor not in EXECUTORS:
+			raise ValueError(f"Unknown executor '{executor}'. Choose from: {', '.join(EXECUTORS)}")
+		return EXECUTORS[executor]()
+	else:
+		raise TypeError("'executor' must be an Executor object or a string")
+
+
+def row_ranges(n_rows, n_ranges):
+	"""
+	Splits rows into contiguous ranges of as equal size as possible
+
+	:param n_rows: The number of rows
+	:type n_rows: int
+	:param n_ranges: The number of ranges
+	:type n_ranges: int
+
+	:return: The start and stop of each range
+	:rtype: list of tuple
+	"""
+
+	bounds = [(i * n_rows) // n_ranges for i in range(n_ranges + 1)]
+
+	return list(zip(bounds[:-1], bounds[1:]))
+
+
+class _SerialPool(_FuturesExecutor):
+	"""
+	A :class:`concurrent.futures.Executor` which runs each task as soon as it is submitted
+	"""
+
+	def __init__(self, initializer=None, initargs=()):
+		self._initializer = initializer
+		self._initargs = initargs
+
+	def submit(self, fn, *args, **kwargs):
+		if self._initializer is not None:
+			self._initializer(*self._initargs)
+			self._initializer = None
+
+		future = Future()
+
+		try:
+			future.set_result(fn(*args, **kwargs))
+		except BaseException as e:
+			future.set_exception(e)
+
+		return future
+
+
+def _call_rows(task):
+	"""
+	Calls the function of a task of :meth:`pyms.Utils.Executor.Executor.fill_rows`
+	"""
+
+	function, start, stop, args = task
+	return function(start, stop, *args)
+
+
+def _shared_array(shared, shape, dtype):
+	"""
+	Returns a NumPy array backed by shared memory
+	"""
+
+	return numpy.frombuffer(shared, dtype=dtype, count=int(numpy.prod(shape, dtype=int))).reshape(shape)
+
+
+# The shared output array, function and arguments in each worker process
+_fill_state = {}
+
+
+def _init_fill_worker(shared, shape, dtype, function, args):
+	"""
+	Stores the shared output array, function and arguments in a worker process
+	"""
+
+	_fill_state["out"] = _shared_array(shared, shape, dtype)
+	_fill_state["function"] = function
+	_fill_state["args"] = args
+
+
+def _fill_worker_rows(row_range):
+	"""
+	Calculates a range of rows in a worker process and writes them to the shared array
+	"""
+
+	start, stop = row_range
+	_fill_state["out"][start:stop] = _fill_state["function"](start, stop, *_fill_state["args"])
@@ -25,10 +25,15 @@ General I/O functions
 
 # stdlib
 import gzip
+import json
 import pathlib
 import pickle
+import struct
 from numbers import Number
 
+# 3rd party
+import numpy
+
 # this package
 from pyms.Utils.Utils import _list_types
 
@@ -227,3 +232,119 @@ def save_data(file_name, data, format_str="%.6f", prepend="", sep=" ", compresse
 		with file_name.open() as f_in:
 			with gzip.open(str(file_name) + '.gz', 'wb') as f_out:
 				f_out.writelines(f_in)
+
+
+#: Identifies files written by :func:`save_arrays`
+ARRAYS_MAGIC = b"PYMSARR1"
+
+# Arrays are aligned to this many bytes within the file
+_ARRAYS_ALIGNMENT = 64
+
+
+def save_arrays(file_name, arrays, header=None):
+	"""
+	Saves NumPy arrays to a file in PyMassSpec's native binary format
+
+	The file contains a small JSON header followed by the raw little-endian data
+	of each array, aligned so that :func:`load_arrays` can memory-map them.
+
+	:param file_name: Name of the file
+	:type file_name: str or pathlib.Path
+	:param arrays: Mapping of names to arrays
+	:type arrays: dict
+	:param header: Additional JSON-serialisable data to store in the header
+	:type header: dict, optional
+
+	:author: Dominic Davis-Foster
+	"""
+
+	from pyms.Utils.Utils import is_path
+
+	if not is_path(file_name):
+		raise TypeError("'file_name' must be a string or a PathLike object")
+
+	if not isinstance(arrays, dict):
+		raise TypeError("'arrays' must be a dictionary")
+
+	if header is None:
+		header = {}
+	elif not isinstance(header, dict):
+		raise TypeError("'header' must be a dictionary")
+
+	file_name = prepare_filepath(file_name)
+
+	arrays = {
+			name: numpy.ascontiguousarray(array, dtype=numpy.asarray(array).dtype.newbyteorder("<"))
+			for name, array in arrays.items()
+			}
+
+	# Work out where each array goes. The offsets are relative to the end of the header.
+	array_info = {}
+	offset = 0
+	for name, array in arrays.items():
+		array_info[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+		offset += -(-array.nbytes // _ARRAYS_ALIGNMENT) * _ARRAYS_ALIGNMENT
+
+	header_bytes = json.dumps({"header": header, "arrays": array_info}).encode("UTF-8")
+
+	# Pad the header so the arrays start on an aligned offset
+	data_start = len(ARRAYS_MAGIC) + 8 + len(header_bytes)
+	header_bytes += b" " * (-data_start % _ARRAYS_ALIGNMENT)
+	data_start = len(ARRAYS_MAGIC) + 8 + len(header_bytes)
+
+	with file_name.open("wb") as fp:
+		fp.write(ARRAYS_MAGIC)
+		fp.write(struct.pack("<Q", len(header_bytes)))
+		fp.write(header_bytes)
+
+		for name, array in arrays.items():
+			fp.seek(data_start + array_info[name]["offset"])
+			fp.write(array.tobytes())
+
+
+def load_arrays(file_name, mmap=False):
+	"""
+	Loads NumPy arrays saved with :func:`save_arrays`
+
+	:param file_name: Name of the file
+	:type file_name: str or pathlib.Path
+	:param mmap: Whether to memory-map the arrays rather than reading them into memory.
+		Memory-mapped arrays are copy-on-write, so changes to them are not saved to the file.
+	:type mmap: bool, optional
+
+	:return: Mapping of names to arrays, and the additional data from the header
+	:rtype: tuple
+
+	:author: Dominic Davis-Foster
+	"""
+
+	from pyms.Utils.Utils import is_path
+
+	if not is_path(file_name):
+		raise TypeError("'file_name' must be a string or a PathLike object")
+
+	file_name = prepare_filepath(file_name, mkdirs=False)
+
+	with file_name.open("rb") as fp:
+		if fp.read(len(ARRAYS_MAGIC)) != ARRAYS_MAGIC:
+			raise ValueError(f"'{file_name}' is not a PyMassSpec binary file")
+
+		header_length = struct.unpack("<Q", fp.read(8))[0]
+		header = json.loads(fp.read(header_length).decode("UTF-8"))
+		data_start = len(ARRAYS_MAGIC) + 8 + header_length
+
+		arrays = {}
+		for name, info in header["arrays"].items():
+			dtype = numpy.dtype(info["dtype"])
+			shape = tuple(info["shape"])
+			count = int(numpy.prod(shape))
+
+			if mmap and count:
+				arrays[name] = numpy.memmap(
+						file_name, dtype=dtype, mode="c", offset=data_start + info["offset"], shape=shape,
+						)
+			else:
+				fp.seek(data_start + info["offset"])
+				arrays[name] = numpy.fromfile(fp, dtype=dtype, count=count).reshape(shape)
+
+	return arrays, header["header"]
@@ -26,10 +26,12 @@ from copy import deepcopy
 # 3rd party
 import deprecation
 import pytest
+from netCDF4 import Dataset
 
 # pyms
 from pyms.GCMS.Class import GCMS_data
-from pyms.GCMS.IO.ANDI import ANDI_reader
+from pyms.GCMS.IO.ANDI import ANDI_chunks, ANDI_intensity_matrix, ANDI_reader
+from pyms.IntensityMatrix import build_intensity_matrix
 from pyms.IonChromatogram import IonChromatogram
 from pyms.Spectrum import Scan
 from tests.constants import *
@@ -138,6 +140,81 @@ def test_ANDI_reader(datadir):
 	with pytest.raises(FileNotFoundError):
 		ANDI_reader(test_string)
 
+	with pytest.raises(FileNotFoundError):
+		ANDI_reader(test_string, mmap=True)
+
+
+@pytest.fixture(scope="module")
+def small_andi_file(outputdir):
+	filename = outputdir / "small_andi.cdf"
+
+	with Dataset(filename, "w", format="NETCDF3_CLASSIC") as rootgrp:
+		rootgrp.createDimension("point_number", 7)
+		rootgrp.createDimension("scan_number", 3)
+		rootgrp.createVariable("mass_values", "f4", ("point_number", ))[:] = [
+				50.0, 51.5, 53.0, 52.0, 51.0, 50.5, 60.0]
+		rootgrp.createVariable("intensity_values", "f4", ("point_number", ))[:] = [
+				10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0]
+		rootgrp.createVariable("scan_acquisition_time", "f8", ("scan_number", ))[:] = [1.5, 2.5, 3.5]
+		rootgrp.createVariable("point_count", "i4", ("scan_number", ))[:] = [3, 3, 1]
+
+	return filename
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_ANDI_reader_small(small_andi_file, mmap):
+	data = ANDI_reader(small_andi_file, mmap=mmap)
+
+	assert isinstance(data, GCMS_data)
+	assert data.time_list == [1.5, 2.5, 3.5]
+	assert list(data.scan_offsets) == [0, 3, 6, 7]
+	assert data.min_mass == 50.0
+	assert data.max_mass == 60.0
+	assert list(data.tic.intensity_array) == [60.0, 150.0, 70.0]
+
+	# The second scan is in descending order
+	assert data.scan_list == [
+			Scan([50.0, 51.5, 53.0], [10.0, 20.0, 30.0]),
+			Scan([50.5, 51.0, 52.0], [60.0, 50.0, 40.0]),
+			Scan([60.0], [70.0]),
+			]
+
+
+def test_ANDI_reader_mmap_equal(small_andi_file):
+	assert ANDI_reader(small_andi_file, mmap=True) == ANDI_reader(small_andi_file)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+def test_ANDI_chunks(small_andi_file, chunk_size):
+	chunks = list(ANDI_chunks(small_andi_file, chunk_size))
+	data = ANDI_reader(small_andi_file)
+
+	assert sum(len(chunk) for chunk in chunks) == len(data)
+	assert sum((chunk.scan_list for chunk in chunks), []) == data.scan_list
+	assert sum((chunk.time_list for chunk in chunks), []) == data.time_list
+
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			ANDI_chunks(small_andi_file, obj)
+	with pytest.raises(ValueError):
+		ANDI_chunks(small_andi_file, 0)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+def test_ANDI_intensity_matrix(small_andi_file, outputdir, chunk_size):
+	im = build_intensity_matrix(ANDI_reader(small_andi_file), bin_interval=0.5, bin_left=0.25, bin_right=0.25)
+
+	streamed = ANDI_intensity_matrix(
+			small_andi_file, bin_interval=0.5, bin_left=0.25, bin_right=0.25, chunk_size=chunk_size,
+			)
+	assert streamed == im
+
+	streamed = ANDI_intensity_matrix(
+			small_andi_file, bin_interval=0.5, bin_left=0.25, bin_right=0.25, chunk_size=chunk_size,
+			memmap_file=outputdir / "small_andi_im.npy",
+			)
+	assert streamed == im
+
 
 # def test_ANDI_OpenChrom_reader(datadir):
 # todo
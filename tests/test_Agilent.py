@@ -0,0 +1,108 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# stdlib
+import struct
+
+# 3rd party
+import numpy
+import pytest
+
+# pyms
+from pyms.GCMS.Class import GCMS_data
+from pyms.GCMS.IO.agilent import Agilent_reader, ismember
+
+# tests
+from .constants import *
+
+# (retention time in ms, [(m/z * 20, compressed abundance), ...])
+_scans = [
+		(60000, [(1000, 100), (1010, 200), (1021, (1 << 14) | 5)]),
+		(120000, [(1010, 300), (1100, (3 << 14) | 2)]),
+		(180000, [(1000, 7), (1021, 8), (1100, 9), (1200, 10)]),
+		]
+
+
+def _pascal_string(buffer, offset, string):
+	buffer[offset] = len(string)
+	buffer[offset + 1:offset + 1 + len(string)] = string
+
+
+@pytest.fixture(scope="module")
+def agilent_dir(outputdir):
+	directory = outputdir / "agilent.D"
+	directory.mkdir(exist_ok=True)
+
+	buffer = bytearray(512)
+	_pascal_string(buffer, 24, b"Sample")
+	_pascal_string(buffer, 86, b"Description")
+	_pascal_string(buffer, 148, b"Operator")
+	_pascal_string(buffer, 178, b"01 Jan 20   10:00 AM")
+	_pascal_string(buffer, 208, b"GCMS")
+	_pascal_string(buffer, 218, b"GC")
+	_pascal_string(buffer, 228, b"Method")
+	buffer[252:258] = struct.pack(">hhh", 1, 2, 3)
+	buffer[260:264] = struct.pack(">l", (512 + 2) // 2)
+	buffer[278:282] = struct.pack(">L", len(_scans))
+
+	# Scan blocks follow the table of scans and the normalization offset
+	scan_offset = 512 + 12 * len(_scans) + 4
+	table = b''
+	blocks = b''
+	for rt, pairs in _scans:
+		tic = sum(abundance for _, abundance in pairs)
+		table += struct.pack(">lll", (scan_offset + len(blocks) + 2) // 2, rt, tic)
+		block = struct.pack(">h", 2 * (len(pairs) - 2) + 18) + bytes(16)
+		for mz, abundance in pairs:
+			block += struct.pack(">HH", mz, abundance)
+		blocks += block
+
+	(directory / "DATA.MS").write_bytes(bytes(buffer) + table + bytes(4) + blocks)
+
+	return directory
+
+
+def test_Agilent_reader(agilent_dir):
+	data = Agilent_reader(agilent_dir)
+
+	assert isinstance(data, GCMS_data)
+	assert data.time_list == [1.0, 2.0, 3.0]
+	assert data.min_mass == 50.0
+	assert data.max_mass == 60.0
+
+	scans = data.scan_list
+	for scan in scans:
+		assert scan.mass_list == [50.0, 50.5, 51.05, 55.0, 60.0]
+
+	assert scans[0].intensity_list == [100.0, 200.0, 40.0, 0.0, 0.0]
+	assert scans[1].intensity_list == [0.0, 300.0, 0.0, 1024.0, 0.0]
+	assert scans[2].intensity_list == [7.0, 0.0, 8.0, 9.0, 10.0]
+
+	# Errors
+	for obj in [*test_numbers, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			Agilent_reader(obj)
+
+
+def test_ismember():
+	lia, locb = zip(*ismember([3, 1, 5, 2], numpy.array([2, 3, 2, 1])))
+
+	assert list(lia) == [True, True, False, True]
+	assert list(locb) == [1, 3, -1, 0]
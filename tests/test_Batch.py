@@ -0,0 +1,133 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# stdlib
+import os
+import shutil
+
+# 3rd party
+import pytest
+
+# pyms
+from pyms.Batch import BatchResult, Recipe, run_batch
+from pyms.Experiment import Experiment, load_expr
+from pyms.GCMS.IO.JCAMP import JCAMP_reader
+from pyms.Utils.Executor import ProcessExecutor, ThreadExecutor
+
+# tests
+from .constants import *
+
+
+def crashing_reader(file_name):
+	# Kills the worker process, as a segfault in a reader would
+	os._exit(1)
+
+
+@pytest.fixture(scope="module")
+def recipe():
+	return Recipe(reader=JCAMP_reader, tophat_struct="1.5m", points=9, scans=2, cutoff=10000)
+
+
+@pytest.fixture(scope="module")
+def jcamp_files(datadir, outputdir):
+	directory = outputdir / "batch"
+	if directory.exists():
+		shutil.rmtree(directory)
+	directory.mkdir()
+
+	file_names = []
+	for name in ["sample_1", "sample_2"]:
+		file_names.append(directory / f"{name}.JDX")
+		shutil.copyfile(datadir / "ELEY_1_SUBTRACT.JDX", file_names[-1])
+
+	return file_names
+
+
+def test_recipe(recipe, datadir):
+	experiment = recipe.process(datadir / "ELEY_1_SUBTRACT.JDX")
+
+	assert isinstance(experiment, Experiment)
+	assert experiment.expr_code == "ELEY_1_SUBTRACT"
+	assert len(experiment) > 0
+	for peak in experiment.peak_list:
+		assert peak.area > 0
+		assert len(peak.ion_areas) == 5
+
+
+def test_run_batch(recipe, jcamp_files, outputdir):
+	missing_file = jcamp_files[0].parent / "missing.JDX"
+	output_directory = outputdir / "batch" / "experiments"
+
+	results = run_batch([*jcamp_files, missing_file], recipe, max_workers=2, output_directory=output_directory)
+	results = {result.expr_code: result for result in results}
+
+	assert sorted(results) == ["missing", "sample_1", "sample_2"]
+
+	assert results["missing"].failed
+	assert results["missing"].experiment is None
+	assert "FileNotFoundError" in results["missing"].error
+
+	expected = recipe.process(jcamp_files[0])
+	for expr_code in ["sample_1", "sample_2"]:
+		result = results[expr_code]
+		assert isinstance(result, BatchResult)
+		assert not result.failed
+		assert result.experiment.peak_list == expected.peak_list
+		assert load_expr(output_directory / f"{expr_code}.expr") == result.experiment
+
+
+@pytest.mark.parametrize("executor", ["serial", ThreadExecutor(2), ProcessExecutor(2)])
+def test_executors(recipe, jcamp_files, executor):
+	expected = recipe.process(jcamp_files[0])
+
+	assert recipe.process(jcamp_files[0], executor=executor).peak_list == expected.peak_list
+
+	results = list(run_batch(jcamp_files, recipe, executor=executor))
+	assert sorted(result.expr_code for result in results) == ["sample_1", "sample_2"]
+	for result in results:
+		assert result.experiment.peak_list == expected.peak_list
+
+
+def test_broken_worker(jcamp_files):
+	recipe = Recipe(reader=crashing_reader)
+
+	results = list(run_batch(jcamp_files, recipe, expr_codes=["a", "b"], max_workers=1))
+
+	assert sorted(result.expr_code for result in results) == ["a", "b"]
+	for result in results:
+		assert result.failed
+		assert "BrokenProcessPool" in result.error
+
+
+def test_errors(recipe, jcamp_files):
+	for obj in [test_string, *test_numbers, test_list_ints, test_dict]:
+		with pytest.raises(TypeError):
+			run_batch(obj, recipe)
+
+	for obj in [test_string, *test_numbers, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			run_batch(jcamp_files, obj)
+
+	with pytest.raises(ValueError):
+		run_batch(jcamp_files, recipe, expr_codes=["a"])
+
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			Recipe(points=obj)
@@ -30,6 +30,7 @@ from pyms.BillerBiemann import (
 	BillerBiemann, get_maxima_indices, get_maxima_list, get_maxima_list_reduced,
 	get_maxima_matrix, num_ions_threshold, rel_threshold, sum_maxima,
 	)
+from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
 from pyms.Noise.Analysis import window_analyzer
 from pyms.Noise.SavitzkyGolay import savitzky_golay
@@ -40,6 +41,58 @@ from pyms.TopHat import tophat
 from tests.constants import *
 
 
+def _get_maxima_indices_loop(ion_intensities, points=3):
+	# Reference implementation of get_maxima_indices, one window at a time
+	peak_point = []
+	edge = -1
+	half = int(points / 2)
+	points = 2 * half + 1
+
+	for index in range(len(ion_intensities) - points + 1):
+		left = ion_intensities[index:index + half]
+		mid = ion_intensities[index + half]
+		right = ion_intensities[index + half + 1:index + points]
+		if mid > max(left) and mid > max(right):
+			peak_point.append(index + half)
+			edge = -1
+		if mid > max(left) and mid == max(right):
+			edge = index + half
+		if mid == max(left) and mid > max(right):
+			if edge > -1:
+				peak_point.append(int((edge + index + half) / 2))
+			edge = -1
+
+	return peak_point
+
+
+def _get_maxima_matrix_loop(raw_im, points=3, scans=1):
+	# Reference implementation of get_maxima_matrix, one element at a time
+	numrows, numcols = raw_im.shape
+	maxima_im = numpy.zeros((numrows, numcols))
+
+	for col in range(numcols):
+		for row in _get_maxima_indices_loop(list(raw_im[:, col]), points):
+			maxima_im[row, col] = raw_im[row, col]
+
+	half = int(scans / 2)
+	for row in range(numrows):
+		best = 0
+		loc = 0
+		for ii in range(scans):
+			if 0 <= row - half + ii < numrows:
+				tic = maxima_im[row - half + ii].sum()
+				if tic > best:
+					best = tic
+					loc = ii
+		for ii in range(scans):
+			if 0 <= row - half + ii < numrows and ii != loc:
+				for col in range(numcols):
+					maxima_im[row - half + loc, col] += maxima_im[row - half + ii, col]
+					maxima_im[row - half + ii, col] = 0
+
+	return maxima_im
+
+
 class TestBillerBiemann:
 
 	def test_BillerBiemann(self, im_i):
@@ -103,6 +156,31 @@ class Test_rel_threshold:
 		with pytest.raises(ValueError):
 			rel_threshold(peak_list, percent=0)
 
+	def test_copy_peaks(self, peak_list):
+		original_spectra = [peak.mass_spectrum.intensity_list for peak in peak_list]
+
+		pl = rel_threshold(peak_list, 2)
+
+		# The input peaks are unchanged
+		assert [peak.mass_spectrum.intensity_list for peak in peak_list] == original_spectra
+
+		for peak, new_peak in zip(peak_list, pl):
+			assert new_peak is not peak
+			assert new_peak.bounds == peak.bounds
+			assert new_peak.bounds is not peak.bounds
+
+			spec = numpy.array(peak.mass_spectrum.mass_spec)
+			expected = numpy.where(spec < spec.max() / 100.0 * 2, 0, spec)
+			numpy.testing.assert_array_equal(new_peak.mass_spectrum.mass_spec, expected)
+
+			# The UID is the same as the one the Peak calculates itself
+			assert new_peak.UID == Peak(new_peak.rt, new_peak.mass_spectrum).UID
+
+		# In place
+		in_place = rel_threshold(peak_list, 2, copy_peaks=False)
+		assert in_place[0] is peak_list[0]
+		assert [peak.UID for peak in in_place] == [peak.UID for peak in pl]
+
 	@pytest.mark.parametrize("obj", [test_string, *test_sequences, test_dict, test_int])
 	def test_peak_list_errors(self, obj):
 		with pytest.raises(TypeError):
@@ -134,6 +212,12 @@ class Test_num_ions_threshold:
 		assert len(new_peak_list) <= len(peak_list)
 		assert len(new_peak_list) <= len(pl)
 
+		# Only the peaks with enough ions are kept, as copies
+		expected = [peak for peak in pl if sum(i >= 10000 for i in peak.mass_spectrum.mass_spec) >= 3]
+		assert [peak.UID for peak in new_peak_list] == [peak.UID for peak in expected]
+		assert all(new is not old for new, old in zip(new_peak_list, expected))
+		assert num_ions_threshold(pl, 3, 10000, copy_peaks=False)[0] is expected[0]
+
 		# With window_analyzer
 		# estimate noise level from the TIC, used later to
 		# discern true signal peaks
@@ -190,10 +274,25 @@ class Test_sum_maxima:
 
 
 class Test_get_maxima_indices:
-	@pytest.mark.skip(reason="TODO")
 	def test_get_maxima_indices(self):
-		# TODO: main test
-		pass
+		assert get_maxima_indices([0, 1, 0, 2, 3, 2, 1]) == [1, 4]
+		# The centre of a plateau after a rise
+		assert get_maxima_indices([0, 1, 3, 3, 3, 3, 1, 0]) == [3]
+		assert get_maxima_indices([0, 3, 3, 0]) == [1]
+		# A plateau after a fall is not a peak
+		assert get_maxima_indices([3, 2, 2, 2, 3]) == []
+		assert get_maxima_indices([0, 1, 0, 2, 3, 2, 1], points=5) == [4]
+		assert get_maxima_indices([0, 1, 0]) == [1]
+		assert get_maxima_indices([1, 0]) == []
+		assert get_maxima_indices([]) == []
+
+	@pytest.mark.parametrize("points", [2, 3, 4, 5, 9])
+	def test_matches_loop(self, points):
+		intensities = numpy.random.RandomState(points).randint(0, 4, size=(200, 20)).astype(float)
+
+		for col in range(intensities.shape[1]):
+			ion_intensities = intensities[:, col]
+			assert get_maxima_indices(ion_intensities, points) == _get_maxima_indices_loop(list(ion_intensities), points)
 
 	@pytest.mark.parametrize("obj", [test_string, *test_numbers, test_list_strs, test_dict])
 	def test_ion_intensities_errors(self, obj):
@@ -263,7 +362,16 @@ class Test_get_maxima_matrix:
 	def test_get_maxima_matrix(self, peak_list, im, tic):
 		maxima_matrix = get_maxima_matrix(im)
 		assert isinstance(maxima_matrix, numpy.ndarray)
-		# TODO: value check
+		assert maxima_matrix.shape == im.intensity_array.shape
+		assert set(numpy.nonzero(maxima_matrix[:, 0])[0]) == set(get_maxima_indices(im.get_ic_at_index(0).intensity_array))
+
+	@pytest.mark.parametrize("points, scans", [(3, 1), (3, 2), (5, 3), (9, 2), (4, 5)])
+	def test_matches_loop(self, points, scans):
+		intensities = numpy.random.RandomState(points * scans).randint(0, 4, size=(300, 30)).astype(float)
+		im = IntensityMatrix(list(range(300)), list(range(30)), intensities)
+
+		expected = _get_maxima_matrix_loop(intensities, points, scans)
+		assert numpy.array_equal(get_maxima_matrix(im, points, scans), expected)
 
 	@pytest.mark.parametrize("obj", [test_string, *test_numbers, *test_sequences, test_dict])
 	def test__errors(self, obj):
@@ -0,0 +1,147 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# stdlib
+import shutil
+from collections import Counter
+
+# 3rd party
+import pytest
+
+# pyms
+from pyms.GCMS.IO.JCAMP import JCAMP_reader
+from pyms.IntensityMatrix import IntensityMatrix, build_intensity_matrix_i
+from pyms.Utils.Cache import ProcessingCache
+
+# tests
+from .constants import *
+
+calls = Counter()
+
+
+def read(file_name):
+	calls["read"] += 1
+	return JCAMP_reader(file_name)
+
+
+def build(data, bin_left=0.3, bin_right=0.7):
+	calls["build"] += 1
+	return build_intensity_matrix_i(data, bin_left=bin_left, bin_right=bin_right)
+
+
+def n_largest(im, n):
+	calls["n_largest"] += 1
+	return sorted(im.intensity_array.max(axis=0).tolist())[-n:]
+
+
+@pytest.fixture()
+def cache(outputdir):
+	directory = outputdir / "cache"
+	if directory.exists():
+		shutil.rmtree(directory)
+	calls.clear()
+	return ProcessingCache(directory)
+
+
+def test_pipeline(cache, datadir, outputdir):
+	file_name = outputdir / "cached.JDX"
+	shutil.copyfile(datadir / "ELEY_1_SUBTRACT.JDX", file_name)
+
+	def pipeline(bin_right=0.7, n=3):
+		data = cache.run(read, file_name)
+		im = cache.run(build, data, bin_left=1 - bin_right, bin_right=bin_right)
+		return im, cache.run(n_largest, im, n)
+
+	im, largest = pipeline()
+	assert calls == {"read": 1, "build": 1, "n_largest": 1}
+	assert isinstance(im, IntensityMatrix)
+	assert len(list(cache.directory.iterdir())) == 3
+
+	# Everything comes from the cache
+	cached_im, cached_largest = pipeline()
+	assert calls == {"read": 1, "build": 1, "n_largest": 1}
+	assert cached_im == im
+	assert cached_largest == largest
+
+	# Only the last step is recomputed
+	pipeline(n=5)
+	assert calls == {"read": 1, "build": 1, "n_largest": 2}
+
+	# Changing the binning recomputes the steps after it
+	pipeline(bin_right=0.6)
+	assert calls == {"read": 1, "build": 2, "n_largest": 3}
+
+	# Changing the file recomputes everything
+	with file_name.open("a") as fp:
+		fp.write("\n")
+	pipeline()
+	assert calls == {"read": 2, "build": 3, "n_largest": 4}
+
+
+def test_decorator(cache):
+	cached_sum = cache.cached(sum)
+
+	assert cached_sum([1, 2, 3]) == 6
+	assert cached_sum([1, 2, 3]) == 6
+	assert cached_sum([1, 2, 4]) == 7
+	assert len(list(cache.directory.iterdir())) == 2
+
+
+def test_eviction(outputdir):
+	directory = outputdir / "small_cache"
+	if directory.exists():
+		shutil.rmtree(directory)
+
+	cache = ProcessingCache(directory, max_size=35000)
+
+	def make_bytes(n):
+		calls[n] += 1
+		return bytes(n)
+
+	calls.clear()
+	for n in [10000, 10001, 10002]:
+		cache.run(make_bytes, n)
+
+	# Mark the first result as recently used
+	cache.run(make_bytes, 10000)
+	assert calls[10000] == 1
+
+	cache.run(make_bytes, 10003)
+
+	assert cache.size() <= 35000
+	assert len(list(directory.iterdir())) == 3
+
+	cache.run(make_bytes, 10000)
+	cache.run(make_bytes, 10001)
+	assert calls[10000] == 1
+	assert calls[10001] == 2
+
+	cache.clear()
+	assert cache.size() == 0
+
+
+def test_errors(outputdir):
+	for obj in [*test_numbers, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			ProcessingCache(obj)
+
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			ProcessingCache(outputdir / "cache", max_size=obj)
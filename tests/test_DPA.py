@@ -31,7 +31,9 @@ import pytest
 # pyms
 from pyms.BillerBiemann import BillerBiemann, num_ions_threshold, rel_threshold
 from pyms.DPA.Alignment import Alignment, exprl2alignment
-from pyms.DPA.PairwiseAlignment import align_with_tree, PairwiseAlignment
+from pyms.DPA.PairwiseAlignment import (
+	align, align_new_experiments, align_with_tree, dp, PairwiseAlignment, position_similarity, rt_band, score_matrix,
+	)
 from pyms.Experiment import Experiment, load_expr
 from pyms.GCMS.IO.JCAMP import JCAMP_reader
 from pyms.IntensityMatrix import build_intensity_matrix_i
@@ -40,6 +42,7 @@ from pyms.Peak.Function import peak_sum_area, peak_top_ion_areas
 from pyms.Peak.List.Function import composite_peak
 from pyms.Peak.List.IO import store_peaks
 from pyms.TopHat import tophat
+from pyms.Utils.Executor import ProcessExecutor, ThreadExecutor
 
 # tests
 from .constants import *
@@ -142,6 +145,58 @@ def A1(T1):
 	return A1
 
 
+@pytest.mark.parametrize("use_processes", [True, False])
+def test_parallel_sim_matrix(F1, T1, use_processes):
+	progress = []
+	T = PairwiseAlignment(
+			F1, Dw, Gw, n_workers=2, use_processes=use_processes,
+			progress=lambda done, total: progress.append((done, total)),
+			)
+
+	assert numpy.array_equal(T.sim_matrix, T1.sim_matrix)
+
+	n_pairs = len(F1) * (len(F1) - 1) // 2
+	assert progress == [(done, n_pairs) for done in range(1, n_pairs + 1)]
+
+
+def test_peak_indices(F1, expr_list):
+	merged = align(F1[0], F1[1], Dw, Gw)
+
+	assert merged.peak_indices.shape == (2, len(merged))
+	assert merged.peakpos.shape == merged.peak_indices.shape
+	assert merged.peakalgt.shape == (len(merged), 2)
+
+	for row, indices, expr in zip(merged.peakpos, merged.peak_indices, expr_list[:2]):
+		# Every peak appears once, and gaps are None
+		assert sorted(indices[indices >= 0]) == list(range(len(expr.peak_list)))
+		assert all(peak is None for peak in row[indices < 0])
+		assert all(peak is expr.peak_list[idx] for peak, idx in zip(row[indices >= 0], indices[indices >= 0]))
+
+	# Positions are sorted by average retention time
+	rt_avg = [numpy.mean([peak.rt for peak in position if peak is not None]) for position in merged.peakalgt]
+	assert rt_avg == sorted(rt_avg)
+
+	n_peaks = numpy.count_nonzero(merged.peak_indices >= 0, axis=0)
+	merged.filter_min_peaks(2)
+	assert len(merged) == numpy.count_nonzero(n_peaks >= 2)
+	assert all(peak is not None for position in merged.peakalgt for peak in position)
+
+
+def test_align_new_experiments(F1, T1, expr_list):
+	existing = align_with_tree(PairwiseAlignment(F1[:3], Dw, Gw))
+	A = align_new_experiments(existing, expr_list[3:], Dw, Gw)
+
+	assert A.expr_code == eley_codes
+	assert existing.expr_code == eley_codes[:3]
+
+	for indices, expr in zip(A.peak_indices, expr_list):
+		assert sorted(indices[indices >= 0]) == list(range(len(expr.peak_list)))
+
+	# Rebalancing realigns everything with a new guide tree
+	rebalanced = align_new_experiments(existing, expr_list[3:], Dw, Gw, min_peaks=2, rebalance=True)
+	assert numpy.array_equal(rebalanced.peak_indices, align_with_tree(T1, min_peaks=2).peak_indices)
+
+
 class Test_alignment_Errors:
 
 	@pytest.mark.parametrize("obj", [test_string, test_int, *test_sequences, test_dict])
@@ -150,6 +205,10 @@ class Test_alignment_Errors:
 			PairwiseAlignment(F1, obj, Gw)
 		with pytest.raises(TypeError):
 			PairwiseAlignment(F1, Dw, obj)
+		with pytest.raises(TypeError):
+			PairwiseAlignment(F1, Dw, Gw, n_workers=obj)
+		with pytest.raises(TypeError):
+			align_new_experiments(obj, [], Dw, Gw)
 
 	@pytest.mark.parametrize("obj", [*test_numbers, test_string, *test_sequences, test_dict])
 	def test_expr_errors(self, obj):
@@ -379,5 +438,78 @@ def test_align_2_alignments(A1, datadir, outputdir):
 # def test_alignment_compare():
 # todo
 
-# def test_dp()
-# todo
+
+def _dp_loop(S, gap_penalty):
+	# Reference implementation of the cost and trace matrices of dp, one cell at a time
+	row_length, col_length = S.shape
+
+	D = numpy.zeros((row_length + 1, col_length + 1))
+	D[:, 0] = gap_penalty * numpy.arange(row_length + 1)
+	D[0, :] = gap_penalty * numpy.arange(col_length + 1)
+
+	trace_matrix = numpy.zeros((row_length + 1, col_length + 1))
+	trace_matrix[:, 0] = 1
+	trace_matrix[0, :] = 2
+	trace_matrix[0, 0] = 3
+
+	for i in range(1, row_length + 1):
+		for j in range(1, col_length + 1):
+			darray = [D[i - 1, j - 1] + S[i - 1, j - 1], D[i - 1, j] + gap_penalty, D[i, j - 1] + gap_penalty]
+			D[i, j] = min(darray)
+			trace_matrix[i, j] = darray.index(D[i, j])
+
+	return D, trace_matrix
+
+
+def test_dp(F1):
+	score_matrices = [score_matrix(F1[0], F1[1], Dw), score_matrix(F1[2], F1[4], Dw)]
+
+	# Scores with many ties
+	score_matrices.append(numpy.random.RandomState(0).randint(0, 4, size=(40, 30)) / 4)
+
+	for S in score_matrices:
+		for gap in [Gw, 0.25, 0.5]:
+			result = dp(S, gap)
+			D, trace_matrix = _dp_loop(S, gap)
+
+			assert numpy.array_equal(result["D"], D)
+			assert numpy.array_equal(result["phi"], trace_matrix)
+			assert result["phi"].dtype == numpy.int8
+
+			assert len(result["trace"]) == len(result["p"]) == len(result["q"])
+			assert result["trace"].count(0) == len(result["matches"])
+			assert result["trace"].count(0) + result["trace"].count(1) == S.shape[0]
+			assert result["trace"].count(0) + result["trace"].count(2) == S.shape[1]
+
+	with pytest.raises(IndexError):
+		dp(numpy.zeros((0, 0)), Gw)
+
+
+def test_score_matrix(F1):
+	merged = align(F1[0], F1[1], Dw, Gw)
+
+	for a1, a2 in [(F1[0], F1[2]), (merged, F1[3]), (F1[3], merged), (merged, merged)]:
+		expected = [[position_similarity(pos1, pos2, Dw) for pos2 in a2.peakalgt] for pos1 in a1.peakalgt]
+		assert numpy.allclose(score_matrix(a1, a2, Dw), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("executor", [ThreadExecutor(3), ProcessExecutor(2)])
+def test_score_matrix_executors(F1, executor):
+	band = rt_band(F1[0], F1[1], Dw)
+
+	assert numpy.array_equal(score_matrix(F1[0], F1[1], Dw, executor=executor), score_matrix(F1[0], F1[1], Dw))
+	assert numpy.array_equal(
+			score_matrix(F1[0], F1[1], Dw, band=band, executor=executor),
+			score_matrix(F1[0], F1[1], Dw, band=band),
+			)
+
+
+def test_rt_band(F1):
+	band = rt_band(F1[0], F1[1], Dw)
+
+	assert band.shape == (len(F1[0]), len(F1[1]))
+	assert 0 < numpy.count_nonzero(band) < band.size
+
+	full_matrix = score_matrix(F1[0], F1[1], Dw)
+	assert numpy.allclose(score_matrix(F1[0], F1[1], Dw, band=band), full_matrix, rtol=0, atol=1e-12)
+	assert numpy.all(full_matrix[~band] == 1)
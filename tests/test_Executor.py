@@ -0,0 +1,94 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# 3rd party
+import numpy
+import pytest
+
+# pyms
+from pyms.Utils.Executor import (
+	Executor, ProcessExecutor, SerialExecutor, ThreadExecutor, get_executor, row_ranges,
+	)
+
+# tests
+from .constants import *
+
+
+def squares(start, stop, offset):
+	return (numpy.arange(start, stop)[:, numpy.newaxis] ** 2 + offset) * numpy.ones((1, 3))
+
+
+def failing(start, stop):
+	raise ValueError("failed")
+
+
+def test_row_ranges():
+	assert row_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+	assert row_ranges(2, 4) == [(0, 0), (0, 1), (1, 1), (1, 2)]
+	assert row_ranges(0, 2) == [(0, 0), (0, 0)]
+
+
+@pytest.mark.parametrize("executor", [SerialExecutor(), ThreadExecutor(3), ProcessExecutor(2)])
+def test_fill_rows(executor):
+	out = numpy.zeros((11, 3))
+	executor.fill_rows(squares, out, 5)
+	assert numpy.array_equal(out, squares(0, 11, 5))
+
+	out = numpy.zeros((0, 3))
+	executor.fill_rows(squares, out, 5)
+
+	with pytest.raises(ValueError):
+		executor.fill_rows(failing, numpy.zeros((4, 3)))
+
+
+@pytest.mark.parametrize("executor", [SerialExecutor(), ThreadExecutor(3), ProcessExecutor(2)])
+def test_pool(executor):
+	with executor.pool() as pool:
+		assert list(pool.map(abs, [-1, 2, -3])) == [1, 2, 3]
+
+		future = pool.submit(int, "a")
+		with pytest.raises(ValueError):
+			future.result()
+
+
+def test_get_executor():
+	assert isinstance(get_executor(), SerialExecutor)
+	assert isinstance(get_executor("threads"), ThreadExecutor)
+	assert isinstance(get_executor("processes"), ProcessExecutor)
+
+	executor = ThreadExecutor(2)
+	assert get_executor(executor) is executor
+	assert executor.n_workers == 2
+
+	with pytest.raises(ValueError):
+		get_executor("gpu")
+
+	for obj in [*test_numbers, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			get_executor(obj)
+
+
+def test_errors():
+	for obj in [test_float, test_string, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			Executor(obj)
+
+	with pytest.raises(ValueError):
+		ThreadExecutor(0)
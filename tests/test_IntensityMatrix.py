@@ -29,12 +29,16 @@ import pytest
 import deprecation
 
 # pyms
+import pyms.IntensityMatrix
+from pyms.GCMS.Class import GCMS_data
 from pyms.IntensityMatrix import (
-	ASCII_CSV, build_intensity_matrix, build_intensity_matrix_i, import_leco_csv,
-	IntensityMatrix,
+	ASCII_CSV, bin_intensities, build_intensity_matrix, build_intensity_matrix_i,
+	apply_to_ions, build_intensity_matrix_streamed, import_leco_csv, IntensityMatrix, SharedIntensityMatrix,
 	)
 from pyms.IonChromatogram import IonChromatogram
+from pyms.Noise.SavitzkyGolay import savitzky_golay
 from pyms.Spectrum import MassSpectrum
+from pyms.Utils.Executor import ProcessExecutor, ThreadExecutor
 
 # tests
 from .constants import *
@@ -104,6 +108,31 @@ class TestIntensityMatrix:
 		assert loaded_im_i == im_i
 		assert len(loaded_im_i) == len(im_i)
 
+	@pytest.mark.parametrize("mmap", [False, True])
+	def test_save_load(self, im_i, data, outputdir, mmap):
+		im_i.save(outputdir / "im_i.pyms")
+
+		loaded_im_i = IntensityMatrix.load(outputdir / "im_i.pyms", mmap=mmap)
+		assert loaded_im_i == im_i
+		assert loaded_im_i.time_list == im_i.time_list
+		assert loaded_im_i.mass_list == im_i.mass_list
+		assert isinstance(loaded_im_i._intensity_array, numpy.memmap) is mmap
+
+		# Changes to a memory-mapped matrix are not saved to the file
+		loaded_im_i.set_ic_at_index(0, loaded_im_i.get_ic_at_index(1))
+		assert IntensityMatrix.load(outputdir / "im_i.pyms", mmap=mmap) == im_i
+
+		# Errors
+		for obj in [test_list_strs, test_dict, test_list_ints, test_tuple, *test_numbers]:
+			with pytest.raises(TypeError):
+				im_i.save(obj)
+			with pytest.raises(TypeError):
+				IntensityMatrix.load(obj)
+
+		data.save(outputdir / "data.pyms")
+		with pytest.raises(ValueError):
+			IntensityMatrix.load(outputdir / "data.pyms")
+
 	# Inherited Methods from TimeListMixin
 
 	def test_time_list(self, im):
@@ -326,7 +355,7 @@ class TestIntensityMatrix:
 
 		assert isinstance(ms.mass_list, list)
 		assert ms.mass_list[123] == 173.2516
-		assert isinstance(ms.mass_spec, list)
+		assert isinstance(ms.mass_spec, numpy.ndarray)
 
 		scan = im.get_scan_at_index(123)
 		assert ms.mass_spec[123] == 0.0
@@ -581,6 +610,141 @@ def test_build_intensity_matrix_i(data, im_i):
 			build_intensity_matrix_i(data, bin_right=obj)
 
 
+@pytest.mark.parametrize("bin_interval, bin_left, bin_right", [
+		(1, 0.5, 0.5),
+		(1, 0.3, 0.7),
+		(0.5, 0.25, 0.25),
+		(2, 1.2, 0.8),
+		(0.1, 0.05, 0.05),
+		])
+def test_fill_bins_matches_loop(data, bin_interval, bin_left, bin_right):
+	fill_bins_loop = getattr(pyms.IntensityMatrix, "__fill_bins_loop")
+
+	im_loop = fill_bins_loop(data, data.min_mass, data.max_mass, bin_interval, bin_left, bin_right)
+	im = build_intensity_matrix(data, bin_interval, bin_left, bin_right)
+
+	assert im == im_loop
+
+
+def test_build_intensity_matrix_i_matches_loop(data, im_i):
+	fill_bins_loop = getattr(pyms.IntensityMatrix, "__fill_bins_loop")
+
+	im_loop = fill_bins_loop(data, int(data.min_mass + 1 - 0.7), data.max_mass, 1, 0.3, 0.7)
+	assert im_i == im_loop
+
+
+def test_bin_intensities():
+	mass_values = numpy.array([50.1, 51.2, 51.4, 50.0, 52.4, 48.0])
+	intensity_values = numpy.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+	scan_offsets = numpy.array([0, 3, 3, 6])
+
+	binned = bin_intensities(mass_values, intensity_values, scan_offsets, 50, 1, 0.5, 3)
+	assert binned.shape == (3, 3)
+	assert binned.tolist() == [[1.0, 5.0, 0.0], [0.0, 0.0, 0.0], [4.0, 0.0, 5.0]]
+
+	out = numpy.ones((3, 3))
+	assert bin_intensities(mass_values, intensity_values, scan_offsets, 50, 1, 0.5, 3, out=out) is out
+	assert out.tolist() == [[2.0, 6.0, 1.0], [1.0, 1.0, 1.0], [5.0, 1.0, 6.0]]
+
+	with pytest.raises(ValueError):
+		bin_intensities(mass_values, intensity_values, scan_offsets, 50, 1, 0.5, 3, out=numpy.zeros((2, 3)))
+	with pytest.raises(ValueError):
+		bin_intensities(mass_values, intensity_values[:-1], scan_offsets, 50, 1, 0.5, 3)
+	with pytest.raises(IndexError):
+		bin_intensities(mass_values, intensity_values, scan_offsets, 50, 1, 0.5, 2)
+
+	assert bin_intensities(mass_values[1:], intensity_values[1:], [0, 2, 5], 50, 1, 0.5, 3).tolist() == [
+			[0.0, 5.0, 0.0], [4.0, 0.0, 5.0]]
+
+
+def _chunks(data, chunk_size):
+	offsets = data.scan_offsets
+
+	for first_scan in range(0, len(data), chunk_size):
+		last_scan = min(first_scan + chunk_size, len(data))
+		start, stop = offsets[first_scan], offsets[last_scan]
+		yield GCMS_data.from_arrays(
+				data.time_list[first_scan:last_scan],
+				data.mass_values[start:stop],
+				data.intensity_values[start:stop],
+				offsets[first_scan:last_scan + 1] - start,
+				)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 5000])
+def test_build_intensity_matrix_streamed(data, im, chunk_size):
+	streamed = build_intensity_matrix_streamed(_chunks(data, chunk_size), len(data), data.min_mass, data.max_mass)
+
+	assert streamed == im
+	assert streamed.intensity_array.tolist() == im.intensity_array.tolist()
+
+
+def test_build_intensity_matrix_streamed_memmap(data, im, outputdir):
+	memmap_file = outputdir / "streamed_im.npy"
+	streamed = build_intensity_matrix_streamed(
+			_chunks(data, 500), len(data) + 10, data.min_mass, data.max_mass, memmap_file=memmap_file,
+			)
+
+	assert isinstance(streamed._intensity_array, numpy.memmap)
+	assert streamed.intensity_array.shape == im.intensity_array.shape
+	assert streamed.intensity_array.tolist() == im.intensity_array.tolist()
+	assert numpy.load(memmap_file)[:len(data)].tolist() == im.intensity_array.tolist()
+
+
+def test_build_intensity_matrix_streamed_errors(data):
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			build_intensity_matrix_streamed(_chunks(data, 500), obj, data.min_mass, data.max_mass)
+
+	for obj in [test_string, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			build_intensity_matrix_streamed(_chunks(data, 500), len(data), obj, data.max_mass)
+		with pytest.raises(TypeError):
+			build_intensity_matrix_streamed(_chunks(data, 500), len(data), data.min_mass, obj)
+
+	with pytest.raises(ValueError):
+		build_intensity_matrix_streamed(_chunks(data, 500), len(data) - 1, data.min_mass, data.max_mass)
+	with pytest.raises(ValueError):
+		build_intensity_matrix_streamed(_chunks(data, 500), len(data), data.min_mass, data.max_mass, bin_interval=0)
+
+
+def test_shared_intensity_matrix(im):
+	with SharedIntensityMatrix.from_intensity_matrix(im) as shared_im:
+		assert shared_im.is_shared
+		assert shared_im == im
+
+		# The unpickled matrix uses the same shared memory
+		other = pickle.loads(pickle.dumps(shared_im))
+		other.set_ic_at_index(3, IonChromatogram(numpy.zeros(len(im)), im.time_list))
+		assert not shared_im.get_ic_at_index(3).intensity_array.any()
+
+	# The intensity array is still usable once the shared memory is released
+	assert not shared_im.is_shared
+	assert not shared_im.get_ic_at_index(3).intensity_array.any()
+	assert shared_im.get_ic_at_index(4) == im.get_ic_at_index(4)
+
+
+def smooth(ic):
+	return savitzky_golay(ic)
+
+
+@pytest.mark.parametrize("executor", [None, ThreadExecutor(3), ProcessExecutor(2)])
+def test_apply_to_ions(im, executor):
+	expected = copy.deepcopy(im)
+	for ii in range(im.size[1]):
+		expected.set_ic_at_index(ii, smooth(expected.get_ic_at_index(ii)))
+
+	im_smooth = copy.deepcopy(im)
+	apply_to_ions(im_smooth, smooth, executor)
+	assert numpy.array_equal(im_smooth.intensity_array, expected.intensity_array)
+
+	for obj in [test_string, *test_numbers, test_dict]:
+		with pytest.raises(TypeError):
+			apply_to_ions(obj, smooth)
+		with pytest.raises(TypeError):
+			apply_to_ions(im, obj)
+
+
 # TODO; Saving data
 # # save the intensity matrix values to a file
 # mat = im.get_matrix_list()
@@ -276,6 +276,43 @@ def test_get_index_at_time(tic):
 		tic.get_index_at_time(1000000)
 
 
+def test_get_index_at_time_ties():
+	ic = IonChromatogram(numpy.zeros(5), [1.0, 2.0, 2.0, 3.0, 5.0])
+
+	# Equally close to two scans gives the lower index
+	assert ic.get_index_at_time(1.5) == 0
+	assert ic.get_index_at_time(4.0) == 3
+	# Repeated times give the first scan
+	assert ic.get_index_at_time(2.0) == 1
+	assert ic.get_index_at_time(2.4) == 1
+	assert ic.get_index_at_time(5.0) == 4
+
+	# Unsorted time lists
+	ic = IonChromatogram(numpy.zeros(4), [3.0, 1.0, 4.0, 2.0])
+	assert ic.get_index_at_time(1.4) == 1
+	assert ic.get_index_at_time(3.5) == 0
+
+
+def test_get_indices_at_times(tic):
+	times = numpy.linspace(tic.time_list[0], tic.time_list[-1], 1000)
+	indices = tic.get_indices_at_times(times)
+
+	assert isinstance(indices, numpy.ndarray)
+	assert indices.tolist() == [tic.get_index_at_time(time) for time in times.tolist()]
+	assert tic.get_indices_at_times([]).size == 0
+
+	# Errors
+	for obj in [test_string, *test_numbers, test_dict, test_list_strs]:
+		with pytest.raises(TypeError):
+			tic.get_indices_at_times(obj)
+
+	with pytest.raises(IndexError):
+		tic.get_indices_at_times([tic.time_list[0], -1])
+
+	with pytest.raises(IndexError):
+		tic.get_indices_at_times([1000000])
+
+
 def test_get_time_at_index(tic):
 	assert isinstance(tic.get_time_at_index(test_int), float)
 	assert tic.get_time_at_index(test_int) == 1304.15599823
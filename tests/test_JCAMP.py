@@ -134,6 +134,72 @@ def test_scan_list(data):
 	assert scans[0].max_mass == 477.6667
 
 
+def test_columnar_arrays(data):
+	scans = data.scan_list
+
+	assert isinstance(data.scan_offsets, numpy.ndarray)
+	assert len(data.scan_offsets) == len(data) + 1
+	assert data.scan_offsets[0] == 0
+	assert data.scan_offsets[-1] == len(data.mass_values) == len(data.intensity_values)
+	assert list(numpy.diff(data.scan_offsets)) == [len(scan) for scan in scans]
+
+	assert data.mass_values[0] == 52.0131
+	assert data.intensity_values[0] == 5356.0
+	assert list(data.mass_values[:101]) == scans[0].mass_list
+
+	# The views are read-only
+	with pytest.raises(ValueError):
+		data.mass_values[0] = 1
+	with pytest.raises(ValueError):
+		data.intensity_values[0] = 1
+
+	assert data.get_scan_at_index(1) == scans[1]
+
+	for obj in [*test_sequences, test_dict, test_string, test_float]:
+		with pytest.raises(TypeError):
+			data.get_scan_at_index(obj)
+	with pytest.raises(IndexError):
+		data.get_scan_at_index(len(data))
+
+
+def test_from_arrays(data):
+	from_arrays = GCMS_data.from_arrays(
+			data.time_list, data.mass_values, data.intensity_values, data.scan_offsets,
+			)
+	assert from_arrays == data
+	assert from_arrays.tic == data.tic
+	assert from_arrays.min_mass == data.min_mass
+	assert from_arrays.max_mass == data.max_mass
+
+	# Scans in descending order are sorted
+	unsorted = GCMS_data.from_arrays(
+			[1.0, 2.0, 3.0],
+			[53.0, 52.0, 51.0, 50.0, 51.0, 52.0],
+			[3.0, 2.0, 1.0, 10.0, 20.0, 30.0],
+			[0, 3, 3, 6],
+			)
+	assert unsorted.scan_list == [
+			Scan([51.0, 52.0, 53.0], [1.0, 2.0, 3.0]),
+			Scan([], []),
+			Scan([50.0, 51.0, 52.0], [10.0, 20.0, 30.0]),
+			]
+	assert list(unsorted.tic.intensity_array) == [6.0, 0.0, 60.0]
+	assert unsorted.min_mass == 50.0
+	assert unsorted.max_mass == 53.0
+
+	# Errors
+	for obj in [*test_numbers, test_string, test_dict, test_list_strs]:
+		with pytest.raises(TypeError):
+			GCMS_data.from_arrays(obj, data.mass_values, data.intensity_values, data.scan_offsets)
+
+	with pytest.raises(ValueError):
+		GCMS_data.from_arrays(data.time_list[:-1], data.mass_values, data.intensity_values, data.scan_offsets)
+	with pytest.raises(ValueError):
+		GCMS_data.from_arrays(data.time_list, data.mass_values[:-1], data.intensity_values, data.scan_offsets)
+	with pytest.raises(ValueError):
+		GCMS_data.from_arrays([1.0], [50.0, 51.0], [1.0, 2.0], [0, 1])
+
+
 def test_tic(data):
 	tic = data.tic
 	assert isinstance(tic, IonChromatogram)
@@ -346,6 +412,32 @@ def test_dump(data, outputdir):
 	assert len(loaded_data) == len(data)
 
 
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_load(data, outputdir, mmap):
+	data.save(outputdir / "JCAMP_data.pyms")
+
+	loaded_data = GCMS_data.load(outputdir / "JCAMP_data.pyms", mmap=mmap)
+	assert loaded_data == data
+	assert loaded_data.time_list == data.time_list
+	assert loaded_data.scan_list == data.scan_list
+	assert loaded_data.tic == data.tic
+	assert loaded_data.min_mass == data.min_mass
+	assert loaded_data.max_mass == data.max_mass
+	assert loaded_data.time_step == data.time_step
+	assert isinstance(loaded_data.mass_values.base, numpy.memmap) is mmap
+
+	# Errors
+	for obj in [*test_sequences, test_dict, *test_numbers]:
+		with pytest.raises(TypeError):
+			data.save(obj)
+		with pytest.raises(TypeError):
+			GCMS_data.load(obj)
+
+	(outputdir / "not_pyms.dat").write_bytes(b"abcdefghijklmnop")
+	with pytest.raises(ValueError):
+		GCMS_data.load(outputdir / "not_pyms.dat")
+
 # Inherited Methods from TimeListMixin
 
 def test_time_list(data):
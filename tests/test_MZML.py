@@ -0,0 +1,165 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# stdlib
+import base64
+import zlib
+
+# 3rd party
+import numpy
+import pytest
+
+# pyms
+from pyms.GCMS.Class import GCMS_data
+from pyms.GCMS.IO.MZML import mzML_chunks, mzML_intensity_matrix, mzML_reader
+from pyms.IntensityMatrix import build_intensity_matrix
+from pyms.Spectrum import Scan
+
+# tests
+from .constants import *
+
+
+def _binary_data_array(values, dtype, accession, compress):
+	data = numpy.asarray(values, dtype=dtype).tobytes()
+	if compress:
+		data = zlib.compress(data)
+		compression = '<cvParam cvRef="MS" accession="MS:1000574" name="zlib compression" value=""/>'
+	else:
+		compression = '<cvParam cvRef="MS" accession="MS:1000576" name="no compression" value=""/>'
+
+	dtype_accession = "MS:1000523" if dtype == "<f8" else "MS:1000521"
+
+	return f"""<binaryDataArray encodedLength="0">
+<cvParam cvRef="MS" accession="{dtype_accession}" name="float" value=""/>
+{compression}
+<cvParam cvRef="MS" accession="{accession}" name="array" value=""/>
+<binary>{base64.b64encode(data).decode("ascii")}</binary>
+</binaryDataArray>"""
+
+
+def _spectrum(index, rt, unit, masses, intensities, compress):
+	if rt is None:
+		scan_start_time = ''
+	else:
+		scan_start_time = (
+				f'<cvParam cvRef="MS" accession="MS:1000016" name="scan start time" '
+				f'value="{rt}" unitCvRef="UO" unitName="{unit}"/>'
+				)
+
+	return f"""<spectrum index="{index}" id="scan={index + 1}" defaultArrayLength="{len(masses)}">
+<cvParam cvRef="MS" accession="MS:1000511" name="ms level" value="1"/>
+<scanList count="1"><scan>{scan_start_time}</scan></scanList>
+<binaryDataArrayList count="2">
+{_binary_data_array(masses, "<f8", "MS:1000514", compress)}
+{_binary_data_array(intensities, "<f4", "MS:1000515", compress)}
+</binaryDataArrayList>
+</spectrum>
+"""
+
+
+def _write_mzml(filename, indexed):
+	spectra = [
+			_spectrum(0, 0.5, "minute", [50.0, 51.5, 53.0], [10.0, 20.0, 30.0], True),
+			_spectrum(1, None, "minute", [50.0], [99.0], True),
+			_spectrum(2, 1.0, "minute", [52.0, 51.0, 50.5], [40.0, 50.0, 60.0], False),
+			_spectrum(3, 90.0, "second", [60.0], [70.0], True),
+			]
+
+	content = (
+			'<?xml version="1.0" encoding="utf-8"?>\n'
+			'<indexedmzML xmlns="http://psi.hupo.org/ms/mzml">\n'
+			'<mzML xmlns="http://psi.hupo.org/ms/mzml" version="1.1.0">\n'
+			'<run id="test"><spectrumList count="4">\n'
+			)
+
+	offsets = []
+	for spectrum in spectra:
+		offsets.append(len(content.encode("utf-8")))
+		content += spectrum
+
+	content += "</spectrumList></run>\n</mzML>\n"
+
+	if indexed:
+		index_list_offset = len(content.encode("utf-8"))
+		content += '<indexList count="1">\n<index name="spectrum">\n'
+		for idx, offset in enumerate(offsets):
+			content += f'<offset idRef="scan={idx + 1}">{offset}</offset>\n'
+		content += "</index>\n</indexList>\n"
+		content += f"<indexListOffset>{index_list_offset}</indexListOffset>\n"
+
+	content += "</indexedmzML>\n"
+
+	filename.write_text(content)
+	return filename
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["indexed", "not_indexed"])
+def mzml_file(outputdir, request):
+	return _write_mzml(outputdir / f"small_{request.param}.mzML", request.param)
+
+
+@pytest.fixture(scope="module")
+def expected_scans():
+	return [
+			Scan([50.0, 51.5, 53.0], [10.0, 20.0, 30.0]),
+			Scan([50.5, 51.0, 52.0], [60.0, 50.0, 40.0]),
+			Scan([60.0], [70.0]),
+			]
+
+
+@pytest.mark.parametrize("n_workers, use_processes", [(None, False), (2, False), (2, True)])
+def test_mzML_reader(mzml_file, expected_scans, n_workers, use_processes):
+	data = mzML_reader(mzml_file, n_workers=n_workers, use_processes=use_processes)
+
+	assert isinstance(data, GCMS_data)
+	assert data.time_list == [30.0, 60.0, 90.0]
+	assert data.scan_list == expected_scans
+	assert data.min_mass == 50.0
+	assert data.max_mass == 60.0
+
+
+def test_mzML_reader_errors(mzml_file):
+	for obj in [*test_numbers, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			mzML_reader(obj)
+
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			mzML_reader(mzml_file, n_workers=obj)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 10])
+def test_mzML_chunks(mzml_file, expected_scans, chunk_size):
+	chunks = list(mzML_chunks(mzml_file, chunk_size))
+
+	assert sum((chunk.scan_list for chunk in chunks), []) == expected_scans
+	assert sum((chunk.time_list for chunk in chunks), []) == [30.0, 60.0, 90.0]
+
+	for obj in [test_string, test_float, *test_sequences, test_dict]:
+		with pytest.raises(TypeError):
+			mzML_chunks(mzml_file, obj)
+	with pytest.raises(ValueError):
+		mzML_chunks(mzml_file, 0)
+
+
+def test_mzML_intensity_matrix(mzml_file):
+	im = build_intensity_matrix(mzML_reader(mzml_file), bin_interval=0.5, bin_left=0.25, bin_right=0.25)
+
+	assert mzML_intensity_matrix(mzml_file, bin_interval=0.5, bin_left=0.25, bin_right=0.25, chunk_size=2) == im
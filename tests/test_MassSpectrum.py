@@ -20,7 +20,9 @@
 
 # stdlib
 import copy
+import json
 import pathlib
+import pickle
 import requests
 
 # 3rd party
@@ -28,7 +30,8 @@ import pytest
 import numpy
 
 # pyms
-from pyms.Spectrum import MassSpectrum
+from pyms.json import PyMassSpecEncoder
+from pyms.Spectrum import MassSpectrum, normalize_mass_spec
 # tests
 from .constants import *
 
@@ -76,10 +79,11 @@ def test_mass_spec(ms):
 	ms.mass_spec[0] = 123
 	assert ms.mass_spec[0] == 123
 
-	assert ms.mass_spec == ms.intensity_list
+	assert isinstance(ms.mass_spec, numpy.ndarray)
+	assert ms.mass_spec.tolist() == ms.intensity_list
 
 	ms.mass_spec = list(range(len(ms.mass_spec)))
-	assert ms.mass_spec == list(range(len(ms.mass_spec)))
+	assert ms.mass_spec.tolist() == list(range(len(ms.mass_spec)))
 
 	# for type in [test_list_ints, test_tuple]:
 	# 	with pytest.raises(ValueError):
@@ -189,3 +193,108 @@ def test_from_mz_int_pairs():
 	for obj in [[(1, 2, 3)], ([1, 2, 3],), [(1,)], ([1],), [("abc", "123")]]:
 		with pytest.raises(ValueError):
 			MassSpectrum.from_mz_int_pairs(obj)
+
+
+def test_sort_order():
+	ms = MassSpectrum([3, 2, 1], [30, 20, 10])
+	assert ms.mass_list == [1, 2, 3]
+	assert ms.intensity_list == [10.0, 20.0, 30.0]
+	assert ms.min_mass == 1
+	assert ms.max_mass == 3
+
+	with pytest.warns(UserWarning):
+		ms = MassSpectrum([2, 3, 1], [20, 30, 10])
+	assert ms.mass_list == [1, 2, 3]
+	assert ms.intensity_list == [10.0, 20.0, 30.0]
+
+
+def test_arrays(im_i):
+	ms = im_i.get_ms_at_index(0)
+
+	assert ms.mass_spec.dtype == numpy.float64
+	assert ms.mass_array.tolist() == ms.mass_list
+
+	with pytest.raises(ValueError):
+		ms.mass_array[0] = 1
+
+	# The arrays are not shared with the values given
+	intensities = numpy.arange(len(ms), dtype=float)
+	new_ms = MassSpectrum(ms.mass_array, intensities)
+	intensities[0] = 123
+	assert new_ms.mass_spec[0] == 0
+
+	# Nor with copies
+	ms_copy = copy.copy(ms)
+	ms_copy.mass_spec[0] += 1
+	assert ms_copy.mass_spec[0] == ms.mass_spec[0] + 1
+
+	with pytest.raises(AttributeError):
+		ms.foo = "bar"
+
+
+def test_crop(im_i):
+	ms = im_i.get_ms_at_index(0)
+	cropped = ms.crop(55, 100)
+	assert cropped.mass_list == ms.mass_list[5:51]
+	assert cropped.intensity_list == ms.intensity_list[5:51]
+	assert cropped.min_mass == 55
+	assert cropped.max_mass == 100
+
+	# Masses between the given values are included
+	assert ms.crop(54.5, 100.5) == cropped
+
+	assert ms.crop(55, 100, inplace=True) is ms
+	assert ms == cropped
+
+
+def test_icrop(im_i):
+	ms = im_i.get_ms_at_index(0)
+	cropped = ms.icrop(5, 51)
+	assert cropped.mass_list == ms.mass_list[5:51]
+	assert cropped.intensity_list == ms.intensity_list[5:51]
+
+
+def test_n_largest_peaks():
+	ms = MassSpectrum([1, 2, 3, 4, 5], [10, 50, 30, 50, 20])
+	assert ms.n_largest_peaks(3) == [1, 3, 2]
+
+
+def test_get_intensity_for_mass(im_i):
+	ms = im_i.get_ms_at_index(0)
+	assert ms.get_intensity_for_mass(55) == 4192.0
+	assert ms.get_intensity_for_mass(100) == 3459.0
+
+	with pytest.raises(ValueError):
+		ms.get_intensity_for_mass(55.5)
+
+
+def test_get_mass_for_intensity():
+	ms = MassSpectrum([1, 2, 3, 4, 5], [10, 50, 30, 50, 20])
+	assert ms.get_mass_for_intensity(50) == 2
+
+	with pytest.raises(ValueError):
+		ms.get_mass_for_intensity(40)
+
+
+def test_normalize_mass_spec():
+	ms = MassSpectrum([1, 2, 3, 4], [10, 50, 25, 0])
+
+	assert normalize_mass_spec(ms).intensity_list == [20.0, 100.0, 50.0, 0.0]
+	assert normalize_mass_spec(ms, relative_to=100).intensity_list == [10.0, 50.0, 25.0, 0.0]
+	assert normalize_mass_spec(ms, max_intensity=1.0).intensity_list == [0.2, 1.0, 0.5, 0.0]
+	assert normalize_mass_spec(ms, relative_to=80, max_intensity=10).intensity_list == [1.0, 6.0, 3.0, 0.0]
+
+	assert ms.intensity_list == [10.0, 50.0, 25.0, 0.0]
+	assert normalize_mass_spec(ms, inplace=True) is ms
+	assert ms.intensity_list == [20.0, 100.0, 50.0, 0.0]
+
+
+def test_pickle_and_json(im_i):
+	ms = im_i.get_ms_at_index(0)
+	state = ms.__getstate__()
+	assert isinstance(state["mass_list"], list)
+	assert isinstance(state["intensity_list"], list)
+
+	assert pickle.loads(pickle.dumps(ms)) == ms
+	assert dict(ms) == {"intensity_list": ms.intensity_list, "mass_list": ms.mass_list}
+	assert MassSpectrum.from_dict(json.loads(json.dumps(ms, cls=PyMassSpecEncoder))) == ms
@@ -19,12 +19,14 @@
 #############################################################################
 
 # 3rd party
+import numpy
 import pytest
 
 # pyms
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
 from pyms.Noise.SavitzkyGolay import savitzky_golay, savitzky_golay_im
+from pyms.Utils.Executor import ThreadExecutor
 
 # tests
 from .constants import *
@@ -81,7 +83,12 @@ def test_savitzky_golay_intensity_matrix(im, tic):
 	ic_smooth = im_smooth.get_ic_at_index(73)
 	assert isinstance(ic_smooth, IonChromatogram)
 
-	# TODO: value assertions
+	# The whole matrix is filtered the same as each ion chromatogram
+	numpy.testing.assert_allclose(ic_smooth.intensity_array, savitzky_golay(ic).intensity_array)
+	numpy.testing.assert_allclose(
+			im_smooth.intensity_array,
+			savitzky_golay_im(im, executor=ThreadExecutor(3)).intensity_array,
+			)
 
 	savitzky_golay_im(im, degree=5)
 	savitzky_golay_im(im, window=5)
@@ -99,3 +106,25 @@ def test_savitzky_golay_intensity_matrix(im, tic):
 	for obj in [test_float, *test_lists, test_dict]:
 		with pytest.raises(TypeError):
 			savitzky_golay_im(im, window=obj)
+
+
+def test_savitzky_golay_derivatives(im):
+	ic = im.get_ic_at_index(73)
+
+	for deriv in [1, 2]:
+		ic_deriv = savitzky_golay(ic, deriv=deriv)
+		im_deriv = savitzky_golay_im(im, deriv=deriv)
+		numpy.testing.assert_allclose(im_deriv.get_ic_at_index(73).intensity_array, ic_deriv.intensity_array)
+
+	# The first derivative of a straight line is its gradient, away from the edges
+	line = IonChromatogram(numpy.arange(50) * 3.0, list(range(50)))
+	numpy.testing.assert_allclose(savitzky_golay(line, window=5, deriv=1).intensity_array[2:-2], 3.0)
+
+	for obj in [test_string, test_float, *test_lists, test_dict]:
+		with pytest.raises(TypeError):
+			savitzky_golay(ic, deriv=obj)
+
+	with pytest.raises(ValueError):
+		savitzky_golay(ic, deriv=3)
+	with pytest.raises(ValueError):
+		savitzky_golay_im(im, deriv=-1)
@@ -19,6 +19,7 @@
 #############################################################################
 
 # 3rd party
+import numpy
 import pytest
 
 # pyms
@@ -27,6 +28,7 @@ from pyms.IonChromatogram import IonChromatogram
 from pyms.Noise.SavitzkyGolay import savitzky_golay
 from pyms.Noise.Window import window_smooth, window_smooth_im
 from pyms.TopHat import tophat
+from pyms.Utils.Executor import ThreadExecutor
 
 # tests
 from .constants import *
@@ -48,6 +50,11 @@ def test_window_smooth(tic):
 	tic3 = window_smooth(tic, window='7s')
 	assert isinstance(tic3, IonChromatogram)
 
+	# Windows are truncated at the ends, and the results are not rounded
+	ic = IonChromatogram(numpy.array([1, 2, 4, 8, 16, 1]), list(range(6)))
+	numpy.testing.assert_allclose(window_smooth(ic, window=3).intensity_array, [1.5, 7 / 3, 14 / 3, 28 / 3, 25 / 3, 8.5])
+	numpy.testing.assert_allclose(window_smooth(ic, window=3, use_median=True).intensity_array, [1.5, 2, 4, 8, 8, 8.5])
+
 	for obj in [*test_numbers, test_string, *test_lists, test_dict]:
 		with pytest.raises(TypeError):
 			window_smooth(obj)
@@ -76,6 +83,15 @@ def test_window_smooth_im(im):
 	ic_smooth = im_smooth.get_ic_at_index(73)
 	assert isinstance(ic_smooth, IonChromatogram)
 
+	# The whole matrix is smoothed the same as each ion chromatogram
+	for use_median in [False, True]:
+		im_smooth = window_smooth_im(im, window=5, use_median=use_median)
+		ic_smooth = window_smooth(ic, window=5, use_median=use_median)
+		numpy.testing.assert_allclose(im_smooth.get_ic_at_index(73).intensity_array, ic_smooth.intensity_array)
+
+		im_threaded = window_smooth_im(im, window=5, use_median=use_median, executor=ThreadExecutor(3))
+		numpy.testing.assert_allclose(im_threaded.intensity_array, im_smooth.intensity_array)
+
 	for obj in [*test_numbers, test_string, *test_lists, test_dict]:
 		with pytest.raises(TypeError):
 			window_smooth_im(obj)
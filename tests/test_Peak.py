@@ -25,6 +25,7 @@ from numbers import Number
 
 # 3rd party
 import deprecation
+import numpy
 import pytest
 
 # pyms
@@ -298,7 +299,7 @@ def test_mass_spectrum(peak, im_i):
 	assert peak.mass_spectrum is None
 	peak.mass_spectrum = ms
 	assert isinstance(peak.mass_spectrum, MassSpectrum)
-	assert isinstance(peak.mass_spectrum.mass_spec, list)
+	assert isinstance(peak.mass_spectrum.mass_spec, numpy.ndarray)
 
 	for obj in [test_string, *test_numbers, test_dict, *test_lists]:
 		with pytest.raises(TypeError):
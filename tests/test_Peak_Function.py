@@ -18,14 +18,19 @@
 #                                                                           #
 #############################################################################
 
+# stdlib
+import copy
+
 # 3rd party
 import deprecation
+import numpy
 import pytest
 
 # pyms
+from pyms.Peak import PeakTable
 from pyms.Peak.Function import (
-	half_area, ion_area, median_bounds, peak_pt_bounds, peak_sum_area, peak_top_ion_areas,
-	top_ions_v1, top_ions_v2,
+	_half_areas, batch_ion_areas, batch_peak_areas, half_area, ion_area, median_bounds, peak_pt_bounds,
+	peak_sum_area, peak_top_ion_areas, top_ions_v1, top_ions_v2,
 	)
 # tests
 from .constants import *
@@ -211,6 +216,87 @@ class Test_median_bounds:
 			median_bounds(im_i, peak, obj)
 
 
+class Test_batch_ion_areas:
+
+	def test_main(self, peak_list, im_i):
+		peaks = peak_list[:20]
+		areas, left, right, l_share, r_share = batch_ion_areas(im_i, peaks, max_bound=5)
+
+		assert areas.shape == (len(peaks), len(im_i.mass_list))
+		assert left.shape == right.shape == l_share.shape == r_share.shape == areas.shape
+
+		for index, peak in enumerate(peaks):
+			apex = im_i.get_index_at_time(peak.rt)
+			for ii, intensity in enumerate(peak.mass_spectrum.mass_spec):
+				if intensity > 0:
+					ia = im_i.get_ic_at_index(ii).intensity_array.tolist()
+					expected = ion_area(ia, apex, 5)
+					assert areas[index, ii] == expected[0]
+					assert left[index, ii] == expected[1]
+					assert right[index, ii] == expected[2]
+					assert l_share[index, ii] == expected[3]
+					assert r_share[index, ii] == expected[4]
+				else:
+					assert areas[index, ii] == 0
+
+	def test_peak_table(self, peak_list, im_i):
+		peaks = peak_list[:20]
+		table = PeakTable.from_peaks(peaks)
+
+		for from_table, from_list in zip(batch_ion_areas(im_i, table), batch_ion_areas(im_i, peaks)):
+			assert numpy.array_equal(from_table, from_list)
+
+	def test_empty(self, im_i):
+		areas = batch_ion_areas(im_i, [])[0]
+		assert areas.shape == (0, len(im_i.mass_list))
+
+	def test_widened_window(self):
+		# The search window is widened for peaks whose bounds are not found within it
+		ia = numpy.array([[1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 8.0, 5.0, 3.0, 2.0, 1.0, 0.0]]).T
+		for direction in (-1, 1):
+			area, bound, shared = _half_areas(ia, numpy.array([5]), numpy.array([0]), direction, window=1)
+			series = ia[:6, 0][::-1] if direction < 0 else ia[5:, 0]
+			assert (area[0], bound[0], shared[0]) == half_area(series.tolist())
+
+	@pytest.mark.parametrize("obj", [test_string, *test_numbers, test_dict, *test_lists])
+	def test_im_errors(self, peak, obj):
+		with pytest.raises(TypeError):
+			batch_ion_areas(obj, [peak])
+
+	@pytest.mark.parametrize("obj", [test_string, *test_numbers, test_dict, test_list_strs])
+	def test_peaks_errors(self, im_i, obj):
+		with pytest.raises(TypeError):
+			batch_ion_areas(im_i, obj)
+
+
+class Test_batch_peak_areas:
+
+	def test_main(self, peak_list, im_i):
+		peaks = peak_list[:20]
+		expected = copy.deepcopy(peaks)
+
+		sum_areas = batch_peak_areas(im_i, peaks, n_top_ions=5)
+		assert len(sum_areas) == len(peaks)
+
+		for peak, other, area in zip(peaks, expected, sum_areas):
+			assert peak.area == area == peak_sum_area(im_i, other)
+			assert isinstance(peak.area, float)
+			assert peak.ion_areas == peak_top_ion_areas(im_i, other, 5)
+
+	def test_peak_table(self, peak_list, im_i):
+		peaks = peak_list[:20]
+		table = PeakTable.from_peaks(peaks)
+
+		sum_areas = batch_peak_areas(im_i, table)
+		assert numpy.array_equal(table.area, sum_areas)
+		assert table.area.tolist() == [peak_sum_area(im_i, peak) for peak in peaks]
+
+	@pytest.mark.parametrize("obj", [test_string, test_float, test_dict, *test_lists])
+	def test_n_top_ions_errors(self, im_i, peak, obj):
+		with pytest.raises(TypeError):
+			batch_peak_areas(im_i, [peak], n_top_ions=obj)
+
+
 """def test_abundant_ions(filtered_peak_list, im_i):
 
 	print("Number of filtered peaks: ", len(filtered_peak_list))
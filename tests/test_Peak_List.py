@@ -19,6 +19,7 @@
 #############################################################################
 
 # 3rd party
+import numpy
 import pytest
 
 # pyms
@@ -54,7 +55,7 @@ def test_composite_peak(filtered_peak_list, im_i):
 	# assert peak.area == area
 
 	assert isinstance(peak.mass_spectrum, MassSpectrum)
-	assert isinstance(peak.mass_spectrum.mass_spec, list)
+	assert isinstance(peak.mass_spectrum.mass_spec, numpy.ndarray)
 	peak.null_mass(73)
 	index_73 = peak.mass_spectrum.mass_list.index(73)
 	assert peak.mass_spectrum.mass_spec[index_73] == 0
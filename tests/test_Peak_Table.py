@@ -0,0 +1,127 @@
+#############################################################################
+#                                                                           #
+#    PyMassSpec software for processing of mass-spectrometry data           #
+#    Copyright (C) 2019-2020 Dominic Davis-Foster                           #
+#                                                                           #
+#    This program is free software; you can redistribute it and/or modify   #
+#    it under the terms of the GNU General Public License version 2 as      #
+#    published by the Free Software Foundation.                             #
+#                                                                           #
+#    This program is distributed in the hope that it will be useful,        #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of         #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the          #
+#    GNU General Public License for more details.                           #
+#                                                                           #
+#    You should have received a copy of the GNU General Public License      #
+#    along with this program; if not, write to the Free Software            #
+#    Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.              #
+#                                                                           #
+#############################################################################
+
+# 3rd party
+import numpy
+import pytest
+
+# pyms
+from pyms.BillerBiemann import num_ions_threshold, rel_threshold
+from pyms.Peak import Peak, PeakTable
+from pyms.Peak.List import composite_peak, fill_peaks, sele_peaks_by_rt
+
+# tests
+from .constants import *
+
+
+def test_from_peaks(peak_list):
+	table = PeakTable.from_peaks(peak_list)
+	assert isinstance(table, PeakTable)
+	assert len(table) == len(peak_list)
+
+	assert table.spectra.shape == (len(peak_list), len(peak_list[0].mass_spectrum.mass_list))
+	assert list(table.mass_list) == peak_list[0].mass_spectrum.mass_list
+	assert list(table.rt) == [peak.rt for peak in peak_list]
+	assert list(table.UID) == [peak.UID for peak in peak_list]
+	assert table.bounds[0].tolist() == peak_list[0].bounds
+
+	# Round trip
+	peaks = table.to_peaks()
+	assert [peak.UID for peak in peaks] == [peak.UID for peak in peak_list]
+	assert peaks[5].mass_spectrum == peak_list[5].mass_spectrum
+	assert peaks[5].bounds == peak_list[5].bounds
+	assert table[5] == peaks[5]
+	assert table[-1].rt == peak_list[-1].rt
+
+	# The UIDs calculated from the spectra match those of the peaks
+	table._uid = None
+	assert list(table.UID) == [peak.UID for peak in peak_list]
+
+	with pytest.raises(TypeError):
+		PeakTable.from_peaks(test_list_ints)
+	with pytest.raises(ValueError):
+		PeakTable.from_peaks([Peak(12.34, 55)])
+	with pytest.raises(IndexError):
+		table[len(table)]
+
+
+def test_from_intensity_matrix(im_i):
+	table = PeakTable.from_intensity_matrix(im_i, [10, 20, 30])
+	assert len(table) == 3
+	assert table.rt[1] == im_i.get_time_at_index(20)
+	assert table.spectra[2].tolist() == im_i.get_ms_at_index(30).intensity_list
+	assert table[0].bounds == [0, 10, 0]
+
+
+def test_select(peak_list):
+	table = PeakTable.from_peaks(peak_list)
+
+	mask = table.rt > 600
+	selected = table[mask]
+	assert len(selected) == int(mask.sum())
+	assert list(selected.UID) == [peak.UID for peak in peak_list if peak.rt > 600]
+	assert selected.mass_list is table.mass_list
+
+	assert len(table[2:5]) == 3
+	assert list(table[[3, 1]].rt) == [peak_list[3].rt, peak_list[1].rt]
+
+	copied = table.copy()
+	assert copied == table
+	copied.spectra[0] = 0
+	assert copied != table
+
+
+def test_thresholds(peak_list):
+	table = PeakTable.from_peaks(peak_list)
+
+	pl = rel_threshold(peak_list, 2)
+	table_threshold = rel_threshold(table, 2)
+	assert isinstance(table_threshold, PeakTable)
+	assert table_threshold is not table
+	assert list(table_threshold.UID) == [peak.UID for peak in pl]
+	numpy.testing.assert_array_equal(table_threshold.spectra, [peak.mass_spectrum.mass_spec for peak in pl])
+
+	pl = num_ions_threshold(pl, 3, 3000)
+	table_threshold = num_ions_threshold(table_threshold, 3, 3000)
+	assert isinstance(table_threshold, PeakTable)
+	assert list(table_threshold.UID) == [peak.UID for peak in pl]
+
+	# In place
+	assert rel_threshold(table, 2, copy_peaks=False) is table
+
+
+def test_peak_list_functions(im_i, peak_list):
+	pl = num_ions_threshold(rel_threshold(peak_list, 2), 3, 3000)
+	table = PeakTable.from_peaks(pl)
+
+	selected = sele_peaks_by_rt(table, ("12m", "13m"))
+	assert isinstance(selected, PeakTable)
+	assert list(selected.UID) == [peak.UID for peak in sele_peaks_by_rt(pl, ("12m", "13m"))]
+
+	peak = composite_peak(table[10:20])
+	expected = composite_peak(pl[10:20])
+	assert peak.rt == pytest.approx(expected.rt)
+	numpy.testing.assert_allclose(peak.mass_spectrum.mass_spec, expected.mass_spectrum.mass_spec)
+
+	filled = fill_peaks(im_i, table, 10.0)
+	assert isinstance(filled, PeakTable)
+	expected = fill_peaks(im_i, pl, 10.0)
+	assert list(filled.rt) == [peak.rt for peak in expected]
+	numpy.testing.assert_array_equal(filled.spectra, [peak.mass_spectrum.mass_spec for peak in expected])
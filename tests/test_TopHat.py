@@ -19,12 +19,15 @@
 #############################################################################
 
 # 3rd party
+import numpy
 import pytest
+from scipy import ndimage
 
 # pyms
 from pyms.IntensityMatrix import IntensityMatrix
 from pyms.IonChromatogram import IonChromatogram
-from pyms.TopHat import tophat, tophat_im
+from pyms.TopHat import baseline_correct, tophat, tophat_im
+from pyms.Utils.Executor import ThreadExecutor
 
 # tests
 from .constants import *
@@ -43,6 +46,27 @@ def test_topHat(tic):
 	tic4 = tophat(tic, struct=1234)
 	assert isinstance(tic4, IonChromatogram)
 
+	# Same as the white top-hat transform, for odd and even structural elements
+	for struct in [1234, 1235]:
+		expected = ndimage.white_tophat(tic.intensity_array, footprint=numpy.ones(struct))
+		numpy.testing.assert_allclose(tophat(tic, struct=struct).intensity_array, expected)
+
+
+def test_baseline_correct():
+	ia = numpy.array([5, 5, 9, 5, 3, 3, 8, 8, 3, 4], dtype=float)
+
+	numpy.testing.assert_allclose(baseline_correct(ia, 3), ndimage.white_tophat(ia, footprint=numpy.ones(3)))
+
+	# The rolling minimum never subtracts more than the opening
+	rolling_minimum = baseline_correct(ia, 3, method="rolling_minimum")
+	numpy.testing.assert_allclose(rolling_minimum, [0, 0, 4, 2, 0, 0, 5, 5, 0, 1])
+	assert (rolling_minimum >= baseline_correct(ia, 3)).all()
+
+	with pytest.raises(TypeError):
+		baseline_correct(ia, 3, method=1)
+	with pytest.raises(ValueError):
+		baseline_correct(ia, 3, method=test_string)
+
 
 def test_tophat_im(im):
 	# Use TopHat baseline correction on all IC's in the IM
@@ -57,6 +81,24 @@ def test_tophat_im(im):
 	ic_base_corr = im_base_corr.get_ic_at_index(73)
 	assert isinstance(ic_base_corr, IonChromatogram)
 
+	# The whole matrix is corrected the same as each ion chromatogram
+	numpy.testing.assert_allclose(ic_base_corr.intensity_array, tophat(ic, struct="1.5m").intensity_array)
+
+	for kwargs in [{"chunk_size": 7}, {"executor": ThreadExecutor(3)}]:
+		im_other = tophat_im(im, struct="1.5m", **kwargs)
+		numpy.testing.assert_allclose(im_other.intensity_array, im_base_corr.intensity_array)
+
+	im_rolling = tophat_im(im, struct="1.5m", method="rolling_minimum")
+	numpy.testing.assert_allclose(
+			im_rolling.get_ic_at_index(73).intensity_array,
+			tophat(ic, struct="1.5m", method="rolling_minimum").intensity_array,
+			)
+
+	with pytest.raises(TypeError):
+		tophat_im(im, chunk_size=test_float)
+	with pytest.raises(ValueError):
+		tophat_im(im, chunk_size=0)
+
 
 class TestErrors:
 